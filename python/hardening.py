@@ -21,7 +21,7 @@ import sys
 
 from hardening import io, core
 from hardening.core.Documentation import Documentation
-from hardening.scheduler import Scheduler
+from hardening.scheduler import Scheduler, BatchDriver, Daemon, Watcher, Restorer
 
 
 def main():
@@ -40,6 +40,36 @@ def main():
         print((_("You should not run this tool using the root account\n"
                  "Instead, you should use sudo!")))
 
+    if len(core.RuntimeOptions().root_paths()) > 1:
+        try:
+            failed_roots = BatchDriver().run()
+        finally:
+            core.TimingReport().store_report()
+        sys.exit(1 if len(failed_roots) > 0 else 0)
+
+    # a commit which has been interrupted by a crash is undone before anything else is changed
+    try:
+        Restorer.recover()
+    except core.HardeningFailure as error:
+        core.LogManager().get_logger().fatal(str(error))
+        sys.exit(-1)
+
+    if core.RuntimeOptions().daemon_mode():
+        try:
+            Daemon(core.RuntimeOptions().daemon_socket()).serve()
+        finally:
+            core.TimingReport().store_report()
+
+    if core.RuntimeOptions().restore_timestamp() is not None:
+        try:
+            failures = Restorer(core.RuntimeOptions().restore_timestamp()).run()
+        except core.HardeningFailure as error:
+            core.LogManager().get_logger().fatal(str(error))
+            sys.exit(-1)
+        finally:
+            core.TimingReport().store_report()
+        sys.exit(1 if len(failures) > 0 else 0)
+
     io.create_writer().display_message(
         message=_(u" ___ ___ ___   ___ __  __ ___   ___\n"
                   u"| _ ) __|_ _| / __|  \/  / __| |_  )\n"
@@ -71,7 +101,8 @@ def main():
         headline=_(u"Attention!"))
     io.create_writer().display_message("", hyphenate=False)
 
-    if not io.create_writer().prompt_user_yesno(
+    # a root filesystem cannot be affected by a system management suite of the running system
+    if core.RuntimeOptions().root_path() is None and not io.create_writer().prompt_user_yesno(
             default=_("no"),
             caption=_("WARNING --- WARNING --- WARNING"),
             message=_(u"Be aware that this tool may impair your system if you are concurrently "
@@ -84,14 +115,21 @@ def main():
 
     scheduler = Scheduler()
     try:
+        if core.RuntimeOptions().watch_mode():
+            # the changes have already been logged by the watcher
+            Watcher(scheduler).run()
+            return
         scheduler.run_hardening_modules()
-    except SystemExit:
+    except SystemExit as abort:
         io.create_writer().display_message(
             headline=_("Hardening aborted!!!!"),
             message=_("The hardening was stopped due to user request or unexpected behaviour."
                       " No hardening effects were applied.")
         )
-        return
+        # let the caller (e.g. scheduler::BatchDriver) know that the hardening has failed
+        sys.exit(abort.code)
+    finally:
+        core.TimingReport().store_report()
 
     if core.RuntimeOptions().is_log_enabled():
         # noinspection PyBroadException
@@ -44,6 +44,13 @@ CONFIG_DEFAULTINDENT = 'DefaultIndent'
 
 CONFIG_DEFAULTMODULES = 'ModulesSelectedPerDefault'
 
+CONFIG_CACHE = 'Cache'
+CONFIG_BASEDIR = 'BaseDir'
+
+CONFIG_BACKUP = 'Backup'
+CONFIG_KEEPRUNS = 'KeepRuns'
+CONFIG_FORMAT = 'Format'
+
 PACKAGES_PACKAGE = 'utils'
 
 OPTION_INTERFACE = "interface"
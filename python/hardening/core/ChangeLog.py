@@ -13,6 +13,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import threading
 from hardening.core.RuntimeOptions import RuntimeOptions
 from hardening.core.Singleton import singleton
 
@@ -27,6 +28,7 @@ class ChangeLog(object):
 
     def __init__(self):
         self.__items = list()
+        self.__lock = threading.Lock()
 
     def append_log_item(self, *items):
         """append lines to the change log
@@ -34,12 +36,17 @@ class ChangeLog(object):
         If the lines to be added do not end with a newline (we use os.linesep), then one will be
         appended
         @param items: one or more items to be added to the changecore. All items will be converted
-        to string before they are appended.
+        to string before they are appended. The items are appended as one block, even if
+        transactions are committed concurrently.
         """
+        lines = list()
         for item in [str(x) for x in items]:
             if not item.endswith(os.linesep):
                 item = item + os.linesep
-            self.__items.append(item)
+            lines.append(item)
+
+        with self.__lock:
+            self.__items.extend(lines)
 
     def get_log_as_string(self):
         """creates a string representation of the whole change log
@@ -56,6 +63,11 @@ class ChangeLog(object):
         """
         RuntimeOptions().logfile().writelines(self.__items)
 
+    def clear(self):
+        """removes all items from the change log"""
+        with self.__lock:
+            self.__items = list()
+
     def has_items_to_save(self):
         """
         return whether or not there is some content in the log
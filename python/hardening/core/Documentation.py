@@ -22,45 +22,32 @@ class Documentation(object):
 
     @staticmethod
     def __create_util_documentation():
-        base_path = RuntimeOptions().base_path()
-        searchpath = os.path.join(base_path, 'hardening', 'utils')
+        # importing utils at module level would result in a circular import
+        from hardening.utils.UtilRegistry import UtilRegistry
+
         result = [
             '|util class| option |is required?|meaning',
             '|-|-|-|-'
         ]
 
-        for root, _, files in os.walk(searchpath):
-            for code_file in files:
-                if code_file.endswith(".py"):
-                    module_name = os.path.join(root.replace(base_path + os.sep, ""),
-                                               code_file[:-3]).replace('/', '.')
-                    class_name = module_name.split(b'.')[-1].decode()
-
-                    pkg = importlib.import_module(module_name)
-
-                    cls = getattr(pkg, class_name)
-
-                    if not inspect.isclass(cls):
-                        continue
-
-                    doc = cls.__doc__
+        for util_name, cls in UtilRegistry().get_classes():
+            doc = cls.__doc__
+            if doc is None:
+                doc = " "
+            else:
+                doc = doc.strip().replace("\n", "")
+
+            doc = re.sub(r"\s+", " ", doc)
+            result.append('|`%s`| | | %s |' % (util_name, doc))
+            try:
+                for opt in cls.options():
+                    doc = opt.get_docstring()
                     if doc is None:
                         doc = " "
-                    else:
-                        doc = doc.strip().replace("\n", "")
-
-                    doc = re.sub(r"\s+", " ", doc)
                     result.append(
-                        '|`%s.%s`| | | %s |' % (module_name.split('.')[-2], cls.__name__, doc))
-                    try:
-                        for opt in cls.options():
-                            doc = opt.get_docstring()
-                            if doc is None:
-                                doc = " "
-                            result.append(
-                                '| | `%s` | %s | %s' % (opt.get_name(), opt.is_required(), doc))
-                    except AttributeError:
-                        pass
+                        '| | `%s` | %s | %s' % (opt.get_name(), opt.is_required(), doc))
+            except AttributeError:
+                pass
         return os.linesep.join(result)
 
     @staticmethod
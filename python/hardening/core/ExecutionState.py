@@ -13,6 +13,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import threading
+
 from hardening.core.Singleton import singleton
 
 
@@ -21,33 +23,52 @@ class ExecutionState(object):
     """
     represents meta information about the current state of execution, i.e. which module
      is currenty running.
+
+    Utils may be run on several worker threads concurrently (see scheduler::UtilExecutor), so the
+    state is kept separately for every thread.
     """
 
     def __init__(self):
-        self.__current_module = None
-        self.__current_section = None
-        self.__current_util = None
+        self.__state = threading.local()
+
+    def __get(self, name):
+        return getattr(self.__state, name, None)
 
     @property
     def current_module(self):
-        return self.__current_module
+        return self.__get('module')
 
     @current_module.setter
     def current_module(self, module):
-        self.__current_module = module
+        self.__state.module = module
 
     @property
     def current_section(self):
-        return self.__current_section
+        return self.__get('section')
 
     @current_section.setter
     def current_section(self, section):
-        self.__current_section = section
+        self.__state.section = section
 
     @property
     def current_util(self):
-        return self.__current_util
+        return self.__get('util')
 
     @current_util.setter
     def current_util(self, util):
-        self.__current_util = util
+        self.__state.util = util
+
+    def snapshot(self):
+        """returns the state of the current thread, so that it can be transferred to another
+        thread using ExecutionState::restore
+
+        @return opaque object
+        """
+        return self.current_module, self.current_section, self.current_util
+
+    def restore(self, snapshot):
+        """replaces the state of the current thread
+
+        @param snapshot: value which has been returned by ExecutionState::snapshot
+        """
+        self.current_module, self.current_section, self.current_util = snapshot
@@ -0,0 +1,138 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import errno
+import os
+import stat
+
+# noinspection PyBroadException
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl which lets the destination share all data blocks of the source, see ioctl_ficlone(2)
+FICLONE = 0x40049409
+
+METHOD_REFLINK = 'reflink'
+METHOD_HARDLINK = 'hardlink'
+METHOD_COPY_FILE_RANGE = 'copy_file_range'
+METHOD_COPY = 'copy'
+
+# errors which indicate that a method is not supported for this pair of files
+UNSUPPORTED_ERRORS = frozenset([errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP,
+                                errno.ENOTTY, errno.EBADF, errno.EPERM, errno.EMLINK])
+
+BLOCK_SIZE = 1024 * 1024
+
+
+def copy_file(source, destination, allow_link=False, sync=False):
+    """copies a regular file, using the fastest method which is supported by the filesystem
+
+    The following methods are tried in order:
+
+     -# a reflink (`FICLONE`), which shares the data blocks of both files until one of them is
+        modified (btrfs, xfs)
+     -# a hard link, if `allow_link` is `True`. This is only allowed if neither the source nor the
+        destination is ever modified in place afterwards, e.g. because the source is about to be
+        replaced or deleted
+     -# `copy_file_range(2)`, which copies the data inside the kernel
+     -# reading and writing the data
+
+    The owner, group and permissions of the source are applied to the destination in the same
+    pass (a hard link shares them anyway).
+
+    @param source: name of the file to copy
+    @param destination: name of the new file; an existing file is replaced
+    @param allow_link: `True` if the destination may be a hard link to the source
+    @param sync: `True` if the contents of the destination must be synced to disk
+    @return the method which has been used (`reflink`, `hardlink`, `copy_file_range` or `copy`)
+    """
+    with open(source, 'rb') as src:
+        status = os.fstat(src.fileno())
+        dst = _open_destination(destination)
+        try:
+            if _clone(src, dst):
+                method = METHOD_REFLINK
+            else:
+                if allow_link:
+                    dst.close()
+                    if _link(source, destination):
+                        return METHOD_HARDLINK
+                    dst = _open_destination(destination)
+
+                if _copy_file_range(src, dst, status.st_size):
+                    method = METHOD_COPY_FILE_RANGE
+                else:
+                    src.seek(0)
+                    for block in iter(lambda: src.read(BLOCK_SIZE), b""):
+                        dst.write(block)
+                    method = METHOD_COPY
+
+            dst.flush()
+            os.fchown(dst.fileno(), status.st_uid, status.st_gid)
+            os.fchmod(dst.fileno(), stat.S_IMODE(status.st_mode))
+            if sync:
+                os.fsync(dst.fileno())
+        finally:
+            dst.close()
+    return method
+
+
+def _open_destination(destination):
+    handle = os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    return os.fdopen(handle, 'wb')
+
+
+def _clone(src, dst):
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except (IOError, OSError) as error:
+        if error.errno in UNSUPPORTED_ERRORS:
+            return False
+        raise
+    return True
+
+
+def _link(source, destination):
+    os.unlink(destination)
+    try:
+        os.link(source, destination)
+    except OSError as error:
+        if error.errno in UNSUPPORTED_ERRORS:
+            return False
+        raise
+    return True
+
+
+def _copy_file_range(src, dst, size):
+    if not hasattr(os, 'copy_file_range'):
+        return False
+
+    copied = 0
+    while True:
+        try:
+            count = os.copy_file_range(src.fileno(), dst.fileno(),
+                                       max(size - copied, BLOCK_SIZE))
+        except OSError as error:
+            # falling back is only possible as long as nothing has been copied
+            if copied == 0 and error.errno in UNSUPPORTED_ERRORS:
+                return False
+            raise
+        if count == 0:
+            return True
+        copied += count
@@ -0,0 +1,145 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+# see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ONLYDIR = 0x01000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | \
+    IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+EVENT_HEADER = struct.Struct("iIII")
+
+# events which arrive within this time (in seconds) after the first event are reported together,
+# so that e.g. a package upgrade, which rewrites several files, results in a single notification
+SETTLE_TIME = 0.5
+
+
+class FileMonitor(object):
+    """notifies about changes of files and directories, using inotify(7)
+
+    Files are usually not changed in place, but replaced by renaming a new file (e.g. by `dpkg` or
+    by editors). This is why the parent directory of every watched path is monitored as well.
+    Directories are not monitored recursively.
+
+    If inotify is not available, FileMonitor::wait() simply waits for the timeout to expire and
+    reports that any path may have changed.
+    """
+
+    def __init__(self):
+        self.__watches = dict()
+        self.__libc = None
+        self.__fd = -1
+
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is not None:
+            libc = ctypes.CDLL(libc_name, use_errno=True)
+            if hasattr(libc, "inotify_init1"):
+                self.__fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+                if self.__fd >= 0:
+                    self.__libc = libc
+
+    def is_supported(self):
+        """determines if changes are reported using inotify
+
+        @return `True` if inotify is used; `False` if FileMonitor::wait() just waits for a timeout
+        """
+        return self.__fd >= 0
+
+    def watch(self, path):
+        """starts monitoring a file or directory and its parent directory
+
+        @param path: absolute name of the file or directory; it does not need to exist
+        """
+        for dirname in (path, os.path.dirname(path)):
+            if dirname in self.__watches.values() or not os.path.isdir(dirname):
+                continue
+            if not self.is_supported():
+                continue
+
+            descriptor = self.__libc.inotify_add_watch(self.__fd, dirname.encode('utf-8'),
+                                                       WATCH_MASK | IN_ONLYDIR)
+            if descriptor < 0:
+                error = ctypes.get_errno()
+                raise OSError(error, os.strerror(error), dirname)
+            self.__watches[descriptor] = dirname
+
+    def wait(self, timeout=None):
+        """waits until some monitored path has changed
+
+        @param timeout: maximum time to wait, in seconds, or `None` to wait forever
+        @return set of paths which have changed, which is empty if the timeout has expired, or
+        `None` if any path may have changed (because inotify is not available or has lost events)
+        """
+        if not self.is_supported():
+            time.sleep(timeout if timeout is not None else 60)
+            return None
+
+        readable, _, _ = select.select([self.__fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changes = set()
+        deadline = time.time() + SETTLE_TIME
+        while True:
+            if not self.__read_events(changes):
+                return None
+            remaining = deadline - time.time()
+            if remaining <= 0 or not select.select([self.__fd], [], [], remaining)[0]:
+                return changes
+
+    def __read_events(self, changes):
+        try:
+            buf = os.read(self.__fd, 65536)
+        except OSError as error:
+            if error.errno == errno.EAGAIN:
+                return True
+            raise
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buf):
+            descriptor, mask, _, length = EVENT_HEADER.unpack_from(buf, offset)
+            offset += EVENT_HEADER.size
+            name = buf[offset:offset + length].rstrip(b"\0").decode('utf-8', 'replace')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                return False
+            if descriptor in self.__watches:
+                dirname = self.__watches[descriptor]
+                changes.add(os.path.join(dirname, name) if name else dirname)
+        return True
+
+    def close(self):
+        if self.is_supported():
+            os.close(self.__fd)
+            self.__fd = -1
@@ -0,0 +1,96 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import ctypes
+import ctypes.util
+import os
+
+_LIBC = None
+
+
+def sync_filesystems(paths):
+    """flushes all pending changes of the filesystems which contain some paths to disk
+
+    Every filesystem is synced only once, using `syncfs(2)`, so that the changes of many files
+    (contents, renames and deletions) are made durable at once instead of syncing every file and
+    every directory separately. If `syncfs(2)` is not available, all filesystems are synced using
+    `sync(2)`.
+
+    @param paths: names of files or directories. A path which does not exist is replaced by its
+    nearest existing parent directory
+    @return number of filesystems which have been synced
+    """
+    devices = dict()
+    for path in paths:
+        path = _existing_parent(path)
+        if path is not None:
+            devices.setdefault(os.stat(path).st_dev, path)
+    if len(devices) == 0:
+        return 0
+
+    libc = _libc()
+    if libc is None or not hasattr(libc, "syncfs"):
+        _sync_all(libc)
+        return len(devices)
+
+    for path in devices.values():
+        handle = os.open(path, os.O_RDONLY)
+        try:
+            if libc.syncfs(handle) != 0:
+                error = ctypes.get_errno()
+                raise OSError(error, os.strerror(error), path)
+        finally:
+            os.close(handle)
+    return len(devices)
+
+
+def fsync_directory(directory):
+    """makes changes to the entries of a directory (new, renamed or deleted files) durable
+
+    @param directory: name of the directory
+    """
+    handle = os.open(directory or os.curdir, os.O_RDONLY)
+    try:
+        os.fsync(handle)
+    finally:
+        os.close(handle)
+
+
+def _existing_parent(path):
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+    return path
+
+
+def _sync_all(libc):
+    # os.sync() is not available before Python 3.3
+    if hasattr(os, "sync"):
+        os.sync()
+    elif libc is not None:
+        libc.sync()
+    else:
+        raise OSError(_("unable to sync the filesystems"))
+
+
+def _libc():
+    global _LIBC  # pylint: disable=global-statement
+    if _LIBC is None:
+        libc_name = ctypes.util.find_library("c")
+        _LIBC = ctypes.CDLL(libc_name, use_errno=True) if libc_name is not None else False
+    return _LIBC or None
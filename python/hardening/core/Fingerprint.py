@@ -0,0 +1,59 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import os
+
+
+def fingerprint(*values):
+    """calculates a stable hash value of arbitrary (nested) data
+
+    Dictionaries are hashed independent of their key order, so the same configuration always
+    results in the same fingerprint. Values which cannot be represented in JSON (such as
+    objects or byte strings) are hashed using their `repr()`.
+
+    @param values: lists, dictionaries, strings, numbers, `None` or any other object
+    @return hexadecimal SHA-256 digest as string
+    """
+    serialized = json.dumps(list(values), sort_keys=True, separators=(',', ':'), default=repr)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def path_fingerprint(path):
+    """calculates a hash value of the metadata (but not the contents) of a file or directory
+
+    Directories are traversed recursively, so that every change of a contained file, such as a
+    new modification time, results in a different fingerprint. Symbolic links are not followed.
+
+    @param path: name of a file or directory
+    @return hexadecimal SHA-256 digest as string, or `None` if `path` does not exist
+    """
+    def status(name):
+        entry = os.lstat(name)
+        return [entry.st_mode, entry.st_uid, entry.st_gid, entry.st_size, entry.st_ino,
+                entry.st_mtime, entry.st_ctime]
+
+    if not os.path.lexists(path):
+        return None
+
+    entries = [['.', status(path)]]
+    if os.path.isdir(path) and not os.path.islink(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(dirs + files):
+                name = os.path.join(root, name)
+                entries.append([os.path.relpath(name, path), status(name)])
+    return fingerprint(entries)
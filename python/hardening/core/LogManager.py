@@ -16,6 +16,7 @@
 import logging
 import os
 import inspect
+import threading
 import yaml
 
 from hardening import constants
@@ -45,6 +46,7 @@ class LogManager(object):
 
     def __init__(self):
         self.__loggers = {}
+        self.__lock = threading.Lock()
 
         config_file = os.path.join(
             RuntimeOptions().base_path(), constants.FILENAME_GLOBALCONFIG)
@@ -82,8 +84,9 @@ class LogManager(object):
         if name is None and len(inspect.stack()) > 1:
             name = caller_name().split(".")[-2]
 
-        if name not in self.__loggers:
-            self.__loggers[name] = logging.getLogger(name)
-            self.__loggers[name].setLevel(self.get_loglevel())
-            self.__loggers[name].addHandler(self.get_loghandler())
-        return self.__loggers[name]
+        with self.__lock:
+            if name not in self.__loggers:
+                self.__loggers[name] = logging.getLogger(name)
+                self.__loggers[name].setLevel(self.get_loglevel())
+                self.__loggers[name].addHandler(self.get_loghandler())
+            return self.__loggers[name]
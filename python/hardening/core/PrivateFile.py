@@ -0,0 +1,69 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import stat
+
+from hardening.core.HardeningFailure import HardeningFailure
+
+
+def check_private_directory(dirname):
+    """makes sure that nobody but the current user can have written into a directory
+
+    Data which is read back by later runs (e.g. the cached execution plan) must only be trusted if
+    it is stored in such a directory, because hardening runs as root, and its cache directory may
+    be located in the home directory of the user who has invoked `sudo`.
+
+    @param dirname: name of the directory
+    @raise core::HardeningFailure if `dirname` is a symbolic link, not a directory, not owned by
+    the current user or accessible by other users
+    """
+    _check_private(os.lstat(dirname), dirname, stat.S_ISDIR)
+
+
+def open_private_file(filename, mode='r'):
+    """opens a file for reading, if nobody but the current user can have written it
+
+    The file and its directory must be owned by the current user and must not be accessible by
+    other users (see core::check_private_directory); symbolic links are not followed.
+
+    @param filename: name of the file
+    @param mode: mode, as passed to `open()`; only reading modes are allowed
+    @return file object
+    @raise core::HardeningFailure if the file or its directory is not private
+    @raise OSError if the file cannot be opened, e.g. because it does not exist
+    """
+    assert 'r' in mode and '+' not in mode
+    check_private_directory(os.path.dirname(os.path.abspath(filename)))
+
+    handle = os.open(filename, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+    try:
+        _check_private(os.fstat(handle), filename, stat.S_ISREG)
+    except HardeningFailure:
+        os.close(handle)
+        raise
+    return os.fdopen(handle, mode)
+
+
+def _check_private(stat_result, path, is_expected_type):
+    if not is_expected_type(stat_result.st_mode):
+        raise HardeningFailure(_("refusing to use '%(path)s', because it has an unexpected "
+                                 "file type") % {'path': path})
+    if stat_result.st_uid != os.geteuid():
+        raise HardeningFailure(_("refusing to use '%(path)s', because it is owned by another "
+                                 "user") % {'path': path})
+    if stat.S_IMODE(stat_result.st_mode) & 0o077 != 0:
+        raise HardeningFailure(_("refusing to use '%(path)s', because other users have access "
+                                 "to it") % {'path': path})
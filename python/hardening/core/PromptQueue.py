@@ -0,0 +1,114 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+import threading
+
+import six
+
+from hardening.core.Singleton import singleton
+from hardening.core.ExecutionState import ExecutionState
+
+
+@singleton
+class PromptQueue(object):
+    """runs all user prompts on the main thread, one after the other
+
+    Utils may be set up and run on several worker threads (see core::WorkerPool), but the user
+    can only answer one question at a time, and the terminal should only be used by the main
+    thread. A worker thread which needs to prompt the user puts the prompt into this queue and
+    waits until the main thread has processed it. The main thread processes the queue while it
+    waits for the workers (see WorkerPool::map). Prompts are processed in the order in which they
+    have been issued.
+    """
+
+    def __init__(self):
+        self.__requests = six.moves.queue.Queue()
+
+    def call(self, function, *args, **kwargs):
+        """runs `function` on the main thread and returns its result
+
+        If the current thread is the main thread, `function` is called directly.
+
+        @param function: callable, usually a method of io::Writer
+        @return the return value of `function`. Exceptions raised by `function` are raised in the
+        calling thread.
+        """
+        if self.is_main_thread():
+            return function(*args, **kwargs)
+
+        request = {'call': lambda: function(*args, **kwargs),
+                   'state': ExecutionState().snapshot(),
+                   'done': threading.Event()}
+        self.__requests.put(request)
+        request['done'].wait()
+
+        if 'error' in request:
+            six.reraise(*request['error'])
+        return request['result']
+
+    def process(self, timeout):
+        """processes the pending prompts of the worker threads; must be called by the main thread
+
+        @param timeout: maximum time to wait for a prompt, in seconds
+        """
+        assert self.is_main_thread()
+        for request in self.__pending_requests(timeout):
+            # display the prompt as if it was issued by the util of the worker thread
+            state = ExecutionState().snapshot()
+            ExecutionState().restore(request['state'])
+
+            # pylint: disable=bare-except
+            try:
+                request['result'] = request['call']()
+            except:
+                request['error'] = sys.exc_info()
+            finally:
+                ExecutionState().restore(state)
+                request['done'].set()
+
+    def cancel(self, timeout):
+        """aborts the pending prompts of the worker threads by raising KeyboardInterrupt in the
+        worker threads
+
+        @param timeout: maximum time to wait for a prompt, in seconds
+        """
+        for request in self.__pending_requests(timeout):
+            try:
+                raise KeyboardInterrupt()
+            except KeyboardInterrupt:
+                request['error'] = sys.exc_info()
+            request['done'].set()
+
+    def __pending_requests(self, timeout):
+        try:
+            yield self.__requests.get(timeout=timeout)
+            while True:
+                yield self.__requests.get_nowait()
+        except six.moves.queue.Empty:
+            return
+
+    @staticmethod
+    def is_main_thread():
+        """determines if the current thread is the main thread, which processes the prompts
+
+        @return `True` if the current thread is the main thread
+        """
+        if hasattr(threading, 'main_thread'):
+            return threading.current_thread() is threading.main_thread()
+
+        # threading.main_thread() is not available in python 2
+        # pylint: disable=protected-access
+        return isinstance(threading.current_thread(), threading._MainThread)
@@ -14,6 +14,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import argparse
+import errno
 import inspect
 import os
 import sys
@@ -30,8 +31,13 @@ except ImportError:
     pass
 
 from hardening.core.Singleton import singleton
+from hardening.core.Fingerprint import fingerprint
 import hardening
 
+# maximum number of symbolic links which are followed while resolving a path below a root
+# filesystem, as in Linux (see `path_resolution(7)`)
+MAX_SYMLINKS = 40
+
 MODE_INTERACTIVE = 'interactive'
 MODE_DIFFERENCE = 'diff'
 MODE_SILENT = 'silent'
@@ -41,6 +47,16 @@ ARGUMENT_MODE = 'mode'
 ARGUMENT_LANG = 'lang'
 ARGUMENT_LOG = 'log'
 ARGUMENT_DOCUMENTATION = 'documentation'
+ARGUMENT_JOBS = 'jobs'
+ARGUMENT_NOCACHE = 'no_cache'
+ARGUMENT_TIMINGREPORT = 'timing_report'
+ARGUMENT_CHECKPOINT = 'checkpoint'
+ARGUMENT_RESUME = 'resume'
+ARGUMENT_FULL = 'full'
+ARGUMENT_ROOT = 'root'
+ARGUMENT_DAEMON = 'daemon'
+ARGUMENT_WATCH = 'watch'
+ARGUMENT_RESTORE = 'restore'
 
 
 @singleton
@@ -62,6 +78,16 @@ class RuntimeOptions(object):
             | Difference Mode | `--mode=diff` | In contrast to the interactive mode, not every change to configuration file is confirmed in this mode. Instead, a (unified) difference between the original and the altered version of the file is displayed and must be confirmed by the user. The user has the choice between all and nothing when using this mode. |
             | Pretend Mode | `--mode=check-only` | When the scripts run in pretend mode, no changed will be made at all. This mode is useful when combined with the Logging mode |
             | Logging | `--log` | All changes to the system will be written to the core::ChangeLog::ChangeLog. This output can be redirected to a file and run later as script.  |
+            | Jobs | `--jobs N` | Run utils which work on independent transactions on up to `N` worker threads. In interactive mode, only the setup phase (which gathers facts, see scheduler::UtilExecutor) uses more than one worker; its prompts are displayed one after the other (see core::PromptQueue). |
+            | No Cache | `--no-cache` | Do not use the execution plan which has been cached by a previous run in silent mode, but calculate a new one. |
+            | Timing Report | `--timing-report FILE` | Measure wall-clock and CPU time of every util, module, transaction and subprocess and write them as JSON to `FILE` (see core::TimingReport). |
+            | Checkpoints | `--checkpoint` | Commit the changes of every module as soon as the module is finished and record this in a journal in the backup directory. If the run is interrupted, only the changes of the current module are rolled back. Has no effect in pretend mode. |
+            | Resume | `--resume` | Like `--checkpoint`, but skip all modules which have been committed by the last, interrupted run. |
+            | Full Run | `--full` | In silent mode, utils whose inputs and target files are unchanged since the last successful run are skipped (see scheduler::StateStore). This option runs all utils. |
+            | Root Directory | `--root DIR` | Harden the unpacked root filesystem in `DIR` instead of the running system. All files are read from and written to `DIR`, commands are run using `chroot`. If this option is given more than once, every root filesystem is hardened by a separate process, up to `--jobs` at the same time (see scheduler::BatchDriver); this requires silent or pretend mode. |
+            | Daemon | `--daemon SOCKET` | Keep running and accept `check` and `apply` requests on the UNIX socket `SOCKET` (see scheduler::Daemon). Configuration and host facts are kept in memory until the files they have been read from change. The `--mode` option is ignored; checks run in pretend mode, changes are applied in silent mode. |
+            | Watch | `--watch` | Run all modules once and keep running afterwards. Whenever a file or directory which is changed by some util is modified, the utils which work on it are run again (see scheduler::Watcher). Requires silent or pretend mode. |
+            | Restore | `--restore TIMESTAMP` | Restore the state before the run whose backups have been written to the directory `TIMESTAMP` in the backup directory, using the manifest of the run (see scheduler::Restorer). In pretend mode, the steps of the restore are only displayed; in interactive and difference mode, they must be confirmed. Files are restored on up to `--jobs` worker threads. |
             """
 
     def __init__(self):
@@ -84,6 +110,59 @@ class RuntimeOptions(object):
                                    metavar='logfile',
                                    help="Display a log of applied changes; "
                                         "you can use '-' as filename to log to stdout")
+        self.__parser.add_argument("--jobs",
+                                   dest=ARGUMENT_JOBS,
+                                   metavar='N',
+                                   type=int,
+                                   default=1,
+                                   help="Run independent hardening steps on up to N worker "
+                                        "threads. Default is 1")
+        self.__parser.add_argument("--no-cache",
+                                   dest=ARGUMENT_NOCACHE,
+                                   action='store_true',
+                                   help="Do not reuse the execution plan of a previous run")
+        self.__parser.add_argument("--timing-report",
+                                   dest=ARGUMENT_TIMINGREPORT,
+                                   metavar='FILE',
+                                   help="Write the time spent in every util, module, transaction "
+                                        "and subprocess as JSON to FILE")
+        self.__parser.add_argument("--checkpoint",
+                                   dest=ARGUMENT_CHECKPOINT,
+                                   action='store_true',
+                                   help="Commit the changes of every module separately, so that "
+                                        "an interrupted run can be resumed")
+        self.__parser.add_argument("--resume",
+                                   dest=ARGUMENT_RESUME,
+                                   action='store_true',
+                                   help="Continue the last interrupted run at its last "
+                                        "checkpoint; implies --checkpoint")
+        self.__parser.add_argument("--full",
+                                   dest=ARGUMENT_FULL,
+                                   action='store_true',
+                                   help="Run all utils, even if their inputs are unchanged since "
+                                        "the last run")
+        self.__parser.add_argument("--root",
+                                   dest=ARGUMENT_ROOT,
+                                   metavar='DIR',
+                                   action='append',
+                                   default=[],
+                                   help="Harden the root filesystem located in DIR instead of the "
+                                        "running system. May be given more than once")
+        self.__parser.add_argument("--daemon",
+                                   dest=ARGUMENT_DAEMON,
+                                   metavar='SOCKET',
+                                   help="Keep running and accept check and apply requests on the "
+                                        "UNIX socket SOCKET")
+        self.__parser.add_argument("--watch",
+                                   dest=ARGUMENT_WATCH,
+                                   action='store_true',
+                                   help="Keep running and check or harden files again as soon as "
+                                        "they are modified")
+        self.__parser.add_argument("--restore",
+                                   dest=ARGUMENT_RESTORE,
+                                   metavar='TIMESTAMP',
+                                   help="Restore the state before the run whose backup has been "
+                                        "written to TIMESTAMP in the backup directory")
         self.__parser.add_argument("--version",
                                    action='version',
                                    help="Display the version of this tool.",
@@ -99,6 +178,7 @@ class RuntimeOptions(object):
             sys.exit(0)
 
         self.__parge_language()
+        self.__parse_root()
         self.__parse_log()
 
         self.__mode = self.__args[ARGUMENT_MODE]
@@ -123,6 +203,28 @@ class RuntimeOptions(object):
         else:
             self.__logfile = None
 
+    def __parse_root(self):
+        roots = list()
+        for root in self.__args[ARGUMENT_ROOT]:
+            root = os.path.abspath(root)
+            if not os.path.isdir(root):
+                self.__parser.error("invalid root directory: '%s'" % root)
+            if root not in roots:
+                roots.append(root)
+        if len(roots) > 1 and self.__args[ARGUMENT_MODE] not in (MODE_SILENT, MODE_PRETEND):
+            self.__parser.error("more than one --root requires --mode=%s or --mode=%s"
+                                % (MODE_SILENT, MODE_PRETEND))
+        if len(roots) > 1 and self.__args[ARGUMENT_DAEMON] is not None:
+            self.__parser.error("--daemon cannot be used with more than one --root")
+        if self.__args[ARGUMENT_WATCH]:
+            if self.__args[ARGUMENT_MODE] not in (MODE_SILENT, MODE_PRETEND):
+                self.__parser.error("--watch requires --mode=%s or --mode=%s"
+                                    % (MODE_SILENT, MODE_PRETEND))
+            if len(roots) > 1 or self.__args[ARGUMENT_DAEMON] is not None:
+                self.__parser.error("--watch cannot be used with --daemon or more than one "
+                                    "--root")
+        self.__roots = roots
+
     def __parge_language(self):
         if ARGUMENT_LANG in self.__args.keys() and self.__args[ARGUMENT_LANG] is not None:
             # get locales directory
@@ -209,6 +311,12 @@ class RuntimeOptions(object):
         """
         self.__mode = MODE_SILENT
 
+    def enable_pretend_mode(self):
+        """ enables the pretend mode
+
+        """
+        self.__mode = MODE_PRETEND
+
     def pretend_mode(self):
         """ determines if pretend mode is activated
 
@@ -223,6 +331,182 @@ class RuntimeOptions(object):
         """
         return self.__logfile is not None
 
+    def jobs(self):
+        """ determines how many worker threads may be used to run utils and transactions
+
+        In interactive mode the user is prompted for nearly every change, so we must not run
+        more than one worker in that case.
+
+        @return number of worker threads, at least `1`
+        """
+        if self.interactive_mode():
+            return 1
+        return max(1, self.__args[ARGUMENT_JOBS])
+
+    def setup_jobs(self):
+        """ determines how many worker threads may be used to set up utils
+
+        In contrast to the other phases, the setup phase is run concurrently in interactive mode as
+        well: it does not change anything, and prompts are serialized by core::PromptQueue.
+
+        @return number of worker threads, at least `1`
+        """
+        return max(1, self.__args[ARGUMENT_JOBS])
+
+    def use_cache(self):
+        """ determines if data cached by previous runs (such as the execution plan) may be used
+
+        @return `True` unless `--no-cache` has been specified
+        """
+        return not self.__args[ARGUMENT_NOCACHE]
+
+    def timing_report(self):
+        """ determines where the timing report shall be written to
+
+        @return filename, or `None` if no timing report has been requested
+        """
+        return self.__args[ARGUMENT_TIMINGREPORT]
+
+    def checkpoint_mode(self):
+        """ determines if the changes of every module shall be committed separately
+
+        @return `True` if `--checkpoint` or `--resume` has been specified and pretend mode is not
+        active; `False` otherwise
+        """
+        return (self.__args[ARGUMENT_CHECKPOINT] or self.__args[ARGUMENT_RESUME]) and \
+            not self.pretend_mode()
+
+    def resume_mode(self):
+        """ determines if the last interrupted run shall be resumed
+
+        @return `True` if `--resume` has been specified and checkpoints are enabled
+        """
+        return self.__args[ARGUMENT_RESUME] and self.checkpoint_mode()
+
+    def incremental_mode(self):
+        """ determines if utils whose inputs are unchanged since the last run may be skipped
+
+        @return `True` in silent mode, unless `--full` has been specified
+        """
+        return self.silent_mode() and not self.__args[ARGUMENT_FULL]
+
+    def daemon_socket(self):
+        """ determines on which socket requests shall be accepted in daemon mode
+
+        @return file name of the UNIX socket, or `None` if daemon mode is not active
+        """
+        return self.__args[ARGUMENT_DAEMON]
+
+    def daemon_mode(self):
+        """ determines if daemon mode is activated. In daemon mode, the user is never prompted to
+        select modules
+
+        @return `True` if daemon mode is active; `False` otherwise
+        """
+        return self.__args[ARGUMENT_DAEMON] is not None
+
+    def watch_mode(self):
+        """ determines if files shall be checked or hardened again as soon as they are modified
+
+        @return `True` if `--watch` has been specified
+        """
+        return self.__args[ARGUMENT_WATCH]
+
+    def restore_timestamp(self):
+        """ determines which run shall be restored
+
+        @return name of the backup directory of the run (e.g. `20170301_12:00:00`), or `None` if
+        `--restore` has not been specified
+        """
+        return self.__args[ARGUMENT_RESTORE]
+
+    def unattended_mode(self):
+        """ determines if this tool runs without a user who could answer prompts, i.e. in silent
+        mode, daemon mode or watch mode
+
+        @return `True` if the user must not be asked to select modules; `False` otherwise
+        """
+        return self.silent_mode() or self.daemon_mode() or self.watch_mode()
+
+    def root_paths(self):
+        """ returns all root filesystems which shall be hardened
+
+        @return list of absolute directory names; empty if the running system shall be hardened
+        """
+        return list(self.__roots)
+
+    def root_path(self):
+        """ returns the root filesystem which is hardened by this process
+
+        @return absolute directory name, or `None` if the running system is hardened
+        """
+        if len(self.__roots) == 1:
+            return self.__roots[0]
+        return None
+
+    @staticmethod
+    def root_identifier(root):
+        """ returns a short name for a root filesystem, which can be used in file names
+
+        @param root: absolute directory name of the root filesystem
+        @return name of the directory, followed by a hash of the full path
+        """
+        return "%s-%s" % (os.path.basename(root.rstrip(os.sep)) or "root", fingerprint(root)[:8])
+
+    def rebase_path(self, path):
+        """ maps an absolute path of the hardened system to a path on the local system
+
+        Symbolic links below the root filesystem are resolved the way the hardened system resolves
+        them: absolute links (such as `etc/ssh -> /etc/ssh`) are relative to the root directory,
+        and `..` never leads above it. So the resulting path never refers to a file outside the
+        root filesystem.
+
+        @param path: absolute path, such as `/etc/ssh/sshd_config`
+        @return `path` below the root filesystem, or `path` itself if no root filesystem is used
+        @raise OSError if too many symbolic links are encountered
+        """
+        root = self.root_path()
+        if root is None or path is None:
+            return path
+
+        # stack of the path components which still have to be resolved, the next one is last
+        pending = [part for part in reversed(path.split(os.sep)) if part]
+        resolved = list()
+        links = 0
+        while len(pending) > 0:
+            part = pending.pop()
+            if part == os.curdir:
+                continue
+            if part == os.pardir:
+                if len(resolved) > 0:
+                    resolved.pop()
+                continue
+
+            candidate = os.path.join(root, *(resolved + [part]))
+            if not os.path.islink(candidate):
+                resolved.append(part)
+                continue
+
+            links += 1
+            if links > MAX_SYMLINKS:
+                raise OSError(errno.ELOOP, os.strerror(errno.ELOOP), path)
+            target = os.readlink(candidate)
+            if os.path.isabs(target):
+                resolved = list()
+            pending.extend(part for part in reversed(target.split(os.sep)) if part)
+        return os.path.join(root, *resolved)
+
+    def rebase_command(self, command):
+        """ prepares a command to be run inside the hardened system
+
+        @param command: command as list of arguments
+        @return `command`, prefixed by `chroot` if a root filesystem is used
+        """
+        root = self.root_path()
+        if root is None:
+            return command
+        return ["/usr/sbin/chroot", root] + list(command)
+
     def is_documentation_enabled(self):
         return ARGUMENT_DOCUMENTATION in self.__args.keys() and \
             self.__args[ARGUMENT_DOCUMENTATION]
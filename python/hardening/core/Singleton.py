@@ -14,6 +14,11 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import functools
+import threading
+
+# guards the creation of singleton instances; this must be reentrant, because the constructor of
+# one singleton may very well request another singleton
+SINGLETON_LOCK = threading.RLock()
 
 
 def singleton(cls):
@@ -35,15 +40,23 @@ def singleton(cls):
     @functools.wraps(cls.__new__)
     def singleton_new(singleton_cls, *args, **kw):
         instance = singleton_cls.__dict__.get('__it__')
-        if instance is not None:
+        if instance is not None and singleton_cls.__dict__.get('__initialized__'):
             return instance
 
-        # remove class object from args
-        args = args[1:]
+        with SINGLETON_LOCK:
+            # either another thread has created the instance while we were waiting, or the
+            # constructor of this very instance requests it (e.g. Info and its InfoHandlers)
+            instance = singleton_cls.__dict__.get('__it__')
+            if instance is not None:
+                return instance
+
+            # remove class object from args
+            args = args[1:]
 
-        singleton_cls.__it__ = instance = singleton_cls.__new_original__(
-            singleton_cls, *args, **kw)
-        instance.__init_original__(*args, **kw)
+            singleton_cls.__it__ = instance = singleton_cls.__new_original__(
+                singleton_cls, *args, **kw)
+            instance.__init_original__(*args, **kw)
+            singleton_cls.__initialized__ = True
         return instance
 
     cls.__new__ = classmethod(singleton_new)
@@ -51,3 +64,16 @@ def singleton(cls):
     cls.__init__ = object.__init__
 
     return cls
+
+
+def reset_singleton(cls):
+    """discards the instance of a Singleton, so that the next call creates a new instance
+
+    This is used by long-running processes (see scheduler::Daemon) to drop cached state. References
+    to the old instance, which should not exist anyway, remain valid.
+
+    @param cls: class which has been decorated using core::singleton
+    """
+    with SINGLETON_LOCK:
+        cls.__it__ = None
+        cls.__initialized__ = False
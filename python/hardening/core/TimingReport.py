@@ -0,0 +1,136 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import hardening
+from hardening.core.RuntimeOptions import RuntimeOptions
+from hardening.core.Singleton import singleton
+
+# time.monotonic and time.thread_time are not available in Python 2
+_wall_time = getattr(time, 'monotonic', time.time)
+
+
+def _thread_time():
+    if hasattr(time, 'thread_time'):
+        return time.thread_time()
+    times = os.times()
+    return times[0] + times[1]
+
+
+def _children_time():
+    times = os.times()
+    return times[2] + times[3]
+
+
+@singleton
+class TimingReport(object):
+    """collects wall-clock and CPU times of utils, modules, transactions and subprocesses
+
+    Measurements are only taken if a report has been requested using `--timing-report FILE`;
+    otherwise TimingReport::measure does nothing. The report is written as JSON and contains
+    every single measurement (`entries`) as well as the accumulated times per category and name
+    (`summary`). The times of a module are the sums of the times of all its utils.
+
+    The CPU time of utils and transactions is the CPU time of the thread which ran them; the CPU
+    time of subprocesses is the CPU time of all child processes which terminated in the meantime,
+    so it may be inaccurate if more than one worker thread is used (see `--jobs`).
+    """
+
+    UTIL = 'util'
+    MODULE = 'module'
+    TRANSACTION = 'transaction'
+    SUBPROCESS = 'subprocess'
+
+    def __init__(self):
+        self.__filename = RuntimeOptions().timing_report()
+        self.__entries = list()
+        self.__lock = threading.Lock()
+        self.__started = datetime.now()
+        self.__start_wall = _wall_time()
+        self.__start_cpu = sum(os.times()[:4])
+
+    def is_enabled(self):
+        return self.__filename is not None
+
+    @contextlib.contextmanager
+    def measure(self, category, name, **details):
+        """measures the time which is spent in a `with` block
+
+        @param category: one of TimingReport.UTIL, TimingReport.TRANSACTION or
+        TimingReport.SUBPROCESS
+        @param name: name of the measured object, e.g. the url of a transaction
+        @param details: additional information which will be stored with the measurement
+        """
+        if not self.is_enabled():
+            yield
+            return
+
+        cpu_time = _children_time if category == TimingReport.SUBPROCESS else _thread_time
+        start_wall = _wall_time()
+        start_cpu = cpu_time()
+        try:
+            yield
+        finally:
+            entry = {'category': category,
+                     'name': name,
+                     'start': start_wall - self.__start_wall,
+                     'wall': _wall_time() - start_wall,
+                     'cpu': cpu_time() - start_cpu}
+            entry.update(details)
+            with self.__lock:
+                self.__entries.append(entry)
+
+    def get_report(self):
+        """creates the timing report
+
+        @return dictionary which can be serialized to JSON
+        """
+        with self.__lock:
+            entries = list(self.__entries)
+
+        summary = dict()
+        for entry in entries:
+            keys = [(entry['category'], entry['name'])]
+            if entry['category'] == TimingReport.UTIL and entry.get('module') is not None:
+                keys.append((TimingReport.MODULE, entry['module']))
+
+            for category, name in keys:
+                total = summary.setdefault(category, dict()).setdefault(
+                    name, {'count': 0, 'wall': 0.0, 'cpu': 0.0})
+                total['count'] += 1
+                total['wall'] += entry['wall']
+                total['cpu'] += entry['cpu']
+
+        return {'version': hardening.__version__,
+                'started': self.__started.isoformat(),
+                'wall': _wall_time() - self.__start_wall,
+                'cpu': sum(os.times()[:4]) - self.__start_cpu,
+                'summary': summary,
+                'entries': entries}
+
+    def store_report(self):
+        """writes the timing report to the file which has been specified using `--timing-report`
+        """
+        if not self.is_enabled():
+            return
+
+        with open(self.__filename, 'w') as report_file:
+            json.dump(self.get_report(), report_file, indent=2, sort_keys=True)
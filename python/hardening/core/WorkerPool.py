@@ -0,0 +1,101 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+import threading
+
+import six
+
+from hardening.core.PromptQueue import PromptQueue
+
+
+class WorkerPool(object):
+    """runs a function for a number of items on a bounded number of worker threads
+
+    Most of the work done by the hardening utils is waiting for file I/O and subprocesses, so
+    threads are sufficient here. In contrast to multiprocessing.pool.ThreadPool, every exception
+    raised by a worker (including SystemExit and KeyboardInterrupt, which are used to abort the
+    hardening) is passed on to the caller of WorkerPool::map. After the first failure no new items
+    are started; items which are already running are allowed to finish.
+
+    While the main thread waits for the workers, it processes their prompts (see
+    core::PromptQueue).
+    """
+
+    def __init__(self, jobs=1):
+        self.__jobs = max(1, int(jobs))
+
+    def jobs(self):
+        return self.__jobs
+
+    def map(self, function, items):
+        """calls `function` for every entry of `items`
+
+        @param function: callable which takes exactly one argument
+        @param items: iterable of arguments
+        @return list of the results, in the same order as `items`
+        """
+        items = list(items)
+        if self.__jobs == 1 or len(items) <= 1:
+            return [function(item) for item in items]
+
+        results = [None] * len(items)
+        failures = list()
+        pending = six.moves.queue.Queue()
+        for index, item in enumerate(items):
+            pending.put((index, item))
+
+        def worker():
+            while len(failures) == 0:
+                try:
+                    index, item = pending.get_nowait()
+                except six.moves.queue.Empty:
+                    return
+
+                # pylint: disable=bare-except
+                try:
+                    results[index] = function(item)
+                except:
+                    failures.append(sys.exc_info())
+                    return
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(min(self.__jobs, len(items)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        # prompts of the workers are processed by the main thread (see core::PromptQueue)
+        is_main_thread = PromptQueue.is_main_thread()
+        try:
+            for thread in threads:
+                # join() without timeout cannot be interrupted by Ctrl-C
+                while thread.is_alive():
+                    if is_main_thread:
+                        PromptQueue().process(0.1)
+                    else:
+                        thread.join(0.1)
+        except KeyboardInterrupt:
+            failures.insert(0, sys.exc_info())
+            for thread in threads:
+                while thread.is_alive():
+                    if is_main_thread:
+                        PromptQueue().cancel(0.1)
+                    else:
+                        thread.join(0.1)
+
+        if len(failures) > 0:
+            six.reraise(*failures[0])
+        return results
@@ -17,5 +17,13 @@ from hardening.core.ChangeLog import ChangeLog
 from hardening.core.HardeningFailure import HardeningFailure
 from hardening.core.LogManager import LogManager
 from hardening.core.RuntimeOptions import RuntimeOptions
-from hardening.core.Singleton import singleton
+from hardening.core.Singleton import singleton, reset_singleton
 from hardening.core.ExecutionState import ExecutionState
+from hardening.core.PromptQueue import PromptQueue
+from hardening.core.WorkerPool import WorkerPool
+from hardening.core.FileMonitor import FileMonitor
+from hardening.core.Fingerprint import fingerprint, path_fingerprint
+from hardening.core.TimingReport import TimingReport
+from hardening.core.FileCopy import copy_file
+from hardening.core.FileSync import sync_filesystems, fsync_directory
+from hardening.core.PrivateFile import check_private_directory, open_private_file
@@ -91,7 +91,7 @@ class Condition(object):
 
     @staticmethod
     def get_has_sshd_config(*_):
-        return os.path.isfile("/etc/ssh/sshd_config")
+        return os.path.isfile(core.RuntimeOptions().rebase_path("/etc/ssh/sshd_config"))
 
     @staticmethod
     def get_has_network_interface(index, *_):
@@ -104,14 +104,14 @@ class Condition(object):
 
     @staticmethod
     def get_has_service(svcname):
-        process = subprocess.Popen(["/bin/systemctl",
-                                    "is-enabled",
-                                    svcname,
-                                    "--quiet"],
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE)
-
-        process.communicate()
+        cmd = core.RuntimeOptions().rebase_command(
+            ["/bin/systemctl", "is-enabled", svcname, "--quiet"])
+        with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+            process = subprocess.Popen(cmd,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE)
+
+            process.communicate()
         if process.returncode != 0:
             return False
         else:
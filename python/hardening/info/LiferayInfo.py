@@ -14,8 +14,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import threading
 from hardening.core import singleton
-from hardening import io
+from hardening import core, io
 from hardening.info import InfoHandler
 
 
@@ -30,14 +31,17 @@ class LiferayInfo(object):
     def __init__(self, *args, **kwargs):
         super(self.__class__, self).__init__(*args, **kwargs)
         self.__liferay_home = "/opt/liferay/liferay-home"
+        # utils may be set up concurrently, but the user should be asked only once
+        self.__lock = threading.Lock()
 
     def get_home(self):
-        if os.path.exists(self.__liferay_home):
-            return self.__liferay_home
+        with self.__lock:
+            if os.path.exists(core.RuntimeOptions().rebase_path(self.__liferay_home)):
+                return self.__liferay_home
 
-        self.__liferay_home = io.create_writer().prompt_user_input(
-            _("Please type the path of your liferay home directory"),
-            default=self.__liferay_home,
-            validator=os.path.isdir)
+            self.__liferay_home = io.create_writer().prompt_user_input(
+                _("Please type the path of your liferay home directory"),
+                default=self.__liferay_home,
+                validator=lambda path: os.path.isdir(core.RuntimeOptions().rebase_path(path)))
 
-        return self.__liferay_home
+            return self.__liferay_home
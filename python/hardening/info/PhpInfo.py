@@ -14,10 +14,11 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import threading
 from hardening.info import InfoHandler
 from hardening.info.lib import PackageManager
 from hardening.core import singleton
-from hardening import io
+from hardening import core, io
 
 
 @singleton
@@ -30,11 +31,13 @@ class PhpInfo(object):
     def __init__(self, *args, **kwargs):
         super(self.__class__, self).__init__(*args, **kwargs)
         self.__php_ini = "/etc/php5/fpm/php.ini"
+        # utils may be set up concurrently, but the user should be asked only once
+        self.__lock = threading.Lock()
 
-        if not os.path.exists(self.__php_ini):
+        if not os.path.exists(core.RuntimeOptions().rebase_path(self.__php_ini)):
             self.__php_ini = "/etc/php5/php.ini"
 
-            if not os.path.exists(self.__php_ini):
+            if not os.path.exists(core.RuntimeOptions().rebase_path(self.__php_ini)):
                 self.__php_ini = None
 
     def get_php_ini(self):
@@ -42,11 +45,12 @@ class PhpInfo(object):
 
         Currently, we simply return `/etc/php5/fpm/php.ini`
         """
-        if self.__php_ini is None:
-            self.__php_ini = io.create_writer().prompt_user_input(message=_(
-                "Please specify the full path to your PHP 'php.ini' file. "
-                "This is by default located at '/etc/php5/php.ini' or '/etc/php5/fpm/php.ini' "
-                "but was not found there."))
+        with self.__lock:
+            if self.__php_ini is None:
+                self.__php_ini = io.create_writer().prompt_user_input(message=_(
+                    "Please specify the full path to your PHP 'php.ini' file. "
+                    "This is by default located at '/etc/php5/php.ini' or "
+                    "'/etc/php5/fpm/php.ini' but was not found there."))
 
         return "file:" + self.__php_ini
 
@@ -15,8 +15,9 @@
 
 import os
 import sys
+import threading
 from hardening.info import InfoHandler
-from hardening import io
+from hardening import core, io
 from hardening.core import singleton
 
 
@@ -31,24 +32,27 @@ class PloneInfo(object):
     def __init__(self, *args, **kwargs):
         super(self.__class__, self).__init__(*args, **kwargs)
         self.__plone_buildout = None
+        # utils may be set up concurrently, but the user should be asked only once
+        self.__lock = threading.Lock()
 
     def get_buildout(self):
         """
         Ask user for the location of the plone buildout directory
         """
-        while self.__plone_buildout is None:
-            self.__plone_buildout = io.create_writer().prompt_user_input(message=_(
-                "Please specify the full path to your plone buildout directory. "
-                "This directory is by default located in /opt/plone/ and contains the plone "
-                "buildout.cfg. E.g.: /opt/plone/buildout/"))
-            if (os.path.isdir(self.__plone_buildout) and
-                    os.path.isdir(os.path.join(self.__plone_buildout, "var"))):
-                return "dir:" + self.__plone_buildout
-            else:
-                self.__plone_buildout = None
-                if not io.create_writer().prompt_user_yesno(message=_(
-                        "The specified directory does not exists or is not the plone buildout "
-                        "directory. Do you want to specify the path to your plone buildout "
-                        "direcctory again? If your press \"no\" the script will abort.")):
-                    sys.exit(0)
-        return "dir:" + self.__plone_buildout
+        with self.__lock:
+            while self.__plone_buildout is None:
+                self.__plone_buildout = io.create_writer().prompt_user_input(message=_(
+                    "Please specify the full path to your plone buildout directory. "
+                    "This directory is by default located in /opt/plone/ and contains the plone "
+                    "buildout.cfg. E.g.: /opt/plone/buildout/"))
+                buildout = core.RuntimeOptions().rebase_path(self.__plone_buildout)
+                if os.path.isdir(buildout) and os.path.isdir(os.path.join(buildout, "var")):
+                    return "dir:" + self.__plone_buildout
+                else:
+                    self.__plone_buildout = None
+                    if not io.create_writer().prompt_user_yesno(message=_(
+                            "The specified directory does not exists or is not the plone buildout "
+                            "directory. Do you want to specify the path to your plone buildout "
+                            "direcctory again? If your press \"no\" the script will abort.")):
+                        sys.exit(0)
+            return "dir:" + self.__plone_buildout
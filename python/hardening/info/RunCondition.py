@@ -0,0 +1,171 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import six
+
+from hardening import core, info
+
+INFO_PREFIX = "info:"
+CONDITION_PREFIX = INFO_PREFIX + "condition:"
+NEGATION_PREFIX = CONDITION_PREFIX + "not:"
+
+OPERATOR_AND = 'and'
+OPERATOR_OR = 'or'
+OPERATOR_NOT = 'not'
+
+# transactions (see storage::Transaction::__str__) which change the result of a condition when
+# they are committed; the key is the name of the method of info::Condition without `get_`
+FACT_TRANSACTIONS = {
+    'has_service': lambda svcname, *_: ["service:" + svcname],
+    'has_sshd_config': lambda *_: [
+        "file:" + core.RuntimeOptions().rebase_path("/etc/ssh/sshd_config")],
+}
+
+
+class RunCondition(object):
+    # noinspection PyPep8
+    # pylint: disable=line-too-long
+    """a compiled `run-if` expression
+
+    `run-if` expressions are written in the following syntax:
+
+    | Expression | Evaluates to `True` if |
+    | ---------- | ---------------------- |
+    | `true`, `false` | the value is `true` |
+    | `"info:condition:..."` (or any other string) | the interpolated string (see info::Configuration::interpolate_atom) is not empty and not `False` |
+    | `[expr1, expr2, ...]` | every expression evaluates to `True` |
+    | `{and: [expr1, expr2, ...]}` | every expression evaluates to `True` |
+    | `{or: [expr1, expr2, ...]}` | at least one expression evaluates to `True` |
+    | `{not: expr}` | `expr` evaluates to `False` |
+
+    Expressions are evaluated from left to right and the evaluation stops as soon as the result
+    is known, so conditions which are expensive to evaluate (such as
+    `info:condition:has_package_installed:...`, which runs `dpkg-query`) should be placed at the
+    end. The results of `info:condition:...` strings are cached (see info::RunConditions).
+    """
+
+    def __init__(self, expression):
+        self.__evaluate = self.__compile(expression)
+
+    def evaluate(self):
+        """evaluates the expression
+
+        @return `True` or `False`
+        """
+        return self.__evaluate()
+
+    @staticmethod
+    def __compile(expression):
+        if expression is None:
+            return lambda: True
+
+        if isinstance(expression, bool):
+            return lambda: expression
+
+        if isinstance(expression, six.string_types):
+            if expression.startswith(NEGATION_PREFIX):
+                # share the cached result with the positive condition
+                operand = RunCondition.__compile(
+                    CONDITION_PREFIX + expression[len(NEGATION_PREFIX):])
+                return lambda: not operand()
+            if expression.startswith(CONDITION_PREFIX) and "{" not in expression:
+                return lambda: RunConditions().evaluate_condition(expression)
+            return lambda: bool(info.Configuration().interpolate_atom(expression))
+
+        if isinstance(expression, list):
+            return RunCondition.__compile_and(expression)
+
+        if isinstance(expression, dict) and len(expression) == 1:
+            (operator, operands), = list(expression.items())
+            if operator == OPERATOR_AND and isinstance(operands, list):
+                return RunCondition.__compile_and(operands)
+            if operator == OPERATOR_OR and isinstance(operands, list):
+                compiled = [RunCondition.__compile(o) for o in operands]
+                return lambda: any(operand() for operand in compiled)
+            if operator == OPERATOR_NOT:
+                operand = RunCondition.__compile(operands)
+                return lambda: not operand()
+
+        raise SyntaxError(_("invalid run-if expression: %(expression)s")
+                          % {'expression': repr(expression)})
+
+    @staticmethod
+    def __compile_and(operands):
+        compiled = [RunCondition.__compile(o) for o in operands]
+        return lambda: all(operand() for operand in compiled)
+
+
+@core.singleton
+class RunConditions(object):
+    """compiles `run-if` expressions (see info::RunCondition) and caches the results of the
+    `info:condition:...` strings they contain
+
+    Many sections and utils use the same conditions, so every expression is compiled and every
+    condition is evaluated only once. Cached results are discarded by Info::invalidate_facts, and
+    by RunConditions::invalidate when a transaction changes a fact a condition depends on (see
+    `FACT_TRANSACTIONS`).
+    """
+
+    def __init__(self):
+        # key: fingerprint of the expression, value: RunCondition
+        self.__compiled = dict()
+        # key: condition string, value: result
+        self.__results = dict()
+        # key: transaction (see storage::Transaction::__str__), value: set of condition strings
+        self.__dependencies = dict()
+
+    def is_true(self, expression):
+        """evaluates a `run-if` expression
+
+        @param expression: expression as read from the configuration, without interpolation
+        @return `True` or `False`
+        """
+        key = core.fingerprint(expression)
+        if key not in self.__compiled:
+            self.__compiled[key] = RunCondition(expression)
+        return self.__compiled[key].evaluate()
+
+    def evaluate_condition(self, condition):
+        """returns the (cached) result of an `info:condition:...` string
+
+        @param condition: condition string, including the `info:` prefix
+        @return `True` or `False`
+        """
+        if condition in self.__results:
+            result = self.__results[condition]
+            # the execution plan depends on this fact (see scheduler::PlanCache)
+            info.Info().record_fact(condition[len(INFO_PREFIX):], result)
+        else:
+            result = info.Configuration().interpolate_atom(condition)
+            self.__results[condition] = result
+
+            arguments = condition[len(CONDITION_PREFIX):].split(":")
+            if arguments[0] in FACT_TRANSACTIONS:
+                for transaction in FACT_TRANSACTIONS[arguments[0]](*arguments[1:]):
+                    self.__dependencies.setdefault(transaction, set()).add(condition)
+        return bool(result)
+
+    def invalidate(self, transactions):
+        """discards the cached results of all conditions which depend on some transactions
+
+        @param transactions: list of committed transactions
+        """
+        for transaction in transactions:
+            for condition in self.__dependencies.pop(str(transaction), set()):
+                self.__results.pop(condition, None)
+
+    def clear(self):
+        """discards all cached results"""
+        self.__results = dict()
+        self.__dependencies = dict()
@@ -31,6 +31,8 @@ class Info(object):
 
     def __init__(self):
         self.__handlers = dict()
+        self.__recorded_facts = None
+        self.__fact_cache = None
         libpath = os.path.dirname(
             inspect.getfile(sys.modules[self.__class__.__module__]))
 
@@ -46,7 +48,69 @@ class Info(object):
     def register_info_handler(self, schema, handler):
         self.__handlers[schema] = handler
 
+    def start_recording(self):
+        """starts recording the results of all calls to Info::interpolate
+
+        This is used to find out which host facts have been used to calculate an execution plan
+        """
+        self.__recorded_facts = dict()
+
+    def stop_recording(self):
+        """stops recording the results of Info::interpolate
+
+        @return dictionary, which maps every interpolated info key to its value
+        """
+        facts = self.__recorded_facts
+        self.__recorded_facts = None
+        return facts
+
+    def enable_fact_cache(self):
+        """remembers the results of all calls to Info::interpolate until Info::invalidate_facts
+        is called
+
+        This is used by long-running processes (see scheduler::Daemon), which do not want to run
+        commands like `apache2ctl` or `dpkg-query` again as long as the system is unchanged.
+        """
+        if self.__fact_cache is None:
+            self.__fact_cache = dict()
+
+    def invalidate_facts(self):
+        """forgets all cached facts, including the information cached by the classes in
+        info::lib
+        """
+        # pylint: disable=cyclic-import
+        from hardening.info import lib
+        for cls in (lib.ApacheConfig, lib.NetworkConfiguration, lib.OSInfo, lib.PackageManager):
+            core.reset_singleton(cls)
+        RunConditions().clear()
+
+        if self.__fact_cache is not None:
+            self.__fact_cache = dict()
+
     def interpolate(self, value):
+        fact_cache = self.__fact_cache
+        if fact_cache is not None and value in fact_cache:
+            result = fact_cache[value]
+        else:
+            result = self.__interpolate(value)
+            if fact_cache is not None:
+                fact_cache[value] = result
+
+        self.record_fact(value, result)
+        return result
+
+    def record_fact(self, value, result):
+        """records the result of an info key while recording is active (see Info::start_recording)
+
+        This must be called by caches which return results without calling Info::interpolate.
+
+        @param value: info key, without the `info:` prefix
+        @param result: the value of the info key
+        """
+        if self.__recorded_facts is not None:
+            self.__recorded_facts[value] = result
+
+    def __interpolate(self, value):
         value_parts = value.split(":")
 
         if value_parts[0] not in self.__handlers:
@@ -299,6 +363,23 @@ class Configuration(object):
         self.__properties_yaml[''] = cfg_string
         self.__properties = yaml.load(cfg_string)
 
+    def export_state(self):
+        """returns the contents of the configuration repository, including all merged files
+
+        @return opaque object, which can be passed to Configuration::import_state
+        """
+        return dict(self.__properties_yaml), self.__properties
+
+    def import_state(self, state):
+        """replaces the contents of the configuration repository by a state which has been
+        returned by Configuration::export_state
+
+        @param state: the state to be restored
+        """
+        properties_yaml, properties = state
+        self.__properties_yaml = dict(properties_yaml)
+        self.__properties = properties
+
     def merge_config_file(self, filename, prefix):
         """ adds the contents of a YAML file to the configuration repository
 
@@ -377,3 +458,8 @@ class Configuration(object):
             return io.create_writer().prompt_user_yesno(property_name='.'.join(name_parts))
         else:
             return io.create_writer().prompt_user_input(property_name='.'.join(name_parts))
+
+
+# noinspection PyPep8
+# pylint: disable=wrong-import-position
+from hardening.info.RunCondition import RunCondition, RunConditions
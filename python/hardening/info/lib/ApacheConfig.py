@@ -16,6 +16,7 @@
 import os
 import re
 import subprocess
+import threading
 
 from hardening import core
 
@@ -38,6 +39,8 @@ class ApacheConfig(object):
         self.__configdir = "/etc/apache2"
         self.__envvars = os.path.join(self.__configdir, "envvars")
         self.__versioninfo = None
+        # utils may be set up concurrently, but `apache2ctl` should be run only once
+        self.__lock = threading.Lock()
 
     def get_version(self):
         """ returns the version of the apache server
@@ -66,8 +69,8 @@ class ApacheConfig(object):
     def get_enabled_modules(self):
         """returns a list of all enabled modules
         """
-        enabled_modules_path = os.path.join(
-            self.get_httpd_root(), "mods-enabled")
+        enabled_modules_path = core.RuntimeOptions().rebase_path(os.path.join(
+            self.get_httpd_root(), "mods-enabled"))
         modules = list()
         for _, _, files in os.walk(enabled_modules_path):
             modules.extend([x[:-5] for x in files if x.endswith(".load")])
@@ -77,15 +80,21 @@ class ApacheConfig(object):
         if self.__versioninfo is not None:
             return
 
-        self.__versioninfo = dict()
+        with self.__lock:
+            if self.__versioninfo is None:
+                self.__versioninfo = self.__run_apache_version()
+
+    def __run_apache_version(self):
+        versioninfo = dict()
         regex_genericinfo = re.compile(r"^\s*([^:]+):\s*(.*)$")
         regex_compiledwith = re.compile(r'\s*-D\s+([^=]+)(?:="?([^"]*)"?)?')
 
-        cmd = self.__get_apache_command(params=["-V"])
-        process = subprocess.Popen(cmd,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
+        cmd = core.RuntimeOptions().rebase_command(self.__get_apache_command(params=["-V"]))
+        with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+            process = subprocess.Popen(cmd,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE)
+            stdout, stderr = process.communicate()
         if process.returncode != 0:
             core.LogManager().get_logger().fatal(stderr.strip())
             raise subprocess.CalledProcessError(
@@ -94,13 +103,14 @@ class ApacheConfig(object):
         for line in stdout.split(b"\n"):
             result = regex_genericinfo.match(line.decode('utf-8'))
             if result:
-                self.__versioninfo[result.group(1)] = result.group(2)
+                versioninfo[result.group(1)] = result.group(2)
                 continue
 
             result = regex_compiledwith.match(line.decode('utf-8'))
             if result:
-                self.__versioninfo[result.group(1)] = result.group(2)
+                versioninfo[result.group(1)] = result.group(2)
                 continue
+        return versioninfo
 
     @staticmethod
     def __get_apache_command(apache_envvars="/etc/apache2/envvars",
@@ -15,6 +15,8 @@
 
 import grp
 
+from hardening import core
+
 
 class Group(object):
     """ provides an interface to the `/etc/group` file
@@ -48,12 +50,23 @@ class Group(object):
         | 2 | ``gr_gid`` | the numerical group ID |
         | 3 | ``gr_mem`` | all the group member's user names |
 
-        If no group by the given name exists, a KeyError is raised
+        If no group by the given name exists, a KeyError is raised. When a root filesystem is
+        hardened (see core::RuntimeOptions::root_path), its `/etc/group` is used.
 
         @param name: name of the group
         @return tuple as described above
         """
-        return grp.getgrnam(name)
+        if core.RuntimeOptions().root_path() is None:
+            return grp.getgrnam(name)
+
+        with open(core.RuntimeOptions().rebase_path("/etc/group"), "r") as group_file:
+            for line in group_file:
+                fields = line.rstrip("\n").split(":")
+                if len(fields) == 4 and fields[0] == name:
+                    fields[2] = int(fields[2])
+                    fields[3] = [member for member in fields[3].split(",") if member]
+                    return grp.struct_group(fields)
+        raise KeyError("getgrnam(): name not found: %s" % name)
 
     def get_gid(self, name):
         """ returns the id of the group with the given name
@@ -44,12 +44,13 @@ class JavaConfig(object):
 
     def read_java_version(self):
         regex_version = re.compile(r'^.*"(.*?)"')
-        cmd = ["java", "-version"]
+        cmd = core.RuntimeOptions().rebase_command(["java", "-version"])
         try:
-            process = subprocess.Popen(cmd,
-                                       stdout=subprocess.PIPE,
-                                       stderr=subprocess.PIPE)
-            _, stderr = process.communicate()
+            with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+                process = subprocess.Popen(cmd,
+                                           stdout=subprocess.PIPE,
+                                           stderr=subprocess.PIPE)
+                _, stderr = process.communicate()
         except OSError:
             return
 
@@ -72,7 +72,7 @@ class NetworkConfiguration(object):
         if 'default' in gws:
             self.__default_gw = gws['default'][netifaces.AF_INET]
         resolv_re = re.compile(r"^\s*(domain|search|nameserver)\s+(.*)$")
-        with open("/etc/resolv.conf", "r") as resolv_conf:
+        with open(core.RuntimeOptions().rebase_path("/etc/resolv.conf"), "r") as resolv_conf:
             for line in resolv_conf:
                 match = resolv_re.match(line)
                 if match:
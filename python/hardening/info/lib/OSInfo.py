@@ -13,6 +13,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import platform
 try:
     import distro
@@ -32,11 +33,29 @@ class OSInfo(object):
         self.__package_manager = None
         _system = platform.system()
         if _system == "Linux":
-            _system = distro.linux_distribution()[0]
+            if core.RuntimeOptions().root_path() is None:
+                _system = distro.linux_distribution()[0]
+            else:
+                _system = self.__read_os_release().get("NAME", "")
 
         self.__system = "%s:%s:%s" % \
             (_system, platform.release(), platform.version())
 
+    @staticmethod
+    def __read_os_release():
+        values = dict()
+        for filename in ("/etc/os-release", "/usr/lib/os-release"):
+            filename = core.RuntimeOptions().rebase_path(filename)
+            if not os.path.isfile(filename):
+                continue
+            with open(filename, "r") as os_release:
+                for line in os_release:
+                    key, sep, value = line.strip().partition("=")
+                    if sep:
+                        values[key] = value.strip("\"'")
+            break
+        return values
+
     def distribution_name(self):
         return self.__system
 
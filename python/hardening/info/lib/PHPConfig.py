@@ -37,12 +37,13 @@ class PHPConfig(object):
 
     def read_php_version(self):
         regex_version = re.compile(r'^PHP ([^-]+)')
-        cmd = ["php", "-v"]
+        cmd = core.RuntimeOptions().rebase_command(["php", "-v"])
         try:
-            process = subprocess.Popen(cmd,
-                                       stdout=subprocess.PIPE,
-                                       stderr=subprocess.PIPE)
-            stdout, stderr = process.communicate()
+            with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+                process = subprocess.Popen(cmd,
+                                           stdout=subprocess.PIPE,
+                                           stderr=subprocess.PIPE)
+                stdout, stderr = process.communicate()
         except OSError:
             return
 
@@ -66,21 +66,24 @@ class DebianPackageManager(AbstractPackageManager):
         super(DebianPackageManager, self).__init__()
 
     def is_package_installed(self, packagename):
-        cmd = ["/usr/bin/dpkg-query", "-s", packagename]
-        process = subprocess.Popen(cmd,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE)
-        process.communicate()
+        cmd = core.RuntimeOptions().rebase_command(["/usr/bin/dpkg-query", "-s", packagename])
+        with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+            process = subprocess.Popen(cmd,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE)
+            process.communicate()
         return process.returncode == 0
 
     @staticmethod
     def get_package_version(packagename):
-        cmd = ["/usr/bin/dpkg-query", "--show", r"--showformat=${Package} ${Version}\n",
-               packagename]
-        process = subprocess.Popen(cmd,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE)
-        stdout, _ = process.communicate()
+        cmd = core.RuntimeOptions().rebase_command(
+            ["/usr/bin/dpkg-query", "--show", r"--showformat=${Package} ${Version}\n",
+             packagename])
+        with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+            process = subprocess.Popen(cmd,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE)
+            stdout, _ = process.communicate()
 
         if process.returncode != 0:
             return None
@@ -94,16 +97,17 @@ class DebianPackageManager(AbstractPackageManager):
 
     @staticmethod
     def get_package_upgrade_info(package_pattern):
-        cmd = ["/usr/bin/aptitude",
-               "-F",
-               "%p*%v*%V",
-               "--disable-columns",
-               "search",
-               "^" + package_pattern + "$"]
-        process = subprocess.Popen(cmd,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE)
-        stdout, _ = process.communicate()
+        cmd = core.RuntimeOptions().rebase_command(["/usr/bin/aptitude",
+                                                    "-F",
+                                                    "%p*%v*%V",
+                                                    "--disable-columns",
+                                                    "search",
+                                                    "^" + package_pattern + "$"])
+        with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+            process = subprocess.Popen(cmd,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE)
+            stdout, _ = process.communicate()
 
         if process.returncode != 0:
             return None
@@ -119,8 +123,9 @@ class DebianPackageManager(AbstractPackageManager):
 
     def get_package_files(self, packagename, filename_regex=None):
         try:
-            output = subprocess.check_output(
-                ["/usr/bin/dpkg", "-L", packagename])
+            cmd = core.RuntimeOptions().rebase_command(["/usr/bin/dpkg", "-L", packagename])
+            with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+                output = subprocess.check_output(cmd)
         except OSError:
             return None
 
@@ -132,8 +137,10 @@ class DebianPackageManager(AbstractPackageManager):
     @staticmethod
     def list_alternatives(name):
         try:
-            output = subprocess.check_output(
+            cmd = core.RuntimeOptions().rebase_command(
                 ["/usr/bin/update-alternatives", "--list", name])
+            with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+                output = subprocess.check_output(cmd)
             return output.decode('utf8').split(os.linesep)
         except OSError:
             return None
@@ -141,7 +148,9 @@ class DebianPackageManager(AbstractPackageManager):
     @staticmethod
     def get_file_package(filename):
         try:
-            output = subprocess.check_output(["/usr/bin/dpkg", "-S", filename])
+            cmd = core.RuntimeOptions().rebase_command(["/usr/bin/dpkg", "-S", filename])
+            with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+                output = subprocess.check_output(cmd)
 
             lines = output.decode('utf8').split(os.linesep)
             if len(lines) < 1:
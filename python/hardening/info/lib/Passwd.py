@@ -15,6 +15,8 @@
 
 import pwd
 
+from hardening import core
+
 
 class Passwd(object):
     """ provides an interface to the `/etc/passwd` file
@@ -52,12 +54,23 @@ class Passwd(object):
         | 5 | ``pw_dir`` | User home directory |
         | 6 | ``pw_shell`` | User command interpreter |
 
-        If no user by the given name exists, a KeyError is raised
+        If no user by the given name exists, a KeyError is raised. When a root filesystem is
+        hardened (see core::RuntimeOptions::root_path), its `/etc/passwd` is used.
 
         @param name: name of the user
         @return tuple as described above
         """
-        return pwd.getpwnam(name)
+        if core.RuntimeOptions().root_path() is None:
+            return pwd.getpwnam(name)
+
+        with open(core.RuntimeOptions().rebase_path("/etc/passwd"), "r") as passwd_file:
+            for line in passwd_file:
+                fields = line.rstrip("\n").split(":")
+                if len(fields) == 7 and fields[0] == name:
+                    fields[2] = int(fields[2])
+                    fields[3] = int(fields[3])
+                    return pwd.struct_passwd(fields)
+        raise KeyError("getpwnam(): name not found: %s" % name)
 
     def get_uid(self, name):
         """ returns the id of the user with the given name
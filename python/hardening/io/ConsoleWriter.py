@@ -14,6 +14,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 # -*- coding: utf-8 -*-
+import functools
 import os
 import sys
 import six
@@ -21,6 +22,20 @@ import six
 from hardening import io, core
 
 
+def serialized_prompt(method):
+    """decorator which makes sure that only one prompt is displayed at once
+
+    Prompts may be issued from several worker threads (see core::WorkerPool), but the user can
+    only answer one question at a time, so all prompts are passed to core::PromptQueue.
+    """
+
+    @functools.wraps(method)
+    def prompt(*args, **kwargs):
+        return core.PromptQueue().call(method, *args, **kwargs)
+
+    return prompt
+
+
 class ConsoleWriter(io.Writer):
     """
     Implementation of io::Writer which is capable to write to the system console
@@ -75,6 +90,7 @@ class ConsoleWriter(io.Writer):
     def raw_input():
         return six.moves.input()
 
+    @serialized_prompt
     def prompt_user_yesno(self, message, default=_("yes"), **kwargs):
         __user_input = None
         hint = None
@@ -106,6 +122,7 @@ class ConsoleWriter(io.Writer):
 
         return __user_input
 
+    @serialized_prompt
     def prompt_user_yesnocancel(
             self, message="", default=_("yes"), *args, **kwargs):
         __user_input = None
@@ -140,6 +157,7 @@ class ConsoleWriter(io.Writer):
 
         return __user_input
 
+    @serialized_prompt
     def prompt_user_input(self, message="", validator=None, default=None):
         __user_input = None
 
@@ -154,6 +172,7 @@ class ConsoleWriter(io.Writer):
 
         return __user_input
 
+    @serialized_prompt
     def prompt_to_choose(self, message, values=None, allow_userinput=False):
         if values is None:
             values = []
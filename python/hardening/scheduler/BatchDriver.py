@@ -0,0 +1,136 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import subprocess
+import sys
+
+from hardening import core, io
+
+MAIN_SCRIPT = 'hardening.py'
+
+# options which are set by the driver for every child process; the value is `True` if the option
+# takes an argument
+CHILD_OPTIONS = {'--root': True, '--jobs': True, '--log': True, '--timing-report': True}
+
+
+class BatchDriver(object):
+    """hardens several root filesystems (see `--root`) at the same time
+
+    Every root filesystem is hardened by a separate process, which is started with the same
+    command line arguments as the driver, but with only one `--root`. Up to `--jobs` processes
+    run at the same time; every process uses a single worker. Log files and timing reports get
+    the name of the root filesystem as suffix (see core::RuntimeOptions::root_identifier).
+
+    The output of every process is displayed as soon as the process has finished.
+    """
+
+    def __init__(self):
+        self.__roots = core.RuntimeOptions().root_paths()
+        self.__arguments = self.__strip_child_options(sys.argv[1:])
+        self.__logfile = self.__release_logfile()
+
+    def run(self):
+        """hardens all root filesystems
+
+        @return list of the root filesystems which could not be hardened
+        """
+        jobs = core.RuntimeOptions().jobs()
+        core.LogManager().get_logger().info(
+            "hardening %(roots)d root filesystems using %(jobs)d processes"
+            % {'roots': len(self.__roots), 'jobs': jobs})
+
+        results = core.WorkerPool(jobs).map(self.__harden_root, self.__roots)
+        return [root for root, returncode in zip(self.__roots, results) if returncode != 0]
+
+    def __harden_root(self, root):
+        cmd = self.get_child_command(root)
+        core.LogManager().get_logger().info("running command: " + " ".join(cmd))
+
+        with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+            process = subprocess.Popen(cmd,
+                                       stdin=subprocess.PIPE,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT)
+            stdout, _ = process.communicate()
+
+        if process.returncode == 0:
+            headline = _("Root filesystem '%(root)s' hardened") % {'root': root}
+        else:
+            headline = _("Hardening of root filesystem '%(root)s' failed (exit status "
+                         "%(status)d)") % {'root': root, 'status': process.returncode}
+        io.create_writer().display_message(
+            headline=headline,
+            message=stdout.decode('utf-8', 'replace'),
+            hyphenate=False)
+        return process.returncode
+
+    def get_child_command(self, root):
+        """returns the command line of the process which hardens a single root filesystem
+
+        @param root: absolute directory name of the root filesystem
+        @return command as list of arguments
+        """
+        identifier = core.RuntimeOptions().root_identifier(root)
+        cmd = [sys.executable, os.path.join(core.RuntimeOptions().base_path(), MAIN_SCRIPT)]
+        cmd += self.__arguments
+        cmd += ["--root", root, "--jobs", "1"]
+
+        if self.__logfile is not None:
+            cmd += ["--log", self.__with_suffix(self.__logfile, identifier)]
+
+        if core.RuntimeOptions().timing_report() is not None:
+            cmd += ["--timing-report",
+                    self.__with_suffix(core.RuntimeOptions().timing_report(), identifier)]
+        return cmd
+
+    @staticmethod
+    def __strip_child_options(arguments):
+        result = list()
+        skip_next = False
+        for argument in arguments:
+            if skip_next:
+                skip_next = False
+                continue
+
+            name = argument.split("=", 1)[0]
+            if name in CHILD_OPTIONS:
+                skip_next = CHILD_OPTIONS[name] and "=" not in argument
+                continue
+            result.append(argument)
+        return result
+
+    @staticmethod
+    def __release_logfile():
+        # the driver itself does not change anything, so the logfile which has been opened by
+        # core::RuntimeOptions is replaced by one logfile per root filesystem
+        logfile = core.RuntimeOptions().logfile()
+        if logfile is None:
+            return None
+        if logfile is sys.stdout:
+            return '-'
+
+        filename = logfile.name
+        logfile.close()
+        if os.path.isfile(filename) and os.path.getsize(filename) == 0:
+            os.unlink(filename)
+        return filename
+
+    @staticmethod
+    def __with_suffix(filename, identifier):
+        if filename == '-':
+            return filename
+        base, extension = os.path.splitext(filename)
+        return "%s_%s%s" % (base, identifier, extension)
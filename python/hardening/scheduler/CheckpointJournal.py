@@ -0,0 +1,148 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+
+import hardening.info as info
+import hardening.storage as storage
+from hardening import core
+
+JOURNAL_FILENAME = 'checkpoints.journal'
+
+EVENT_START = 'start'
+EVENT_CHECKPOINT = 'checkpoint'
+EVENT_FINISHED = 'finished'
+
+
+class CheckpointJournal(object):
+    """records which modules have been committed, so that an interrupted run can be resumed
+
+    The journal is written into the backup directory of the current run (see
+    storage::TransactionInfo). Every line of the journal is a JSON object, which is synced to disk
+    before the next module is started:
+
+     - `start`: the enabled modules and a fingerprint of the merged configuration
+     - `checkpoint`: a module has been committed. Contains its sections and the final state of
+       all its transactions
+     - `finished`: all modules have been committed
+
+    A run which has been started with `--resume` skips all modules which have been committed by
+    the last, unfinished run, as long as the configuration is unchanged. The checkpoints of
+    the resumed run are copied into the new journal, so that the new run can be resumed as well.
+    """
+
+    def __init__(self, modules, resumed_journal=None):
+        self.__filename = os.path.join(storage.TransactionInfo().get_backupdir(),
+                                       JOURNAL_FILENAME)
+        self.__modules = list(modules)
+        self.__completed = list()
+
+        self.__write({'event': EVENT_START,
+                      'modules': list(modules),
+                      'configuration': self.configuration_fingerprint(),
+                      'resumed_from': resumed_journal})
+
+    @staticmethod
+    def configuration_fingerprint():
+        yaml_sources, _ = info.Configuration().export_state()
+        return core.fingerprint(yaml_sources)
+
+    def completed_modules(self):
+        return list(self.__completed)
+
+    def checkpoint(self, module, sections, transactions):
+        """records that all transactions of a module have been committed
+
+        @param module: name of the module
+        @param sections: names of the sections of the module
+        @param transactions: the committed transactions
+        """
+        self.__completed.append(module)
+        self.__write({'event': EVENT_CHECKPOINT,
+                      'module': module,
+                      'sections': list(sections),
+                      'transactions': [{'transaction': str(t),
+                                        'status': t.status(),
+                                        'modified': t.has_modifications_to_save()}
+                                       for t in transactions]})
+
+    def copy_checkpoints(self, records):
+        """takes over the checkpoints of a resumed run
+
+        Checkpoints of modules which are not enabled anymore are dropped, so that they are run
+        again once they are enabled again.
+
+        @param records: checkpoint records, as returned by CheckpointJournal::find_resumable
+        """
+        for record in records:
+            if record['module'] not in self.__modules:
+                continue
+            self.__completed.append(record['module'])
+            self.__write(record)
+
+    def finish(self):
+        self.__write({'event': EVENT_FINISHED})
+
+    def __write(self, record):
+        with open(self.__filename, 'a') as journal:
+            journal.write(json.dumps(record, sort_keys=True) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    @staticmethod
+    def find_resumable():
+        """searches the journal of the last run
+
+        @return tuple (filename, checkpoint records) if the last run has not been finished and
+        used the same configuration, `None` otherwise
+        """
+        basedir = storage.TransactionInfo().get_basedir()
+        current = os.path.basename(storage.TransactionInfo().get_backupdir())
+        if not os.path.isdir(basedir):
+            return None
+
+        journals = [os.path.join(basedir, d, JOURNAL_FILENAME)
+                    for d in sorted(os.listdir(basedir)) if d != current]
+        journals = [j for j in journals if os.path.isfile(j)]
+        if len(journals) == 0:
+            core.LogManager().get_logger().info(_("found no run which can be resumed"))
+            return None
+
+        filename = journals[-1]
+        records = list()
+        with open(filename, 'r') as journal:
+            for line in journal:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # the last line may be incomplete if the run has been killed while writing it
+                    break
+
+        if len(records) == 0 or records[0].get('event') != EVENT_START:
+            return None
+
+        if records[-1].get('event') == EVENT_FINISHED:
+            core.LogManager().get_logger().info(
+                _("the last run has been finished, there is nothing to resume"))
+            return None
+
+        if records[0].get('configuration') != CheckpointJournal.configuration_fingerprint():
+            core.LogManager().get_logger().warning(
+                _("the configuration has changed since the last run, "
+                  "which therefore cannot be resumed"))
+            return None
+
+        return filename, [r for r in records if r.get('event') == EVENT_CHECKPOINT]
@@ -0,0 +1,259 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import signal
+import socket
+import stat
+import sys
+import time
+
+import hardening.info as info
+import hardening.storage as storage
+from hardening import core
+from hardening.scheduler.PlanCache import PlanCache
+
+ACTION_CHECK = 'check'
+ACTION_APPLY = 'apply'
+ACTION_STATUS = 'status'
+
+# files and directories from which the host facts (see info::Info) are read. If one of them
+# changes, all cached facts are discarded
+FACT_SOURCES = ['/var/lib/dpkg/status',
+                '/etc/apache2',
+                '/etc/php',
+                '/etc/php5',
+                '/etc/ssh',
+                '/etc/passwd',
+                '/etc/group',
+                '/etc/systemd/system',
+                '/etc/network/interfaces',
+                '/etc/resolv.conf',
+                '/etc/os-release',
+                '/etc/alternatives']
+
+# maximum time to wait for a client to send its request
+REQUEST_TIMEOUT = 10.0
+
+
+class Daemon(object):
+    """accepts check and apply requests on a UNIX socket and keeps all caches warm between them
+
+    A client connects to the socket, sends a single request as one line of JSON and receives a
+    single response as one line of JSON, e.g.
+
+        $ echo '{"action": "check"}' | socat - UNIX-CONNECT:/run/hardening.sock
+        {"action": "check", "status": "ok", "compliant": false, "changes": ["file:/etc/..."], ...}
+
+    The following actions are supported:
+
+    | Action | Meaning |
+    | ------ | ------- |
+    | `check` | runs all modules in pretend mode; `compliant` is `true` if nothing must be changed |
+    | `apply` | runs all modules in silent mode and applies all changes |
+    | `status` | returns the number of requests and the cache state, but does not run any modules |
+
+    `changes` lists the transactions which need to be changed (`check`) or which have been changed
+    (`apply`). `log` contains the change log of the request.
+
+    The configuration and all host facts are kept in memory (see info::Info::enable_fact_cache).
+    Before every request, the modification times of the configuration files
+    (see scheduler::PlanCache::input_files) and of the files from which facts are read
+    (`FACT_SOURCES`) are compared to the previous request; if they have changed, the
+    corresponding caches are discarded. Requests are handled one after the other.
+
+    SIGTERM and SIGINT stop the daemon, even while a request is being handled; a failing request
+    does not.
+
+    If `--timing-report` has been specified, the report is written after every request and only
+    contains the measurements of that request.
+    """
+
+    def __init__(self, socket_path):
+        self.__socket_path = os.path.abspath(socket_path)
+        self.__requests = 0
+        self.__configuration_fingerprint = None
+        self.__facts_fingerprint = None
+        # `True` if the daemon has been asked to stop by a signal
+        self.__stopped = False
+
+    def serve(self):
+        """accepts requests until the process is terminated"""
+        info.Info().enable_fact_cache()
+        self.__configuration_fingerprint = self.__get_configuration_fingerprint()
+        self.__facts_fingerprint = self.__get_facts_fingerprint()
+
+        # convert SIGTERM into SystemExit, so that the socket is removed
+        signal.signal(signal.SIGTERM, self.__stop)
+        signal.signal(signal.SIGINT, self.__interrupt)
+
+        server = self.__create_socket()
+        core.LogManager().get_logger().info(
+            _("waiting for requests on '%(socket)s'") % {'socket': self.__socket_path})
+        try:
+            while True:
+                connection = server.accept()[0]
+                try:
+                    self.__handle_connection(connection)
+                finally:
+                    connection.close()
+        finally:
+            server.close()
+            if os.path.exists(self.__socket_path):
+                os.unlink(self.__socket_path)
+
+    def __create_socket(self):
+        if os.path.exists(self.__socket_path):
+            if not stat.S_ISSOCK(os.lstat(self.__socket_path).st_mode):
+                raise RuntimeError(_("'%(socket)s' exists and is not a socket")
+                                   % {'socket': self.__socket_path})
+            os.unlink(self.__socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.__socket_path)
+        os.chmod(self.__socket_path, 0o600)
+        server.listen(5)
+        return server
+
+    def __handle_connection(self, connection):
+        connection.settimeout(REQUEST_TIMEOUT)
+        stream = connection.makefile('rwb')
+        try:
+            try:
+                request = json.loads(stream.readline().decode('utf-8'))
+                action = request['action']
+            except (ValueError, KeyError, TypeError, socket.timeout):
+                response = {'status': 'error', 'error': 'invalid request'}
+            else:
+                response = self.handle_request(action)
+
+            stream.write((json.dumps(response, sort_keys=True) + "\n").encode('utf-8'))
+            stream.flush()
+        except (IOError, OSError) as error:
+            core.LogManager().get_logger().warning(
+                _("unable to answer request: %(error)s") % {'error': str(error)})
+        finally:
+            stream.close()
+
+    def handle_request(self, action):
+        """handles a single request
+
+        @param action: one of `check`, `apply` or `status`
+        @return response as dictionary
+        """
+        if action not in (ACTION_CHECK, ACTION_APPLY, ACTION_STATUS):
+            return {'action': action, 'status': 'error', 'error': 'unknown action'}
+
+        self.__requests += 1
+        response = {'action': action, 'status': 'ok', 'invalidated': self.__invalidate_caches()}
+        if action == ACTION_STATUS:
+            response['requests'] = self.__requests
+            return response
+
+        start = time.time()
+        success, changes, log = self.__run(action)
+        response.update({'compliant': success and (action == ACTION_APPLY or len(changes) == 0),
+                         'changes': changes,
+                         'log': log,
+                         'duration': time.time() - start})
+        if not success:
+            response['status'] = 'error'
+            response['error'] = 'hardening aborted'
+        return response
+
+    def __stop(self, *_):
+        self.__stopped = True
+        sys.exit(0)
+
+    def __interrupt(self, *_):
+        self.__stopped = True
+        raise KeyboardInterrupt()
+
+    def __run(self, action):
+        # pylint: disable=cyclic-import
+        from hardening.scheduler import Scheduler
+
+        if action == ACTION_CHECK:
+            core.RuntimeOptions().enable_pretend_mode()
+        else:
+            core.RuntimeOptions().enable_silent_mode()
+
+        # every run gets its own backup directory and its own timing report
+        core.reset_singleton(storage.TransactionInfo)
+        core.reset_singleton(core.TimingReport)
+
+        success = False
+        try:
+            Scheduler().run_hardening_modules()
+            success = True
+        except SystemExit:
+            # the scheduler exits if the hardening fails, but a signal must stop the daemon
+            if self.__stopped:
+                raise
+        # noinspection PyBroadException
+        # pylint: disable=broad-except
+        except Exception as error:
+            core.LogManager().get_logger().error(
+                _("encountered an error, rolling back: %(error)s") % {'error': str(error)})
+            storage.TransactionManager().rollback_all()
+        finally:
+            transactions = storage.TransactionManager().clear()
+            core.TimingReport().store_report()
+
+        changes = [str(t) for t in transactions if Daemon.__has_changes(t)]
+
+        log = core.ChangeLog().get_log_as_string()
+        if success and action == ACTION_APPLY and core.ChangeLog().has_items_to_save() and \
+                core.RuntimeOptions().is_log_enabled():
+            core.ChangeLog().store_log()
+            core.RuntimeOptions().logfile().flush()
+        core.ChangeLog().clear()
+        return success, changes, log
+
+    @staticmethod
+    def __has_changes(transaction):
+        if isinstance(transaction, storage.CommandTransaction):
+            return transaction.get_commit_command() is not None
+        return transaction.has_something_to_commit()
+
+    def __invalidate_caches(self):
+        invalidated = list()
+
+        configuration_fingerprint = self.__get_configuration_fingerprint()
+        if configuration_fingerprint != self.__configuration_fingerprint:
+            core.reset_singleton(info.Configuration)
+            self.__configuration_fingerprint = configuration_fingerprint
+            invalidated.append('configuration')
+
+        facts_fingerprint = self.__get_facts_fingerprint()
+        if facts_fingerprint != self.__facts_fingerprint:
+            info.Info().invalidate_facts()
+            self.__facts_fingerprint = facts_fingerprint
+            invalidated.append('facts')
+
+        for cache in invalidated:
+            core.LogManager().get_logger().info(
+                "%(cache)s has changed, discarding cached data" % {'cache': cache})
+        return invalidated
+
+    @staticmethod
+    def __get_configuration_fingerprint():
+        return core.fingerprint([[f, core.path_fingerprint(f)] for f in PlanCache.input_files()])
+
+    @staticmethod
+    def __get_facts_fingerprint():
+        sources = [core.RuntimeOptions().rebase_path(f) for f in FACT_SOURCES]
+        return core.fingerprint([[f, core.path_fingerprint(f)] for f in sources])
@@ -0,0 +1,294 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+import six
+
+import hardening
+import hardening.info as info
+import hardening.storage as storage
+from hardening import core, constants
+from hardening.utils.HardeningUtil import HardeningUtil
+from hardening.utils.UtilRegistry import UtilRegistry
+
+# increment this whenever the structure of the cached plan changes
+PLAN_CACHE_VERSION = 3
+
+PLAN_CACHE_FILENAME = 'plan.json'
+PACKAGE_DATABASE = '/var/lib/dpkg/status'
+
+# marks an option value which is a util itself (see DisabledUtil)
+UTIL_MARKER = '__util__'
+
+
+class PlanCache(object):
+    """stores the execution plan calculated by the Scheduler, so that it can be reused by later runs
+
+    The execution plan consists of the ordered list of utils (including their merged options and
+    resolved transaction keys, and the utils which represent disabled sections and utils) and the
+    merged configuration repository. The plan is valid as long as
+
+     - the YAML input files (`config.yml`, `modules/*.yml` and `info/config.yml`) are unchanged,
+     - the same modules have been selected,
+     - the package database is unchanged (required packages are only checked during planning) and
+     - every host fact which has been read by Info::interpolate while planning still has the same
+       value.
+
+    The cache is only used if no user is involved (see core::RuntimeOptions::unattended_mode),
+    because otherwise the plan depends on choices of the user.
+
+    The plan is stored as JSON: every util is described by its name (see
+    utils::UtilRegistry::get_name), its options and its resolved transaction key, and is created
+    again when the plan is loaded. Because hardening runs as root, a cached plan is only used if
+    the cache directory and the file are owned by the current user and are not accessible by other
+    users (see core::open_private_file).
+    """
+
+    def __init__(self, modules):
+        self.__modules = sorted(modules)
+        self.__filename = os.path.join(storage.TransactionInfo().get_cachedir(),
+                                       PLAN_CACHE_FILENAME)
+        self.__key = self.__calculate_key()
+
+    @staticmethod
+    def is_enabled():
+        return core.RuntimeOptions().unattended_mode() and core.RuntimeOptions().use_cache()
+
+    def filename(self):
+        return self.__filename
+
+    def key(self):
+        return self.__key
+
+    def plan(self, planner):
+        """returns the cached list of utils, if it is still valid, or calculates a new one
+
+        @param planner: callable without arguments, which calculates the list of utils
+        @return list of utils
+        """
+        utils = self.load()
+        if utils is not None:
+            core.LogManager().get_logger().info(
+                _("using cached execution plan from '%(filename)s'")
+                % {'filename': self.__filename})
+            return utils
+
+        info.Info().start_recording()
+        try:
+            utils = planner()
+            # the transaction keys are part of the plan, so the facts they depend on are, too
+            for util in utils:
+                util.get_transaction_key()
+        finally:
+            facts = info.Info().stop_recording()
+
+        self.store(utils, facts)
+        return utils
+
+    def load(self):
+        """loads the cached execution plan
+
+        If the plan is valid, the configuration repository is replaced by the cached one.
+
+        @return list of utils, or `None` if there is no valid cached plan
+        """
+        if not os.path.isfile(self.__filename):
+            return None
+
+        # noinspection PyBroadException
+        # pylint: disable=broad-except
+        try:
+            with core.open_private_file(self.__filename) as stream:
+                plan = self.__native_strings(json.load(stream))
+        except core.HardeningFailure as error:
+            core.LogManager().get_logger().warning(
+                _("ignoring plan cache: %(error)s") % {'error': str(error)})
+            return None
+        except Exception as error:
+            core.LogManager().get_logger().debug(
+                "ignoring unreadable plan cache '%(filename)s': %(error)s"
+                % {'filename': self.__filename, 'error': str(error)})
+            return None
+
+        if not isinstance(plan, dict) or plan.get('key') != self.__key:
+            core.LogManager().get_logger().debug("configuration has changed, not using plan cache")
+            return None
+
+        # some facts (e.g. info:property:...) are read from the configuration repository,
+        # so we need the merged configuration to validate them
+        current_state = info.Configuration().export_state()
+        info.Configuration().import_state(plan['configuration'])
+
+        if not self.__facts_are_valid(plan['facts']):
+            info.Configuration().import_state(current_state)
+            return None
+
+        # noinspection PyBroadException
+        # pylint: disable=broad-except
+        try:
+            return [self.__decode_util(record) for record in plan['utils']]
+        except Exception as error:
+            core.LogManager().get_logger().debug(
+                "cached execution plan cannot be restored: %(error)s" % {'error': str(error)})
+            info.Configuration().import_state(current_state)
+            return None
+
+    def store(self, utils, facts):
+        """writes the execution plan into the cache directory
+
+        @param utils: list of utils
+        @param facts: dictionary of host facts, as returned by Info::stop_recording
+        """
+        # noinspection PyBroadException
+        # pylint: disable=broad-except
+        try:
+            plan = {'key': self.__key,
+                    'facts': facts,
+                    'configuration': list(info.Configuration().export_state()),
+                    'utils': [self.__encode_util(util) for util in utils]}
+            data = json.dumps(plan, sort_keys=True)
+
+            # values which JSON cannot represent exactly (e.g. integer keys) would change the plan
+            if json.loads(data) != plan:
+                raise ValueError("the plan cannot be represented as JSON")
+        except Exception as error:
+            core.LogManager().get_logger().debug(
+                "execution plan cannot be cached: %(error)s" % {'error': str(error)})
+            return
+
+        dirname = os.path.dirname(self.__filename)
+        try:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname, 0o700)
+            core.check_private_directory(dirname)
+
+            handle, tmpname = tempfile.mkstemp(dir=dirname, prefix=PLAN_CACHE_FILENAME)
+            with os.fdopen(handle, 'w') as stream:
+                stream.write(data)
+            os.rename(tmpname, self.__filename)
+        except (IOError, OSError, core.HardeningFailure) as error:
+            core.LogManager().get_logger().warning(
+                _("unable to write plan cache '%(filename)s': %(error)s")
+                % {'filename': self.__filename, 'error': str(error)})
+
+    @classmethod
+    def __native_strings(cls, value):
+        # the json module of Python 2 returns unicode strings, but the options of utils and the
+        # configuration repository contain `str` objects
+        if not six.PY2:
+            return value
+        if isinstance(value, dict):
+            return {cls.__native_strings(k): cls.__native_strings(v) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [cls.__native_strings(v) for v in value]
+        elif isinstance(value, six.text_type):
+            return value.encode('utf-8')
+        return value
+
+    @classmethod
+    def __encode_util(cls, util):
+        return {'util': UtilRegistry.get_name(util.__class__),
+                'options': cls.__encode_value(util.option_values),
+                'transaction': util.get_transaction_key()}
+
+    @classmethod
+    def __decode_util(cls, record):
+        util_class = UtilRegistry().get_class(record['util'])
+        return util_class(option_values=cls.__decode_value(record['options']),
+                          transaction_key=record['transaction'])
+
+    @classmethod
+    def __encode_value(cls, value):
+        if isinstance(value, HardeningUtil):
+            return {UTIL_MARKER: cls.__encode_util(value)}
+        elif isinstance(value, dict):
+            return {k: cls.__encode_value(v) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [cls.__encode_value(v) for v in value]
+        return value
+
+    @classmethod
+    def __decode_value(cls, value):
+        if isinstance(value, dict):
+            if list(value.keys()) == [UTIL_MARKER]:
+                return cls.__decode_util(value[UTIL_MARKER])
+            return {k: cls.__decode_value(v) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [cls.__decode_value(v) for v in value]
+        return value
+
+    @staticmethod
+    def __facts_are_valid(facts):
+        for key, value in facts.items():
+            # noinspection PyBroadException
+            # pylint: disable=broad-except
+            try:
+                current_value = info.Info().interpolate(key)
+            except Exception:
+                return False
+
+            if current_value != value:
+                core.LogManager().get_logger().debug(
+                    "host fact '%(key)s' has changed, not using plan cache" % {'key': key})
+                return False
+        return True
+
+    def __calculate_key(self):
+        return core.fingerprint(PLAN_CACHE_VERSION,
+                                hardening.__version__,
+                                list(sys.version_info[:2]),
+                                core.RuntimeOptions().lib_path(),
+                                self.__modules,
+                                core.RuntimeOptions().content_management_system,
+                                self.__read_inputs(),
+                                core.RuntimeOptions().root_path(),
+                                self.__stat(core.RuntimeOptions().rebase_path(PACKAGE_DATABASE)))
+
+    @staticmethod
+    def input_files():
+        """returns the names of all configuration files an execution plan depends on
+
+        @return list of file names
+        """
+        filenames = [
+            os.path.join(core.RuntimeOptions().base_path(), constants.FILENAME_LOCALCONFIG),
+            os.path.join(core.RuntimeOptions().lib_path(), 'info',
+                         constants.FILENAME_PACKAGECONFIG)]
+
+        searchpath = os.path.join(core.RuntimeOptions().lib_path(), 'modules')
+        for dirname, _, files in os.walk(searchpath):
+            filenames += sorted(os.path.join(dirname, f) for f in files if f.endswith(".yml"))
+        return filenames
+
+    def __read_inputs(self):
+        inputs = list()
+        for filename in self.input_files():
+            if os.path.isfile(filename):
+                with open(filename, 'rb') as stream:
+                    inputs.append([filename, hashlib.sha256(stream.read()).hexdigest()])
+        return inputs
+
+    @staticmethod
+    def __stat(filename):
+        try:
+            status = os.stat(filename)
+        except OSError:
+            return None
+        return [status.st_mtime, status.st_size, status.st_ino]
@@ -0,0 +1,289 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+import hardening.storage as storage
+from hardening import core, io
+from hardening.storage import BackupStore, BackupArchive
+from hardening.storage.BackupStore import ENTRY_FILE, ENTRY_DIRECTORY, ENTRY_SYMLINK, \
+    ENTRY_METADATA, ENTRY_ABSENT, ENTRY_COMMAND, FORMAT_ARCHIVE, MANIFEST_FILENAME
+
+
+class Restorer(object):
+    """restores the state before a run from the manifest of its backup (see storage::BackupStore
+    and `--restore`)
+
+    For every path, the first entry of the manifest describes its original state. The restore is
+    done in the following steps:
+
+     -# directories which have been deleted are created again, parents first
+     -# files and symbolic links are restored and created files are removed. Every file is
+        written to a temporary file next to the original, which is checked against the digest
+        in the manifest and then renamed. These paths are processed on up to `--jobs` workers
+     -# the original ownership and permissions of directories are restored, contents first
+     -# the commands which undo the commands of the run are run, in reverse order
+
+    A path or command which cannot be restored does not stop the restore; it is reported at the
+    end instead. In pretend mode, the steps are only displayed. In interactive and difference
+    mode, the user has to confirm them first.
+
+    The same steps undo a commit which has been interrupted by a crash (see Restorer::recover).
+    """
+
+    def __init__(self, timestamp, entries=None, backup_format=None):
+        """
+        @param timestamp: name of the backup directory of the run
+        @param entries: the entries to restore; by default, all entries of the manifest of the run
+        @param backup_format: format of the backup, if `entries` is given
+        """
+        basedir = storage.TransactionInfo().get_basedir()
+        self.__rundir = os.path.join(basedir, timestamp)
+        self.__store = BackupStore(basedir, self.__rundir)
+        if entries is None:
+            if not os.path.isfile(os.path.join(self.__rundir, MANIFEST_FILENAME)):
+                raise core.HardeningFailure(
+                    _("there is no backup of the run '%(timestamp)s'; available backups: "
+                      "%(runs)s")
+                    % {'timestamp': timestamp,
+                       'runs': ", ".join(os.path.basename(r) for r in self.__store.runs()) or "-"})
+            manifest = BackupStore.read_manifest(self.__rundir)
+            entries = manifest['entries']
+            backup_format = manifest['format']
+
+        self.__index = None
+        if backup_format == FORMAT_ARCHIVE:
+            self.__index = BackupArchive.read_index(self.__rundir)
+        self.__directories, self.__paths, self.__metadata, self.__commands = \
+            self.plan(entries)
+
+    @staticmethod
+    def recover():
+        """undoes the changes of a commit which has been interrupted, e.g. by a power loss
+
+        If the write-ahead log of the commits (see storage::CommitLog) still exists, the temporary
+        files of the interrupted commit are removed and the original state of all paths and
+        commands of the commit is restored, without asking the user. In pretend mode, nothing is
+        changed.
+
+        @return list of the paths and commands which could not be restored
+        """
+        commit_log = storage.TransactionInfo().get_commit_log()
+        if not os.path.isfile(commit_log.filename()):
+            return []
+
+        if core.RuntimeOptions().pretend_mode():
+            core.LogManager().get_logger().warning(
+                _("the last commit has been interrupted; its changes are undone by the next run "
+                  "which is not started in pretend mode"))
+            return []
+
+        failures = list()
+        try:
+            content = commit_log.read()
+            if content is not None:
+                begin, commands = content
+                core.LogManager().get_logger().warning(
+                    _("the commit of the run '%(run)s' has been interrupted, undoing its changes")
+                    % {'run': begin['run']})
+                for name in begin['temporary']:
+                    if os.path.lexists(name):
+                        os.unlink(name)
+                failures = Restorer(begin['run'], begin['entries'] + commands,
+                                    begin['format']).restore()
+            commit_log.remove()
+        except (IOError, OSError, ValueError, KeyError) as error:
+            raise core.HardeningFailure(
+                _("unable to undo the interrupted commit: %(error)s. Remove '%(log)s' to continue "
+                  "without undoing it") % {'error': str(error), 'log': commit_log.filename()})
+        return failures
+
+    @staticmethod
+    def plan(entries):
+        """splits the entries of a manifest into the steps of the restore
+
+        @param entries: entries of a manifest, in the order in which they have been recorded
+        @return tuple (directories to create, files and links to restore or remove, paths whose
+        ownership and permissions must be restored, commands to run), each as list of entries in
+        the order in which they must be processed
+        """
+        original = dict()
+        commands = list()
+        for entry in entries:
+            if entry['type'] == ENTRY_COMMAND:
+                commands.insert(0, entry)
+            else:
+                original.setdefault(entry['path'], entry)
+
+        directories = [e for e in original.values() if e['type'] == ENTRY_DIRECTORY]
+        paths = [e for e in original.values()
+                 if e['type'] in (ENTRY_FILE, ENTRY_SYMLINK, ENTRY_ABSENT)]
+        metadata = directories + [e for e in original.values() if e['type'] == ENTRY_METADATA]
+
+        # restricting the permissions of a directory must not prevent restoring its contents
+        directories.sort(key=lambda e: e['path'])
+        paths.sort(key=lambda e: e['path'])
+        metadata.sort(key=lambda e: e['path'], reverse=True)
+        return directories, paths, metadata, commands
+
+    def describe(self):
+        """describes all steps of the restore
+
+        @return list of strings
+        """
+        lines = ["mkdir '%s'" % e['path'] for e in self.__directories]
+        for entry in self.__paths:
+            if entry['type'] == ENTRY_ABSENT:
+                lines.append("rm '%s'" % entry['path'])
+            elif entry['type'] == ENTRY_SYMLINK:
+                lines.append("ln -s '%s' '%s'" % (entry['target'], entry['path']))
+            else:
+                lines.append("restore '%s' (%s)" % (entry['path'], entry['object'][:12]))
+        for entry in self.__metadata:
+            lines.append("chown %d:%d '%s'" % (entry['uid'], entry['gid'], entry['path']))
+            lines.append("chmod %s '%s'" % (oct(entry['mode']), entry['path']))
+        for entry in self.__commands:
+            if entry['command'] is None:
+                lines.append("# cannot be undone: " + " ".join(entry['commit']))
+            else:
+                lines.append(" ".join(entry['command']))
+        return lines
+
+    def run(self):
+        """restores all paths and runs all commands
+
+        @return list of the paths and commands which could not be restored
+        """
+        lines = self.describe()
+        if core.RuntimeOptions().pretend_mode():
+            io.create_writer().display_message(
+                headline=_("Restore preview"), message="\n".join(lines), hyphenate=False)
+            return []
+
+        if (core.RuntimeOptions().interactive_mode() or core.RuntimeOptions().difference_mode()) \
+                and not io.create_writer().prompt_user_yesno(
+                    message=_("Do you want to restore the state before '%(rundir)s'?")
+                    % {'rundir': self.__rundir},
+                    default=_("no"), quoted=lines):
+            return []
+        return self.restore()
+
+    def restore(self):
+        """restores all paths and runs all commands, without asking the user
+
+        @return list of the paths and commands which could not be restored
+        """
+        results = [self.__try(self.__create_directory, entry, entry['path'])
+                   for entry in self.__directories]
+        results += core.WorkerPool(core.RuntimeOptions().jobs()).map(
+            lambda entry: self.__try(self.__restore_path, entry, entry['path']), self.__paths)
+        results += [self.__try(self.__restore_metadata, entry, entry['path'])
+                    for entry in self.__metadata]
+        results += [self.__try(self.__run_command, entry, " ".join(entry['commit']))
+                    for entry in self.__commands]
+        failures = [name for name in results if name is not None]
+
+        core.LogManager().get_logger().info(
+            _("restored %(count)d of %(total)d paths and commands")
+            % {'count': len(results) - len(failures), 'total': len(results)})
+        return failures
+
+    @staticmethod
+    def __try(method, entry, name):
+        """@return `name` if `method` has failed, `None` otherwise"""
+        try:
+            method(entry)
+        except (IOError, OSError, subprocess.CalledProcessError, core.HardeningFailure) as error:
+            core.LogManager().get_logger().error(
+                _("unable to restore '%(name)s': %(error)s") % {'name': name, 'error': str(error)})
+            return name
+        return None
+
+    @staticmethod
+    def __create_directory(entry):
+        if not os.path.isdir(entry['path']):
+            os.makedirs(entry['path'], entry['mode'])
+
+    def __restore_path(self, entry):
+        path = entry['path']
+        if entry['type'] == ENTRY_ABSENT:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            elif os.path.lexists(path):
+                os.unlink(path)
+            return
+
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o755)
+
+        handle, staging = tempfile.mkstemp(prefix="." + os.path.basename(path) + "_",
+                                           dir=directory)
+        os.close(handle)
+        try:
+            if entry['type'] == ENTRY_SYMLINK:
+                os.unlink(staging)
+                os.symlink(entry['target'], staging)
+                os.lchown(staging, entry['uid'], entry['gid'])
+            else:
+                self.__extract(entry, staging)
+                os.chown(staging, entry['uid'], entry['gid'])
+                os.chmod(staging, entry['mode'])
+            os.rename(staging, path)
+        # pylint: disable=bare-except
+        except:
+            if os.path.lexists(staging):
+                os.unlink(staging)
+            raise
+        core.LogManager().get_logger().info(_("restored '%(path)s'") % {'path': path})
+
+    def __extract(self, entry, staging):
+        if self.__index is None:
+            core.copy_file(self.__store.object_path(entry['object']), staging)
+        elif entry['object'] not in self.__index:
+            raise core.HardeningFailure(_("the backup is missing in the archive"))
+        else:
+            with open(staging, 'wb') as stream:
+                BackupArchive.extract(self.__rundir, self.__index[entry['object']], stream)
+
+        # objects may be hard links to the original files (see core::copy_file), which must
+        # not have been modified since
+        if BackupStore.digest(staging) != entry['object']:
+            raise core.HardeningFailure(_("the backup has been modified"))
+
+        with open(staging, 'rb') as stream:
+            os.fsync(stream.fileno())
+
+    @staticmethod
+    def __restore_metadata(entry):
+        os.chown(entry['path'], entry['uid'], entry['gid'])
+        os.chmod(entry['path'], entry['mode'])
+
+    @staticmethod
+    def __run_command(entry):
+        if entry['command'] is None:
+            raise core.HardeningFailure(_("the command cannot be undone"))
+
+        core.LogManager().get_logger().info("running command: " + " ".join(entry['command']))
+        process = subprocess.Popen(entry['command'],
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        stderr = process.communicate()[1]
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, entry['command'],
+                                                output=stderr)
@@ -0,0 +1,148 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import tempfile
+
+import hardening.info as info
+import hardening.storage as storage
+from hardening import core
+
+STATE_FILENAME = 'state.json'
+
+
+class StateStore(object):
+    """remembers the inputs of all utils of the last successful run, so that utils whose inputs are
+    unchanged can be skipped
+
+    The inputs of a util consist of its class, its merged and interpolated options and its resolved
+    transaction URL. If the util works on a file or directory, then the state of this target
+    (the `lstat()` information of the file or of every entry of the directory tree) is recorded as
+    well, after all changes have been committed. A util is skipped if its inputs and the state
+    of its target are unchanged since then. A util whose target does not exist is never skipped.
+
+    Only utils which work on files or directories (see storage::FileAndDirectoryTransaction) are
+    skipped, because the effect of commands cannot be checked this way. Incremental runs are only
+    used in silent mode, because in all other modes the user may have declined some changes; they
+    can be disabled using `--full`.
+
+    Like the cached execution plan (see scheduler::PlanCache), the state file is only used if it
+    and the cache directory are owned by the current user and are not accessible by other users.
+    """
+
+    def __init__(self, utils):
+        self.__filename = os.path.join(storage.TransactionInfo().get_cachedir(), STATE_FILENAME)
+
+        self.__targets = dict()
+        for util in utils:
+            target = self.__get_target(util)
+            if target is not None:
+                self.__targets[id(util)] = (self.__util_key(util), target)
+
+        # forget utils which are not part of the current plan anymore
+        previous_state = self.__load()
+        self.__state = {key: previous_state[key] for key, _ in self.__targets.values()
+                        if key in previous_state}
+
+    @staticmethod
+    def is_enabled():
+        return core.RuntimeOptions().incremental_mode()
+
+    def outdated_utils(self, utils):
+        """removes all utils whose inputs are unchanged since the last successful run
+
+        @param utils: list of utils
+        @return list of utils which have to be run
+        """
+        result = list()
+        for util in utils:
+            if id(util) in self.__targets:
+                key, target = self.__targets[id(util)]
+                current_state = core.path_fingerprint(target)
+                # a util whose target does not exist is always run, it may create the target
+                if current_state is not None and self.__state.get(key) == current_state:
+                    core.LogManager().get_logger().info(
+                        _("skipping util '%(util)s', because '%(target)s' is unchanged")
+                        % {'util': util, 'target': target})
+                    continue
+            result.append(util)
+        return result
+
+    def record(self, utils):
+        """records the state of the targets of all utils after their changes have been committed
+
+        @param utils: list of utils
+        """
+        for util in utils:
+            if id(util) in self.__targets:
+                key, target = self.__targets[id(util)]
+                current_state = core.path_fingerprint(target)
+                if current_state is None:
+                    self.__state.pop(key, None)
+                else:
+                    self.__state[key] = current_state
+
+        dirname = os.path.dirname(self.__filename)
+        try:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname, 0o700)
+            core.check_private_directory(dirname)
+
+            handle, tmpname = tempfile.mkstemp(dir=dirname, prefix=STATE_FILENAME)
+            with os.fdopen(handle, 'w') as stream:
+                json.dump(self.__state, stream, sort_keys=True)
+            os.rename(tmpname, self.__filename)
+        except (IOError, OSError, core.HardeningFailure) as error:
+            core.LogManager().get_logger().warning(
+                _("unable to write state file '%(filename)s': %(error)s")
+                % {'filename': self.__filename, 'error': str(error)})
+
+    def __load(self):
+        if not os.path.isfile(self.__filename):
+            return dict()
+
+        try:
+            # a state file which has been planted by another user would skip utils
+            with core.open_private_file(self.__filename) as stream:
+                state = json.load(stream)
+        except core.HardeningFailure as error:
+            core.LogManager().get_logger().warning(
+                _("ignoring state file: %(error)s") % {'error': str(error)})
+            return dict()
+        except (IOError, OSError, ValueError) as error:
+            core.LogManager().get_logger().debug(
+                "ignoring unreadable state file '%(filename)s': %(error)s"
+                % {'filename': self.__filename, 'error': str(error)})
+            return dict()
+
+        if not isinstance(state, dict):
+            return dict()
+        return state
+
+    @staticmethod
+    def __get_target(util):
+        transaction = util.transaction()
+        if not isinstance(transaction, storage.FileAndDirectoryTransaction) or \
+                transaction.url() is None:
+            return None
+        return os.path.normpath(transaction.url())
+
+    @staticmethod
+    def __util_key(util):
+        return core.fingerprint(util.__class__.__module__,
+                                util.__class__.__name__,
+                                info.Configuration().interpolate(util.option_values),
+                                util.get_transaction_key())
@@ -0,0 +1,92 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from hardening import core
+import hardening.storage as storage
+
+
+class UtilExecutor(object):
+    """runs the phases (setup, run, finish) of a list of utils on a pool of worker threads
+
+    The utils are grouped by the transactions they use: all utils whose transactions depend on
+    each other (see storage::TransactionManager::dependency_groups) are put into the same group.
+    Inside a group, the utils are processed sequentially and in the declared order; independent
+    groups are processed concurrently. Every phase is finished for all utils before the next phase
+    is started, exactly as if all utils were run sequentially.
+
+    The setup phase may use another number of workers than the other phases: it mostly waits for
+    file I/O and for commands which gather facts (such as `apache2ctl -V`), and its prompts are
+    serialized by core::PromptQueue, so it can be run concurrently even in interactive mode.
+    """
+
+    def __init__(self, utils, jobs=1, setup_jobs=None):
+        self.__pool = core.WorkerPool(jobs)
+        self.__setup_pool = core.WorkerPool(jobs if setup_jobs is None else setup_jobs)
+        self.__groups = self.__create_groups(utils)
+
+        core.LogManager().get_logger().debug(
+            "running %(utils)d utils in %(groups)d groups on %(jobs)d workers "
+            "(%(setup_jobs)d for setup)"
+            % {'utils': len(utils), 'groups': len(self.__groups), 'jobs': self.__pool.jobs(),
+               'setup_jobs': self.__setup_pool.jobs()})
+
+    @staticmethod
+    def __create_groups(utils):
+        if len(utils) == 0:
+            return []
+
+        # resolving the transaction of a util may require interpolation, so we do this only once
+        util_transactions = [util.transaction() for util in utils]
+
+        transactions = list()
+        known_transactions = set()
+        for transaction in util_transactions:
+            if id(transaction) not in known_transactions:
+                known_transactions.add(id(transaction))
+                transactions.append(transaction)
+
+        group_of = dict()
+        transaction_groups = storage.TransactionManager().dependency_groups(transactions)
+        for idx, group in enumerate(transaction_groups):
+            for transaction in group:
+                group_of[id(transaction)] = idx
+
+        groups = [list() for _ in transaction_groups]
+        for util, transaction in zip(utils, util_transactions):
+            groups[group_of[id(transaction)]].append(util)
+        return groups
+
+    def groups(self):
+        return self.__groups
+
+    def setup(self):
+        def setup_util(util):
+            util.setup()
+            assert util.transaction().is_transaction_running()
+
+        self.__run_phase(setup_util, self.__setup_pool)
+
+    def run(self):
+        self.__run_phase(lambda util: util.run(), self.__pool)
+
+    def finish(self):
+        self.__run_phase(lambda util: util.finish(), self.__pool)
+
+    def __run_phase(self, phase, pool):
+        def run_group(group):
+            for util in group:
+                phase(util)
+
+        pool.map(run_group, self.__groups)
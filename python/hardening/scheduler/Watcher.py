@@ -0,0 +1,157 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import signal
+import sys
+
+import hardening.storage as storage
+from hardening import core
+
+# if inotify is not available, all targets are checked for changes in this interval (in seconds)
+POLL_INTERVAL = 60
+
+
+class Watcher(object):
+    """runs all modules once and runs the affected utils again whenever one of their files or
+    directories is modified
+
+    Every util which works on a file or a directory (see storage::FileAndDirectoryTransaction) is
+    mapped to the path of its transaction. These paths are monitored using core::FileMonitor. If a
+    path is modified, e.g. by a package upgrade which replaces `/etc/ssh/sshd_config`, all utils
+    which work on this path are run again, in the order of the execution plan, and their changes
+    are committed. In pretend mode, the changes are only reported.
+
+    A path counts as modified if its metadata (see core::path_fingerprint) differs from the state
+    after the last run, so the changes made by the utils themselves do not trigger another run.
+    Utils which only run commands are not run again.
+    """
+
+    def __init__(self, scheduler):
+        self.__scheduler = scheduler
+        # key: target path, value: list of utils which work on this path
+        self.__targets = dict()
+        # key: id of util, value: target path
+        self.__util_targets = dict()
+        self.__fingerprints = dict()
+        self.__stopped = False
+
+    def run(self):
+        """runs all modules and watches their files until the process is terminated"""
+        signal.signal(signal.SIGTERM, self.__stop)
+        try:
+            self.__watch()
+        except KeyboardInterrupt:
+            pass
+        except SystemExit:
+            if not self.__stopped:
+                raise
+
+    def __watch(self):
+        utils = self.__scheduler.plan()
+        for util in utils:
+            target = self.__get_target(util)
+            if target is not None:
+                self.__targets.setdefault(target, list()).append(util)
+                self.__util_targets[id(util)] = target
+        storage.TransactionManager().clear()
+
+        self.__run_utils(utils, list(self.__targets.keys()))
+
+        monitor = core.FileMonitor()
+        try:
+            for target in self.__targets:
+                monitor.watch(target)
+            core.LogManager().get_logger().info(
+                _("watching %(count)d files and directories for changes")
+                % {'count': len(self.__targets)})
+
+            while not self.__stopped:
+                changed_paths = monitor.wait(None if monitor.is_supported() else POLL_INTERVAL)
+                changed_targets = self.changed_targets(changed_paths)
+                if len(changed_targets) == 0:
+                    continue
+
+                affected = set()
+                for target in changed_targets:
+                    core.LogManager().get_logger().info(
+                        _("'%(path)s' has been modified") % {'path': target})
+                    affected.update(id(util) for util in self.__targets[target])
+
+                self.__run_utils([util for util in utils if id(util) in affected],
+                                 changed_targets)
+        finally:
+            monitor.close()
+
+    def changed_targets(self, changed_paths):
+        """determines which targets have been modified since the last run
+
+        @param changed_paths: paths reported by core::FileMonitor::wait(), or `None` to check
+        all targets
+        @return list of targets
+        """
+        result = list()
+        for target in self.__targets:
+            if changed_paths is not None and \
+                    not any(self.__contains(target, path) or self.__contains(path, target)
+                            for path in changed_paths):
+                continue
+            if core.path_fingerprint(target) != self.__fingerprints.get(target):
+                result.append(target)
+        return result
+
+    def __run_utils(self, utils, targets):
+        core.LogManager().get_logger().info(
+            _("running %(count)d utils") % {'count': len(utils)})
+
+        # every run gets its own backup directory
+        core.reset_singleton(storage.TransactionInfo)
+        try:
+            self.__scheduler.run_utils(utils)
+        except SystemExit:
+            if self.__stopped:
+                raise
+            core.LogManager().get_logger().error(_("the hardening has been aborted"))
+        finally:
+            storage.TransactionManager().clear()
+            self.__store_log()
+
+        touched = set(targets)
+        touched.update(self.__util_targets[id(u)] for u in utils if id(u) in self.__util_targets)
+        for target in touched:
+            self.__fingerprints[target] = core.path_fingerprint(target)
+
+    @staticmethod
+    def __store_log():
+        if core.RuntimeOptions().is_log_enabled() and core.ChangeLog().has_items_to_save():
+            core.ChangeLog().store_log()
+            core.RuntimeOptions().logfile().flush()
+        core.ChangeLog().clear()
+
+    @staticmethod
+    def __get_target(util):
+        transaction = util.transaction()
+        if not isinstance(transaction, storage.FileAndDirectoryTransaction) or \
+                transaction.url() is None:
+            return None
+        return os.path.normpath(transaction.url())
+
+    @staticmethod
+    def __contains(directory, path):
+        return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+    def __stop(self, *_):
+        self.__stopped = True
+        sys.exit(0)
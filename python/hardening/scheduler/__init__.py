@@ -13,7 +13,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import importlib
+import functools
 import inspect
 import os
 import sys
@@ -24,10 +24,19 @@ import six
 import hardening.info as info
 import hardening.storage as storage
 from hardening import core
+from hardening.utils.UtilRegistry import UtilRegistry
 from hardening.utils.DisabledUtil import DisabledUtil
 from hardening.utils.DisabledSection import DisabledSection
 from hardening.utils.module.LeaveModule import LeaveModule
 from hardening.utils.module.EnterModule import EnterModule, constants, io
+from hardening.scheduler.UtilExecutor import UtilExecutor
+from hardening.scheduler.PlanCache import PlanCache
+from hardening.scheduler.CheckpointJournal import CheckpointJournal
+from hardening.scheduler.StateStore import StateStore
+from hardening.scheduler.BatchDriver import BatchDriver
+from hardening.scheduler.Daemon import Daemon
+from hardening.scheduler.Watcher import Watcher
+from hardening.scheduler.Restorer import Restorer
 
 
 # noinspection PyPep8Naming
@@ -51,31 +60,64 @@ class Scheduler(object):
         #        be invoked
         self.__modules = dict()
         self.__utils = []
+        # fingerprints of the scheduled utils (see HardeningUtil::fingerprint)
+        self.__scheduled_utils = set()
+        self.__state_store = None
         self.__module_state = self.__read_available_modules()
 
     def run_hardening_modules(self):
         """runs all configured modules
 
-        This method calculates an execution order of core::HardeningUtil instances and runs the
+        This method calculates an execution order of core::HardeningUtil instances (or reuses the
+        one which has been calculated by a previous run, see scheduler::PlanCache) and runs the
         following methods, in order:
 
+         -# core::HardeningUtil::setup() is run for all utils
          -# core::HardeningUtil::run() is run for all utils
          -# core::HardeningUtil::finish() is run for all utils
          -# storage::TransactionManager::commit_all() is run
 
+        Utils which use independent transactions may be run concurrently (see
+        scheduler::UtilExecutor and the `--jobs` option), but every step is completed for all
+        utils before the next step is started.
+
+        In silent mode, utils whose inputs are unchanged since the last successful run are skipped
+        (see scheduler::StateStore and the `--full` option).
+
+        If checkpoints are enabled (`--checkpoint` or `--resume`), then these steps are run for
+        every module separately and the changes of every module are committed as soon as the
+        module is finished (see scheduler::CheckpointJournal).
+
         If an error occurs or if the user interrupts the execution, then
         storage::TransactionManager::rollback_all() is run
         """
+        self.plan()
+
+        if core.RuntimeOptions().checkpoint_mode():
+            self.__run_with_checkpoints()
+        else:
+            self.__run_utils(self.__utils)
+            self.__finish_backups()
+            self.__display_backup_location()
+
+    def plan(self):
+        """calculates the execution plan of all configured modules (see
+        Scheduler::run_hardening_modules), but does not run any util
+
+        @return list of utils, in the order in which they have to be run
+        """
         try:
             self.__load_modules()
 
-            for module, is_enabled in six.iteritems(self.__module_state):
-                if is_enabled:
-                    self.__load_utils(module)
+            if PlanCache.is_enabled():
+                enabled_modules = [module for module, is_enabled
+                                   in six.iteritems(self.__module_state) if is_enabled]
+                self.__utils = PlanCache(enabled_modules).plan(self.__create_plan)
+            else:
+                self.__create_plan()
 
-            for util in self.__utils:
-                util.setup()
-                assert util.transaction().is_transaction_running()
+            if StateStore.is_enabled():
+                self.__state_store = StateStore(self.__utils)
 
         except KeyboardInterrupt:
             core.LogManager().get_logger().warning(
@@ -86,14 +128,88 @@ class Scheduler(object):
             self.print_stackstrace()
             sys.exit(-1)
 
+        return self.__utils
+
+    def run_utils(self, utils):
+        """runs some utils of the execution plan (see Scheduler::plan) and commits their changes
+
+        @param utils: list of utils, in the order of the execution plan
+        """
+        self.__run_utils(utils)
+
+    def __run_with_checkpoints(self):
+        modules = self.__split_modules(self.__utils)
+        module_names = [module for module, _ in modules]
+
+        resumable = None
+        if core.RuntimeOptions().resume_mode():
+            resumable = CheckpointJournal.find_resumable()
+
+        if resumable is None:
+            journal = CheckpointJournal(module_names)
+        else:
+            journal = CheckpointJournal(module_names, resumed_journal=resumable[0])
+            journal.copy_checkpoints(resumable[1])
+
+        completed_modules = journal.completed_modules()
+        for module, utils in modules:
+            if module in completed_modules:
+                core.LogManager().get_logger().info(
+                    _("skipping module '%(module)s', which has been committed by the resumed run")
+                    % {'module': module})
+                continue
+
+            sections = list()
+            for util in utils:
+                section = util.get_runtimeinfo(constants.OPTION_SECTION, interpolate=False)
+                if section is not None and section not in sections:
+                    sections.append(section)
+
+            self.__run_utils(utils, checkpoint=functools.partial(journal.checkpoint,
+                                                                 module, sections))
+
+        journal.finish()
+        self.__finish_backups()
+        self.__display_backup_location()
+
+    @staticmethod
+    def __split_modules(utils):
+        """splits the list of utils into lists of utils per module
+
+        @return list of tuples (module name, list of utils)
+        """
+        modules = list()
+        for util in utils:
+            if isinstance(util, EnterModule) or len(modules) == 0:
+                modules.append((util.get_runtimeinfo(constants.OPTION_MODULE, interpolate=False),
+                                list()))
+            modules[-1][1].append(util)
+        return modules
+
+    def __run_utils(self, utils, checkpoint=None):
         try:
-            for util in self.__utils:
-                util.run()
+            if self.__state_store is not None:
+                utils = self.__state_store.outdated_utils(utils)
+            executor = UtilExecutor(utils, core.RuntimeOptions().jobs(),
+                                    core.RuntimeOptions().setup_jobs())
+            executor.setup()
 
-            for util in self.__utils:
-                util.finish()
+        except KeyboardInterrupt:
+            core.LogManager().get_logger().warning(
+                _("aborting execution upon user request"))
+            sys.exit(-1)
+        except SyntaxError as error:
+            core.LogManager().get_logger().fatal("%s" % str(error))
+            self.print_stackstrace()
+            sys.exit(-1)
+
+        try:
+            executor.run()
+            executor.finish()
 
-            self.__store_changes()
+            self.__store_changes(checkpoint)
+            if self.__state_store is not None:
+                self.__state_store.record(utils)
         except SystemExit:
             storage.TransactionManager().rollback_all()
             raise
@@ -121,14 +237,54 @@ class Scheduler(object):
                     core.LogManager().get_logger().fatal(line)
 
     @staticmethod
-    def __store_changes():
+    def __finish_backups():
+        """closes the backup of this run and removes old runs (see `Backup/KeepRuns`) and
+        unreferenced objects from the backup store"""
+        if core.RuntimeOptions().pretend_mode():
+            return
+        storage.TransactionInfo().get_backup_store().close()
+        keep_runs = info.Configuration().get_property(
+            constants.CONFIG_BACKUP, constants.CONFIG_KEEPRUNS, default=None)
+        if keep_runs is None:
+            return
+
+        removed_runs, removed_objects = \
+            storage.TransactionInfo().get_backup_store().collect_garbage(int(keep_runs))
+        if removed_objects is None:
+            core.LogManager().get_logger().info(
+                _("removed %(runs)d old backups; unreferenced backup objects have been kept")
+                % {'runs': removed_runs})
+        else:
+            core.LogManager().get_logger().info(
+                _("removed %(runs)d old backups and %(objects)d unreferenced backup objects")
+                % {'runs': removed_runs, 'objects': removed_objects})
+
+    @staticmethod
+    def __display_backup_location():
+        if not core.RuntimeOptions().pretend_mode():
+            io.create_writer().display_message(
+                headline=_("Backup location"),
+                message=_("backups have been written to '%(backupdir)s'")
+                % {'backupdir': storage.TransactionInfo().get_backupdir()})
+
+    @staticmethod
+    def __store_changes(checkpoint=None):
+        """commits all transactions
+
+        @param checkpoint: if not `None`, the transactions are committed using
+        storage::TransactionManager::checkpoint() and this callable is invoked with the list of
+        the committed transactions
+        """
         try:
-            storage.TransactionManager().commit_all()
+            if checkpoint is None:
+                transactions = storage.TransactionManager().commit_all()
+            else:
+                transactions = storage.TransactionManager().checkpoint()
+                checkpoint(transactions)
+
+            # committed services and files may change the results of `run-if` conditions
             if not core.RuntimeOptions().pretend_mode():
-                io.create_writer().display_message(
-                    headline=_("Backup location"),
-                    message=_("backups have been written to '%(backupdir)s'")
-                    % {'backupdir': storage.TransactionInfo().get_backupdir()})
+                info.RunConditions().invalidate(transactions)
 
         except SystemExit:
             # do not roll back after commit has been started
@@ -150,6 +306,12 @@ class Scheduler(object):
 
             raise
 
+    def __create_plan(self):
+        for module, is_enabled in six.iteritems(self.__module_state):
+            if is_enabled:
+                self.__load_utils(module)
+        return self.__utils
+
     def __load_utils(self, module):
         self.__load_module_configuration(module)  # load meta information
 
@@ -207,7 +369,7 @@ class Scheduler(object):
                 _("aborting execution upon user request"))
             sys.exit(-1)
 
-        if not core.RuntimeOptions().silent_mode():
+        if not core.RuntimeOptions().unattended_mode():
             self.__select_cms()
             self.__confirm_module_state()
 
@@ -293,7 +455,7 @@ class Scheduler(object):
                                                              constants.CONFIG_RUNUTILS,
                                                              interpolate=False):
             util = self.__create_util_object(module, section, util_config)
-            if util in self.__utils:
+            if util.fingerprint() in self.__scheduled_utils:
                 core.LogManager().get_logger().info(_("util '%(util)s' is already scheduled")
                                                     % {'util': util})
             elif not util.is_enabled():
@@ -307,17 +469,13 @@ class Scheduler(object):
                                                                     False)}}))
             else:
                 self.__utils.append(util)
+                self.__scheduled_utils.add(util.fingerprint())
 
     @staticmethod
     def __is_section_enabled(module, section):
-        res = info.Configuration().get_property(
+        return info.RunConditions().is_true(info.Configuration().get_property(
             module, section, constants.CONFIG_OPTIONS, constants.CONFIG_RUNIF,
-            default=True)
-        if isinstance(res, bool):
-            return res
-        else:
-            assert isinstance(res, list)
-            return six.moves.reduce(lambda x, y: x and y, res)
+            default=True, interpolate=False))
 
     @staticmethod
     def __read_available_modules():
@@ -329,7 +487,8 @@ class Scheduler(object):
                     modules[yaml_file.replace(".yml", "")] = False
         return modules
 
-    def __create_util_object(self, module, section, util_cfg):
+    @staticmethod
+    def __create_util_object(module, section, util_cfg):
         (util_name, util_config), = list(util_cfg.items())
         section_options = info.Configuration().get_property(
             module, section, constants.CONFIG_OPTIONS, default=dict(), interpolate=False)
@@ -345,31 +504,9 @@ class Scheduler(object):
         util_config[constants.CONFIG_RUNTIME][
             constants.OPTION_SECTION] = section
 
-        pkg_name = 'hardening.utils' + '.' + util_name
-        cls_name = util_name.split('.')[-1]
-
-        pkg = importlib.import_module(pkg_name)
-        cls = self.__import_class(pkg, cls_name)
-
+        cls = UtilRegistry().get_class(util_name)
         return cls(option_values=util_config)
 
-    @staticmethod
-    def __import_class(module, class_name):
-        cls = getattr(module, class_name)
-
-        # we could have used issubclass here, but we had to avoid importing
-        # HardeningUtil
-        if 'utils.HardeningUtil.HardeningUtil' not in [x.__module__ + "." + x.__name__ for x in
-                                                       inspect.getmro(cls)]:
-            core.LogManager().get_logger().debug(_("imported %(module)s.%(class)s") %
-                                                 {'module': module.__name__,
-                                                  'class': cls.__name__})
-            return cls
-        else:
-            core.LogManager().get_logger().warn(class_name +
-                                                _(" is not a subclass of HardeningUtil"))
-            return None
-
     @staticmethod
     def __package_prefix(package):
         package_basepath = os.path.dirname(inspect.getfile(package))
@@ -0,0 +1,133 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import tempfile
+import threading
+import zlib
+
+ARCHIVE_FILENAME = 'backup.gz'
+INDEX_FILENAME = 'backup.index.json'
+
+COMPRESSION_LEVEL = 6
+# window size which makes zlib read and write the gzip format
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+BLOCK_SIZE = 1024 * 1024
+
+
+class BackupArchive(object):
+    """stores the backup contents of a run in a single compressed file
+
+    Every object is appended to `backup.gz` as a separate gzip member, so the archive is written as
+    one sequential stream and is still a valid gzip file (`zcat backup.gz` prints all objects).
+    The index (`backup.index.json`) maps the digest of every object to the offset and length of
+    its member, so that a single object can be extracted without decompressing the others.
+    """
+
+    def __init__(self, rundir):
+        self.__rundir = rundir
+        # key: digest, value: dictionary with `offset`, `length` (compressed) and `size`
+        self.__index = dict()
+        self.__stream = None
+        self.__lock = threading.Lock()
+
+    def archive_path(self):
+        return os.path.join(self.__rundir, ARCHIVE_FILENAME)
+
+    def index_path(self):
+        return os.path.join(self.__rundir, INDEX_FILENAME)
+
+    def contains(self, digest):
+        with self.__lock:
+            return digest in self.__index
+
+    def add(self, digest, filename):
+        """appends the contents of a file, unless an object with the same digest has been added
+
+        @param digest: digest of the contents (see storage::BackupStore::digest)
+        @param filename: name of a regular file
+        """
+        with self.__lock:
+            if digest in self.__index:
+                return
+
+            if self.__stream is None:
+                self.__stream = open(self.archive_path(), 'ab')
+            self.__stream.seek(0, os.SEEK_END)
+            offset = self.__stream.tell()
+
+            compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+            size = 0
+            with open(filename, 'rb') as source:
+                for block in iter(lambda: source.read(BLOCK_SIZE), b""):
+                    size += len(block)
+                    self.__stream.write(compressor.compress(block))
+            self.__stream.write(compressor.flush())
+            # the archive is synced to disk together with all other changes of the commit (see
+            # storage::CommitLog)
+            self.__stream.flush()
+
+            self.__index[digest] = {'offset': offset,
+                                    'length': self.__stream.tell() - offset,
+                                    'size': size}
+
+    def write_index(self):
+        """writes the index atomically, if any object has been added"""
+        with self.__lock:
+            if len(self.__index) == 0:
+                return
+            handle, staging = tempfile.mkstemp(prefix="." + INDEX_FILENAME, dir=self.__rundir)
+            with os.fdopen(handle, 'w') as index:
+                json.dump(self.__index, index, sort_keys=True)
+                index.flush()
+                os.fsync(index.fileno())
+            os.rename(staging, self.index_path())
+
+    def close(self):
+        self.write_index()
+        with self.__lock:
+            if self.__stream is not None:
+                self.__stream.close()
+                self.__stream = None
+
+    @staticmethod
+    def read_index(rundir):
+        """reads the index of the archive of a run
+
+        @return dictionary which maps digests to the positions of their members
+        """
+        with open(os.path.join(rundir, INDEX_FILENAME), 'r') as index:
+            return json.load(index)
+
+    @staticmethod
+    def extract(rundir, position, destination):
+        """decompresses a single object
+
+        @param rundir: directory of the run which contains the archive
+        @param position: entry of the index (see BackupArchive::read_index)
+        @param destination: stream to which the contents are written
+        """
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        remaining = position['length']
+        with open(os.path.join(rundir, ARCHIVE_FILENAME), 'rb') as archive:
+            archive.seek(position['offset'])
+            while remaining > 0:
+                block = archive.read(min(remaining, BLOCK_SIZE))
+                if not block:
+                    raise IOError("unexpected end of '%s'" % archive.name)
+                remaining -= len(block)
+                destination.write(decompressor.decompress(block))
+        destination.write(decompressor.flush())
@@ -0,0 +1,490 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import tempfile
+import threading
+
+from hardening import core
+from hardening.core.FileCopy import METHOD_REFLINK
+from hardening.storage.BackupArchive import BackupArchive
+
+MANIFEST_FILENAME = 'manifest.json'
+MANIFEST_VERSION = 1
+OBJECTS_DIRNAME = 'objects'
+LOCK_FILENAME = '.lock'
+
+# formats in which the contents of the original files are stored
+FORMAT_OBJECTS = 'objects'
+FORMAT_ARCHIVE = 'archive'
+
+# types of manifest entries
+ENTRY_FILE = 'file'
+ENTRY_DIRECTORY = 'directory'
+ENTRY_SYMLINK = 'symlink'
+ENTRY_METADATA = 'metadata'
+ENTRY_ABSENT = 'absent'
+ENTRY_COMMAND = 'command'
+
+BLOCK_SIZE = 1024 * 1024
+
+# names of complete objects; staging files start with a dot
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+PREFIX_PATTERN = re.compile(r'^[0-9a-f]{2}$')
+
+
+class BackupStore(object):
+    """stores the original state of all changed files and directories of a run
+
+    File contents are stored only once in a content-addressed object store, which is shared by
+    all runs: every object is named by the SHA-256 digest of its contents
+    (`<basedir>/objects/ab/cdef...`), so an unchanged file is never written twice. Every run only
+    records a manifest (`<basedir>/<timestamp>/manifest.json`), which lists the changed paths in
+    the order in which they have been changed. Every entry has a `type`:
+
+    | Type | Meaning |
+    | ---- | ------- |
+    | `file` | a regular file; `object` is the digest of its contents |
+    | `directory` | a directory, whose contents are listed in separate entries |
+    | `symlink` | a symbolic link pointing to `target` |
+    | `metadata` | only the ownership and permissions of the path have been changed |
+    | `absent` | the path did not exist before |
+    | `command` | `commit` has been run; `command` undoes it, or is `null` if it cannot be undone |
+
+    All entries except `absent` and `command` contain the `path` and its original `uid`, `gid`
+    and `mode`. If a path has been
+    changed several times during a run, its first entry describes its original state.
+
+    An object must never change once it has been stored. Therefore, an object is either an
+    independent copy of the original file, or a hard link to a file which had no other links and
+    has been replaced or deleted right afterwards (see BackupStore::release), so that nobody can
+    modify its contents anymore.
+
+    Objects which are not referenced by any manifest are removed by
+    BackupStore::collect_garbage(), which also removes the oldest runs if the number of runs is
+    limited (see `Backup/KeepRuns`).
+
+    Several processes may use the same object store at the same time (e.g. for different root
+    filesystems), and the objects of a run are only referenced once its manifest has been written.
+    Therefore, every run holds a shared lock (`flock(2)`) on `<basedir>/.lock` from the moment it
+    stores its first object until its manifest has been written by BackupStore::close(), and
+    BackupStore::collect_garbage() only removes objects while it holds the exclusive lock. The
+    lock is released by the operating system if a run is terminated.
+
+    If the `archive` format is used (see `Backup/Format`), the contents are not written to the
+    object store, but streamed into a single compressed archive in the directory of the run (see
+    storage::BackupArchive). The format is recorded in the manifest.
+    """
+
+    def __init__(self, basedir, rundir, mode=0o700, backup_format=FORMAT_OBJECTS):
+        """
+        @param basedir: directory which contains the object store and the directories of all runs
+        @param rundir: directory of the current run, which is created when the manifest is written
+        @param mode: permissions of newly created directories
+        @param backup_format: `objects` or `archive`
+        """
+        if backup_format not in (FORMAT_OBJECTS, FORMAT_ARCHIVE):
+            raise SyntaxError(_("invalid backup format: '%(format)s'") % {'format': backup_format})
+
+        self.__basedir = basedir
+        self.__rundir = rundir
+        self.__objectdir = os.path.join(basedir, OBJECTS_DIRNAME)
+        self.__mode = mode
+        self.__format = backup_format
+        self.__archive = BackupArchive(rundir) if backup_format == FORMAT_ARCHIVE else None
+        self.__entries = list()
+        # key: name of a file which has been copied into the object store during this run,
+        # value: tuple (digest, identity of the file when it has been copied)
+        self.__copies = dict()
+        self.__lock = threading.Lock()
+        # the lock file of the object store, while this run holds a shared lock on it
+        self.__store_lock = None
+
+    def backup_format(self):
+        return self.__format
+
+    def object_path(self, digest):
+        """returns the name of the file which contains an object
+
+        @param digest: SHA-256 digest of the contents, as hexadecimal string
+        """
+        return os.path.join(self.__objectdir, digest[:2], digest[2:])
+
+    def store_object(self, filename):
+        """copies the contents of a file into the object store, unless they are stored already
+
+        The file is copied using core::copy_file, so the object shares its data blocks with the
+        original file if the filesystem supports reflinks. The object is never a hard link to the
+        file, because the file may still be modified in place afterwards; see
+        BackupStore::release. The object is not synced to disk; this is done for all objects of a
+        commit at once (see storage::CommitLog).
+
+        @param filename: name of a regular file
+        @return the digest of the contents
+        """
+        status = os.lstat(filename)
+        digest = self.digest(filename)
+        if self.__archive is not None:
+            self.__create_directory(self.__rundir)
+            self.__archive.add(digest, filename)
+            return digest
+
+        self.__lock_store()
+        object_path = self.object_path(digest)
+        if os.path.exists(object_path):
+            return digest
+
+        directory = os.path.dirname(object_path)
+        self.__create_directory(directory)
+
+        # several threads may store the same object; the last rename wins, which is harmless
+        handle, staging = tempfile.mkstemp(prefix=".", dir=directory)
+        os.close(handle)
+        try:
+            method = core.copy_file(filename, staging)
+            os.rename(staging, object_path)
+        # pylint: disable=bare-except
+        except:
+            if os.path.lexists(staging):
+                os.unlink(staging)
+            raise
+
+        # a reflink shares the data blocks with the file already
+        if method != METHOD_REFLINK:
+            with self.__lock:
+                self.__copies[filename] = (digest, self.__file_key(status))
+        return digest
+
+    def release(self, path):
+        """replaces the objects which have been copied from a file, or from the files inside a
+        directory, by hard links to these files, so that their data blocks are kept instead of
+        being freed
+
+        This must only be called right before `path` is replaced or deleted, because the files
+        must never be modified in place afterwards. Files which have been modified since they have
+        been copied are skipped, as well as files with more than one link and files on another
+        filesystem than the object store.
+
+        @param path: name of the file or directory
+        """
+        prefix = path.rstrip(os.sep) + os.sep
+        with self.__lock:
+            names = [name for name in self.__copies if name == path or name.startswith(prefix)]
+            copies = [(name, self.__copies.pop(name)) for name in names]
+
+        for name, (digest, key) in copies:
+            try:
+                self.__link_object(name, digest, key)
+            except OSError as error:
+                # the copy is kept
+                core.LogManager().get_logger().debug(
+                    "unable to link the backup of '%(filename)s': %(error)s"
+                    % {'filename': name, 'error': str(error)})
+
+    def __link_object(self, filename, digest, key):
+        status = os.lstat(filename)
+        if self.__file_key(status) != key:
+            return
+        if status.st_nlink > 1:
+            # the other links survive the replacement of the file, and may be modified in place
+            return
+
+        object_path = self.object_path(digest)
+        handle, staging = tempfile.mkstemp(prefix=".", dir=os.path.dirname(object_path))
+        os.close(handle)
+        os.unlink(staging)
+        try:
+            os.link(filename, staging)
+            os.rename(staging, object_path)
+        # pylint: disable=bare-except
+        except:
+            if os.path.lexists(staging):
+                os.unlink(staging)
+            raise
+
+    def __lock_store(self):
+        # protects the objects of this run from BackupStore::collect_garbage() of other runs until
+        # they are referenced by the manifest
+        with self.__lock:
+            if self.__store_lock is None:
+                lock_file = self.__open_lock_file()
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+                self.__store_lock = lock_file
+
+    def __unlock_store(self):
+        with self.__lock:
+            if self.__store_lock is not None:
+                # closing the file releases the lock
+                self.__store_lock.close()
+                self.__store_lock = None
+
+    def __open_lock_file(self):
+        self.__create_directory(self.__basedir)
+        handle = os.open(os.path.join(self.__basedir, LOCK_FILENAME),
+                         os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        return os.fdopen(handle, 'a')
+
+    @staticmethod
+    def __file_key(status):
+        return status.st_dev, status.st_ino, status.st_size, status.st_mtime
+
+    def __create_directory(self, directory):
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory, self.__mode)
+            except OSError as error:
+                # another thread may have created the directory in the meantime
+                if error.errno != errno.EEXIST:
+                    raise
+
+    @staticmethod
+    def digest(filename):
+        """calculates the SHA-256 digest of the contents of a file
+
+        @return hexadecimal digest as string
+        """
+        sha256 = hashlib.sha256()
+        with open(filename, 'rb') as source:
+            for block in iter(lambda: source.read(BLOCK_SIZE), b""):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+    def backup(self, path):
+        """records the original state of a file, symbolic link or directory (but not of the
+        contents of the directory, see BackupStore::backup_tree)
+
+        @param path: absolute name of an existing path
+        @return the recorded manifest entry
+        """
+        status = os.lstat(path)
+        entry = self.__entry(path, status)
+        if stat.S_ISLNK(status.st_mode):
+            entry.update(type=ENTRY_SYMLINK, target=os.readlink(path))
+        elif stat.S_ISDIR(status.st_mode):
+            entry.update(type=ENTRY_DIRECTORY)
+        else:
+            entry.update(type=ENTRY_FILE, object=self.store_object(path))
+        return self.__append(entry)
+
+    def backup_tree(self, directory):
+        """records the original state of a directory and of all its contents
+
+        @param directory: absolute name of an existing directory
+        """
+        self.backup(directory)
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for name in sorted(dirs + files):
+                self.backup(os.path.join(root, name))
+
+    def backup_metadata(self, path, status=None):
+        """records the original ownership and permissions of a path whose contents are not changed
+
+        @param path: absolute name of an existing path
+        @param status: result of `os.stat()`, if it is known already
+        @return the recorded manifest entry
+        """
+        entry = self.__entry(path, status or os.stat(path))
+        entry.update(type=ENTRY_METADATA)
+        return self.__append(entry)
+
+    def backup_absent(self, path):
+        """records that a path did not exist before it has been created
+
+        @param path: absolute name of the new path
+        @return the recorded manifest entry
+        """
+        return self.__append({'path': path, 'type': ENTRY_ABSENT})
+
+    def backup_command(self, commit_command, rollback_command):
+        """records that a command has been run
+
+        @param commit_command: the command which has been run, as list of strings
+        @param rollback_command: the command which undoes it, or `None`
+        @return the recorded manifest entry
+        """
+        return self.__append({'type': ENTRY_COMMAND,
+                              'commit': commit_command,
+                              'command': rollback_command})
+
+    @staticmethod
+    def __entry(path, status):
+        return {'path': path,
+                'uid': status.st_uid,
+                'gid': status.st_gid,
+                'mode': stat.S_IMODE(status.st_mode)}
+
+    def __append(self, entry):
+        with self.__lock:
+            self.__entries.append(entry)
+        return entry
+
+    def entries(self):
+        """returns the entries which have been recorded during the current run"""
+        with self.__lock:
+            return list(self.__entries)
+
+    def manifest_path(self):
+        return os.path.join(self.__rundir, MANIFEST_FILENAME)
+
+    def write_manifest(self):
+        """writes the manifest of the current run, if anything has been recorded
+
+        The manifest is replaced atomically, so it may be written after every commit.
+        """
+        entries = self.entries()
+        if len(entries) == 0:
+            return
+
+        self.__create_directory(self.__rundir)
+        if self.__archive is not None:
+            self.__archive.write_index()
+
+        handle, staging = tempfile.mkstemp(prefix="." + MANIFEST_FILENAME, dir=self.__rundir)
+        with os.fdopen(handle, 'w') as manifest:
+            json.dump({'version': MANIFEST_VERSION, 'format': self.__format, 'entries': entries},
+                      manifest, indent=1, sort_keys=True)
+            manifest.flush()
+            os.fsync(manifest.fileno())
+        os.rename(staging, self.manifest_path())
+
+    def close(self):
+        """writes the manifest and closes the archive of the current run
+
+        Afterwards, the objects of this run are no longer protected from
+        BackupStore::collect_garbage() of other runs, except by the manifest.
+        """
+        self.write_manifest()
+        if self.__archive is not None:
+            self.__archive.close()
+        self.__unlock_store()
+
+    @staticmethod
+    def read_manifest(rundir):
+        """reads the manifest of a run
+
+        @param rundir: directory of the run
+        @return dictionary with the `format` of the backup and the list of `entries`
+        """
+        with open(os.path.join(rundir, MANIFEST_FILENAME), 'r') as manifest:
+            content = json.load(manifest)
+        if content.get('version') != MANIFEST_VERSION:
+            raise core.HardeningFailure(
+                _("unsupported backup manifest in '%(rundir)s'") % {'rundir': rundir})
+        content.setdefault('format', FORMAT_OBJECTS)
+        return content
+
+    def runs(self):
+        """returns the directories of all runs which have written a manifest, oldest first"""
+        if not os.path.isdir(self.__basedir):
+            return []
+        rundirs = [os.path.join(self.__basedir, name) for name in sorted(os.listdir(self.__basedir))
+                   if name != OBJECTS_DIRNAME]
+        return [rundir for rundir in rundirs
+                if os.path.isfile(os.path.join(rundir, MANIFEST_FILENAME))]
+
+    def collect_garbage(self, keep_runs=None):
+        """removes old runs and all objects which are not referenced anymore
+
+        Only complete objects are removed; the staging files of objects which are being stored
+        by another process (e.g. for another root filesystem) are left alone. If the manifest of
+        any run cannot be read, no objects are removed, because the objects it references are
+        unknown. Nothing is removed while another run holds the shared lock on the object store,
+        because the manifest of that run, which references its new objects, may not have been
+        written yet.
+
+        @param keep_runs: number of runs to keep (including the current run), or `None` to keep
+        all runs
+        @return tuple (number of removed runs, number of removed objects). The number of removed
+        objects is `None` if no objects have been removed because a manifest could not be read or
+        another run is storing objects
+        """
+        if not os.path.isdir(self.__basedir):
+            return 0, 0
+
+        with self.__lock:
+            lock_file = self.__store_lock or self.__open_lock_file()
+            try:
+                # converts the shared lock of this run, if it holds one
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError) as error:
+                if lock_file is not self.__store_lock:
+                    lock_file.close()
+                if error.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+                core.LogManager().get_logger().warning(
+                    _("another run is storing backups in '%(basedir)s', keeping all old backups "
+                      "and objects") % {'basedir': self.__basedir})
+                return 0, None
+
+        try:
+            return self.__collect_garbage(keep_runs)
+        finally:
+            with self.__lock:
+                if lock_file is self.__store_lock:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+                else:
+                    lock_file.close()
+
+    def __collect_garbage(self, keep_runs):
+        runs = self.runs()
+        removed_runs = 0
+        if keep_runs is not None and len(runs) > keep_runs:
+            for rundir in runs[:len(runs) - keep_runs]:
+                if os.path.normpath(rundir) == os.path.normpath(self.__rundir):
+                    continue
+                core.LogManager().get_logger().info(
+                    _("removing old backup '%(rundir)s'") % {'rundir': rundir})
+                shutil.rmtree(rundir)
+                removed_runs += 1
+
+        referenced = set()
+        for rundir in self.runs():
+            try:
+                manifest = self.read_manifest(rundir)
+            except (ValueError, KeyError, core.HardeningFailure) as error:
+                # the objects which are referenced by this run are unknown
+                core.LogManager().get_logger().warning(
+                    _("unable to read backup manifest of '%(rundir)s', keeping all objects: "
+                      "%(error)s") % {'rundir': rundir, 'error': str(error)})
+                return removed_runs, None
+            if manifest['format'] == FORMAT_OBJECTS:
+                referenced.update(entry['object'] for entry in manifest['entries']
+                                  if 'object' in entry)
+        referenced.update(entry['object'] for entry in self.entries() if 'object' in entry)
+
+        removed_objects = 0
+        if os.path.isdir(self.__objectdir):
+            for prefix in os.listdir(self.__objectdir):
+                directory = os.path.join(self.__objectdir, prefix)
+                if not PREFIX_PATTERN.match(prefix) or not os.path.isdir(directory):
+                    continue
+                for name in os.listdir(directory):
+                    if DIGEST_PATTERN.match(prefix + name) and prefix + name not in referenced:
+                        os.unlink(os.path.join(directory, name))
+                        removed_objects += 1
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    # the directory is not empty, or another process is storing an object in it
+                    pass
+        return removed_runs, removed_objects
@@ -13,10 +13,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import subprocess
 from hardening import core
 from hardening.storage import StorageHandler
 from hardening.storage.Transaction import Transaction
+from hardening.storage.TransactionInfo import TransactionInfo
 
 
 @StorageHandler("cmd")
@@ -36,17 +38,109 @@ class CommandTransaction(Transaction):
         self.__random_id = parts[0]
         self.__commit_cmd = commit_cmd
         self.__rollback_cmd = rollback_cmd
+        self.__commit_prefix = None
+        self.__rollback_prefix = None
 
         super(CommandTransaction, self).__init__(id(self))
 
     def inform_user(self, message=""):
         pass
 
-    def set_commit_command(self, commit_cmd):
+    def set_commit_command(self, commit_cmd, prefix=None):
+        """sets the command to be run on commit
+
+        @param commit_cmd: command as list of strings
+        @param prefix: leading part of `commit_cmd`, if the command may be folded into a single
+        invocation together with other commands which start with the same prefix (see
+        CommandTransaction::coalesce). All elements following the prefix are treated as arguments.
+        """
         self.__commit_cmd = commit_cmd
+        self.__commit_prefix = self.__checked_prefix(commit_cmd, prefix)
+
+    def set_rollback_command(self, rollback_cmd, prefix=None):
+        """sets the command to be run on rollback
 
-    def set_rollback_command(self, rollback_cmd):
+        @param rollback_cmd: command as list of strings
+        @param prefix: see CommandTransaction::set_commit_command
+        """
         self.__rollback_cmd = rollback_cmd
+        self.__rollback_prefix = self.__checked_prefix(rollback_cmd, prefix)
+
+    @staticmethod
+    def __checked_prefix(cmd, prefix):
+        if cmd is None or prefix is None or list(cmd[:len(prefix)]) != list(prefix):
+            return None
+        return list(prefix)
+
+    @staticmethod
+    def coalesce(transactions):
+        """folds consecutive commands with the same prefix into a single invocation
+
+        For example, the commit commands `a2enmod headers` and `a2enmod alias` of two consecutive
+        transactions are replaced by a single `a2enmod headers alias`, which is run by the first
+        transaction, while the second transaction does nothing. The rollback commands are folded
+        the same way, but in reverse order of their arguments, so that rolling back the merged
+        transaction has the same effect as rolling back the single transactions in reverse order.
+
+        Commands are only folded if both commit and rollback commands are mergeable. Transactions
+        without commit command are skipped, all other transactions end a sequence of mergeable
+        commands.
+
+        @param transactions: list of transactions, in commit order. Transactions which are not
+        instances of CommandTransaction are ignored
+        @return number of commands which have been folded into other commands
+        """
+        leader = None
+        merged = 0
+        for transaction in [t for t in transactions if isinstance(t, CommandTransaction)]:
+            # pylint: disable=protected-access
+            if transaction.__commit_cmd is None:
+                continue
+
+            if leader is not None and leader.__can_absorb(transaction):
+                leader.__absorb(transaction)
+                merged += 1
+            elif transaction.__commit_prefix is not None and \
+                    (transaction.__rollback_cmd is None or
+                     transaction.__rollback_prefix is not None):
+                leader = transaction
+            else:
+                leader = None
+        return merged
+
+    def __can_absorb(self, other):
+        # pylint: disable=protected-access
+        return self.__commit_prefix == other.__commit_prefix and \
+            (self.__rollback_cmd is None) == (other.__rollback_cmd is None) and \
+            self.__rollback_prefix == other.__rollback_prefix
+
+    def __absorb(self, other):
+        # pylint: disable=protected-access
+        self.__commit_cmd = self.__commit_cmd + other.__commit_cmd[len(self.__commit_prefix):]
+        if self.__rollback_cmd is not None:
+            self.__rollback_cmd = self.__rollback_prefix + \
+                other.__rollback_cmd[len(self.__rollback_prefix):] + \
+                self.__rollback_cmd[len(self.__rollback_prefix):]
+
+        other.__commit_cmd = None
+        other.__rollback_cmd = None
+
+    def touched_paths(self):
+        """returns the filesystem paths which are passed to the commit or rollback command
+
+        File and directory transactions which work on one of these paths (or on a path nested
+        inside them) depend on this transaction (see TransactionManager::dependency_groups).
+
+        @return list of absolute paths, rebased (see core::RuntimeOptions::rebase_path)
+        """
+        paths = list()
+        for cmd in (self.__commit_cmd, self.__rollback_cmd):
+            if cmd is None:
+                continue
+            # the first element is the program itself
+            paths.extend(core.RuntimeOptions().rebase_path(os.path.normpath(arg))
+                         for arg in cmd[1:] if os.path.isabs(arg))
+        return paths
 
     @property
     def random_id(self):
@@ -59,7 +153,20 @@ class CommandTransaction(Transaction):
         pass
 
     def __commit__(self):
+        if self.get_commit_command() is None or core.RuntimeOptions().pretend_mode():
+            self.__run_command(self.get_commit_command)
+            return
+
+        commit_cmd = core.RuntimeOptions().rebase_command(self.get_commit_command())
+        rollback_cmd = self.get_rollback_command()
+        if rollback_cmd is not None:
+            rollback_cmd = core.RuntimeOptions().rebase_command(rollback_cmd)
+
+        # an interrupted commit undoes the command (see storage::CommitLog), and the backup
+        # manifest lists the commands which undo this run (see --restore)
+        TransactionInfo().get_commit_log().record_command(commit_cmd, rollback_cmd)
         self.__run_command(self.get_commit_command)
+        TransactionInfo().get_backup_store().backup_command(commit_cmd, rollback_cmd)
 
     def __rollback__(self):
         self.__run_command(self.get_rollback_command)
@@ -71,19 +178,21 @@ class CommandTransaction(Transaction):
             return
 
         assert isinstance(cmd, list)
+        cmd = core.RuntimeOptions().rebase_command(cmd)
 
         if core.RuntimeOptions().is_log_enabled():
-            core.ChangeLog().append_log_item("###########################################")
-            core.ChangeLog().append_log_item(" ".join(cmd))
+            core.ChangeLog().append_log_item("###########################################",
+                                             " ".join(cmd))
 
         if core.RuntimeOptions().pretend_mode():
             return
 
         core.LogManager().get_logger().info("running command: " + " ".join(cmd))
-        process = subprocess.Popen(cmd,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE)
-        _, stderr = process.communicate()
+        with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+            process = subprocess.Popen(cmd,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE)
+            _, stderr = process.communicate()
         if process.returncode != 0:
             core.LogManager().get_logger().fatal(stderr.strip())
             raise subprocess.CalledProcessError(
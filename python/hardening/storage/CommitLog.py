@@ -0,0 +1,160 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import threading
+
+from hardening import core
+from hardening.storage.BackupStore import ENTRY_COMMAND
+
+COMMIT_LOG_FILENAME = 'commit.log'
+
+EVENT_BEGIN = 'begin'
+EVENT_COMMAND = 'command'
+
+
+class CommitLog(object):
+    """write-ahead log which makes the commit of a batch of transactions (see
+    storage::TransactionManager::commit_all) crash-safe
+
+    The log is written to `<basedir>/commit.log`. Every line is a JSON object:
+
+     - `begin`: written after all transactions have been prepared, but before any file is
+       replaced. Contains the name of the run, the format of its backup, the manifest entries
+       which describe the original state of every path the batch is going to change (see
+       storage::BackupStore) and the temporary files which are going to be renamed
+     - `command`: a command is about to be run; contains its manifest entry, which is recorded
+       before the command is run, because the command may not be completed
+
+    The temporary files and the backups are not synced one by one. Instead, all filesystems
+    which contain them are synced once (see core::sync_filesystems) before the `begin` record is
+    written, and once more after the last file has been replaced. The log is removed afterwards.
+
+    If the commit fails, the log is kept and the changes of the whole batch are undone (see
+    scheduler::Restorer::recover). If the log still exists when the next run is started, the
+    commit has been interrupted, e.g. by a power loss, and may have left a mix of original and
+    new files, which are undone the same way.
+    """
+
+    def __init__(self, basedir, mode=0o700):
+        """
+        @param basedir: directory which contains the backups of all runs
+        @param mode: permissions of the directory, if it has to be created
+        """
+        self.__basedir = basedir
+        self.__mode = mode
+        # paths whose filesystems are synced when the batch is finished; `None` if no batch is open
+        self.__paths = None
+        self.__lock = threading.Lock()
+
+    def filename(self):
+        return os.path.join(self.__basedir, COMMIT_LOG_FILENAME)
+
+    def is_open(self):
+        with self.__lock:
+            return self.__paths is not None
+
+    def begin(self, run, backup_format, entries, temporary_files):
+        """makes all temporary files and backups durable and records the intended changes
+
+        @param run: name of the directory of the current run (see storage::TransactionInfo)
+        @param backup_format: format of the backup of the current run
+        @param entries: manifest entries which have been recorded for this batch
+        @param temporary_files: names of the temporary files which are going to replace files
+        """
+        if os.path.exists(self.filename()):
+            raise core.HardeningFailure(
+                _("the commit log '%(log)s' of an interrupted commit still exists")
+                % {'log': self.filename()})
+
+        paths = [entry['path'] for entry in entries if 'path' in entry]
+        paths += list(temporary_files) + [self.__basedir]
+        core.sync_filesystems(paths)
+
+        with self.__lock:
+            if not os.path.isdir(self.__basedir):
+                os.makedirs(self.__basedir, self.__mode)
+            self.__write({'event': EVENT_BEGIN,
+                          'run': run,
+                          'format': backup_format,
+                          'entries': entries,
+                          'temporary': list(temporary_files)}, 'w')
+            core.fsync_directory(self.__basedir)
+            self.__paths = paths
+
+    def record_command(self, commit_command, rollback_command):
+        """records that a command is about to be run, if a batch is being committed
+
+        @param commit_command: the command which is about to be run, as list of strings
+        @param rollback_command: the command which undoes it, or `None`
+        """
+        with self.__lock:
+            if self.__paths is not None:
+                self.__write({'event': EVENT_COMMAND,
+                              'entry': {'type': ENTRY_COMMAND,
+                                        'commit': commit_command,
+                                        'command': rollback_command}}, 'a')
+
+    def finish(self):
+        """makes all changes of the batch durable and removes the log"""
+        with self.__lock:
+            if self.__paths is None:
+                return
+            core.sync_filesystems(self.__paths)
+            os.unlink(self.filename())
+            core.fsync_directory(self.__basedir)
+            self.__paths = None
+
+    def abort(self):
+        """closes the batch without removing the log, because its changes must be undone (see
+        scheduler::Restorer::recover)"""
+        with self.__lock:
+            self.__paths = None
+
+    def __write(self, record, mode):
+        with open(self.filename(), mode) as log:
+            log.write(json.dumps(record, sort_keys=True) + "\n")
+            log.flush()
+            os.fsync(log.fileno())
+
+    def read(self):
+        """reads the log of an interrupted commit
+
+        @return tuple (`begin` record, manifest entries of the recorded commands), or `None` if
+        there is no log or if the `begin` record is incomplete. Files are only replaced after the
+        `begin` record has been synced, so nothing has been changed in the latter case
+        """
+        if not os.path.isfile(self.filename()):
+            return None
+
+        records = list()
+        with open(self.filename(), 'r') as log:
+            for line in log:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # the last line may be incomplete if the run has been killed while writing it
+                    break
+
+        if len(records) == 0 or records[0].get('event') != EVENT_BEGIN:
+            return None
+        return records[0], [r['entry'] for r in records[1:] if r.get('event') == EVENT_COMMAND]
+
+    def remove(self):
+        """removes the log of an interrupted commit"""
+        if os.path.lexists(self.filename()):
+            os.unlink(self.filename())
+            core.fsync_directory(self.__basedir)
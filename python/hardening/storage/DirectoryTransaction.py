@@ -14,15 +14,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import random
-import re
 import shutil
-import tempfile
-from datetime import datetime
+import stat
 
-from hardening import core, info
+from hardening import core
 from hardening.storage import StorageHandler
 from hardening.storage.FileAndDirectoryTransaction import FileAndDirectoryTransaction
+from hardening.storage.Transaction import TransactionStatus
+from hardening.storage.TransactionInfo import TransactionInfo
 
 
 @StorageHandler("dir")
@@ -32,63 +31,106 @@ class DirectoryTransaction(FileAndDirectoryTransaction):
     general information as well as the backup process for directories
 
     This transaction is a subclass of the FileAndDirectoryTransaction
+
+    Directories are not copied: chmod and chown only record the new ownership and permissions
+    (see FileAndDirectoryTransaction::metadata_changes), which are applied in place when the
+    transaction is committed. When the commit is prepared, the original owner, group and mode of
+    every path which is going to be changed are recorded in a journal and in the backup manifest
+    (see storage::BackupStore); if applying the changes fails, or if the transaction is rolled
+    back after it has been committed, the journal is replayed in reverse order. The contents of
+    the directory are only copied to the backup store if the directory is deleted.
     """
 
     def __init__(self, directoryname):
         super(DirectoryTransaction, self).__init__(directoryname)
         self.__directoryname = directoryname
-        self.__dir_temp = None
+        self.__directory_exists = False
         self.__changelog = list()
-        self.__timestamp = datetime.now().strftime("%Y%m%d_%H:%M:%S")
         self.__apply_changes = None
+        # list of `[path, uid, gid, mode]` entries, see DirectoryTransaction::replay_journal
+        self.__journal = list()
+        self.__journal_applied = False
 
     def tmpname(self):
-        return self.__dir_temp
+        # there is no working copy of a directory
+        return None
 
-    def __begin__(self):
-        if os.path.exists(self.__directoryname):
-            self.__dir_temp = self.__generate_tmp_dirname(self.__directoryname)
+    def records_metadata(self):
+        return True
 
-            self.copy_dir(self.__directoryname, self.__dir_temp)
-        else:
+    def __begin__(self):
+        self.__directory_exists = os.path.exists(self.__directoryname)
+        if not self.__directory_exists:
             core.LogManager().get_logger().debug(
                 _("Directory %(dirname)s does not exist and will therefore not be altered."
                   % {'dirname': self.__directoryname}))
-            self.__dir_temp = None
             self.__apply_changes = False
 
-    @staticmethod
-    def __generate_tmp_dirname(directoryname):
-        count = 0
-        dir_temp = directoryname + "_temp_" + \
-            str(random.randint(100000, 999999))
-        while os.path.isdir(dir_temp) and count < 1000:
-            dir_temp = directoryname + "_temp_" + \
-                str(random.randint(100000, 999999))
-            count += 1
-        if count >= 1000:
-            raise RuntimeError(
-                "could not create temporary directory within 1000 tries.")
-        return dir_temp
-
     def __prepare_commit__(self):
         self.__apply_changes = self.must_apply_changes()
+        if not self.__apply_changes:
+            return
+
+        # the original state is recorded before the commit is started, so that an interrupted
+        # commit can be undone (see storage::CommitLog)
+        store = TransactionInfo().get_backup_store()
+        try:
+            if self.is_marked_as_deleted():
+                core.LogManager().get_logger().info(
+                    _("Writing backup for '%(dirname)s' to '%(backupdir)s'.")
+                    % {'dirname': self.__directoryname,
+                       'backupdir': TransactionInfo().get_backupdir()})
+                store.backup_tree(self.__directoryname)
+                return
+
+            # parent directories are changed before their contents
+            for path in sorted(self.metadata_changes()):
+                stat_result = os.stat(path)
+                self.__journal.append([path, stat_result.st_uid, stat_result.st_gid,
+                                       stat.S_IMODE(stat_result.st_mode)])
+                store.backup_metadata(path, stat_result)
+        except (IOError, OSError) as error:
+            raise core.HardeningFailure(
+                _("unable to write the backup of '%(dirname)s': %(error)s")
+                % {'dirname': self.__directoryname, 'error': str(error)})
 
     def __commit__(self):
-        if self.__apply_changes:
-            self.copy_dir(self.__directoryname, self.backup_path())
+        if not self.__apply_changes:
+            return
+
+        if self.is_marked_as_deleted():
+            TransactionInfo().get_backup_store().release(self.__directoryname)
             shutil.rmtree(self.__directoryname)
-            self.copy_dir(self.__dir_temp, self.__directoryname)
+        elif len(self.__journal) > 0:
+            self.__apply_metadata_changes()
+
+    def __apply_metadata_changes(self):
+        try:
+            for entry in self.__journal:
+                path = entry[0]
+                metadata = self.metadata_changes()[path]
+
+                # chown may clear the setuid and setgid bits, so it must be run before chmod
+                if 'uid' in metadata or 'gid' in metadata:
+                    os.chown(path, metadata.get('uid', -1), metadata.get('gid', -1))
+                if 'mode' in metadata:
+                    os.chmod(path, metadata['mode'])
+            self.__journal_applied = True
+        except OSError as error:
+            self.replay_journal(self.__journal)
+            raise core.HardeningFailure(
+                _("unable to change '%(dirname)s': %(error)s")
+                % {'dirname': self.__directoryname, 'error': str(error)})
 
-            core.LogManager().get_logger().info(
-                _("Writing backup for '%(dirname)s' to '%(backuppath)s'."
-                  % {'dirname': self.__directoryname,
-                     'backuppath': self.backup_path()}))
+    @staticmethod
+    def replay_journal(journal):
+        """restores the original ownership and permissions, in reverse order
 
-        if self.__apply_changes and self.is_marked_as_deleted():
-            shutil.rmtree(self.__directoryname)
-        if self.__dir_temp is not None:
-            shutil.rmtree(self.__dir_temp)
+        @param journal: list of `[path, uid, gid, mode]` entries
+        """
+        for path, uid, gid, mode in reversed(journal):
+            os.chown(path, uid, gid)
+            os.chmod(path, mode)
 
     def must_apply_changes(self):
         apply_changes = False
@@ -103,33 +145,20 @@ class DirectoryTransaction(FileAndDirectoryTransaction):
         return apply_changes
 
     def __rollback__(self):
-        if self.__dir_temp is not None:
-            if os.path.exists(self.__dir_temp):
-                shutil.rmtree(self.__dir_temp)
-
-    @staticmethod
-    def copy_dir(directoryname, new_name):
-        if os.path.isdir(new_name):
-            raise OSError(
-                "Directory already exists, could not move directory.")
-        shutil.copytree(directoryname, new_name)
-        DirectoryTransaction.transfer_owner(directoryname, new_name)
-        for root, dirs, files in os.walk(directoryname):
-            new_root = root.replace(directoryname, new_name)
-            for current_dir in dirs:
-                DirectoryTransaction.transfer_owner(os.path.join(root, current_dir),
-                                                    os.path.join(new_root, current_dir))
-            for current_file in files:
-                DirectoryTransaction.transfer_owner(os.path.join(root, current_file),
-                                                    os.path.join(new_root, current_file))
-
-    @staticmethod
-    def transfer_owner(src, dst):
-        stat = os.stat(src)
-        os.chown(dst, stat.st_uid, stat.st_gid)
+        # nothing has been changed before the commit
+        if self.status() != TransactionStatus.COMMITTED or not self.__journal_applied:
+            return
+        try:
+            self.replay_journal(self.__journal)
+            self.__journal_applied = False
+        except OSError as error:
+            # the other transactions must be rolled back anyway
+            core.LogManager().get_logger().error(
+                _("unable to restore '%(dirname)s': %(error)s")
+                % {'dirname': self.__directoryname, 'error': str(error)})
 
     def delete(self):
-        if self.__dir_temp is not None:
+        if self.__directory_exists:
             if core.RuntimeOptions().interactive_mode():
                 if not self.prompt_user(_("Do you want to delete '%(dirname)s'?")
                                         % {'dirname': self.__directoryname}):
@@ -146,30 +175,6 @@ class DirectoryTransaction(FileAndDirectoryTransaction):
     def __get_change_logs(self):
         return self.__changelog
 
-    def backup_name(self):
-        original_name = os.path.split(self.__directoryname)[-1]
-        original_path = os.path.join(
-            *(os.path.split(self.__directoryname)[:-1]))
-        return os.path.join(
-            original_path, ('.' + original_name + "_backup_" + self.timestamp()))
-
-    def backup_path(self):
-        return os.path.join(re.sub('/$', '', self.backupdir()),
-                            re.sub('^/|/$', '', self.backup_name()))
-
-    def timestamp(self):
-        return self.__timestamp
-
-    @staticmethod
-    def backupdir():
-        dirname = info.Configuration().get_property(
-            "Backup", "BaseDir", default=tempfile.gettempdir())
-        mode = info.Configuration().get_property(
-            "Backup", "BaseDirMode", default=0o600)
-        if not os.path.exists(dirname):
-            os.makedirs(dirname, mode)
-        return dirname
-
     def __mark_directory_as_deleted(self):
         if self.has_modifications_to_save():
             raise core.HardeningFailure(
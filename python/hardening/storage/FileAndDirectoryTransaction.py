@@ -38,35 +38,112 @@ class FileAndDirectoryTransaction(with_metaclass(ABCMeta, Transaction)):
     this class is the parent for the FileTransaction and the DirectoryTransaction
     it covers functions which can be applied to both files and directories like chmod and chwon
     and has abstract methods for functions that need to be individualy addressed like delete
+
+    If FileAndDirectoryTransaction::records_metadata() is true (always for directories, and in
+    pretend mode for files), chmod and chown are evaluated against the original files and
+    directories, and the changes are only recorded in memory (see
+    FileAndDirectoryTransaction::metadata_changes), so that nothing needs to be copied.
+    Otherwise, they are applied to the working copy (see tmpname), which is only created if
+    something actually has to be changed.
     """
 
     def __init__(self, *args, **kwargs):
         super(FileAndDirectoryTransaction, self).__init__(*args, **kwargs)
         self.__is_marked_as_deleted = False
+        # key: original path, value: dictionary with the recorded `mode`, `uid` and `gid`
+        self.__metadata_changes = dict()
+
+    @staticmethod
+    def is_audit():
+        """determines if changes are only evaluated, without writing anything (pretend mode)
+
+        @return `True` if no temporary files or directories must be created
+        """
+        return core.RuntimeOptions().pretend_mode()
+
+    def records_metadata(self):
+        """determines if chmod and chown only record their changes instead of applying them to a
+        working copy
+
+        @return `True` if the changes are available using
+        FileAndDirectoryTransaction::metadata_changes
+        """
+        return self.is_audit()
+
+    def metadata_changes(self):
+        """returns the ownership and permission changes recorded by chmod and chown
+
+        @return dictionary which maps every original path to a dictionary with the new `mode`,
+        `uid` and `gid`; only the values which have been changed are contained
+        """
+        return self.__metadata_changes
+
+    def has_working_copy(self):
+        """determines if the working copy (see tmpname) has already been created
+
+        Subclasses which create their working copy lazily override this method; as long as there
+        is no working copy, chmod and chown compare against the original.
+
+        @return `True` if chmod and chown must compare against the working copy
+        """
+        return True
+
+    def __inspected_path(self):
+        # the file or directory whose ownership and permissions chmod and chown compare against
+        if self.records_metadata():
+            return self.url() if os.path.lexists(self.url()) else None
+        if not self.is_transaction_running():
+            return None
+        if self.has_working_copy() or not os.path.lexists(self.url()):
+            return self.tmpname()
+        return self.url()
+
+    def __working_entries(self, inspected_path, entries):
+        # maps the entries which must be changed to the working copy, which is only created now
+        if self.records_metadata():
+            return entries
+        working_path = self.tmpname()
+        if working_path == inspected_path:
+            return entries
+        return [(working_path if entry[0] == inspected_path else
+                 os.path.join(working_path, os.path.relpath(entry[0], inspected_path)), entry[1])
+                for entry in entries]
+
+    def __current_metadata(self, original_path):
+        stat_result = os.stat(original_path)
+        metadata = {'mode': stat.S_IMODE(stat_result.st_mode),
+                    'uid': stat_result.st_uid,
+                    'gid': stat_result.st_gid}
+        metadata.update(self.__metadata_changes.get(original_path, dict()))
+        return metadata
 
     def chown(self, uid, gid, recursive=False,
               apply_to_file=False, apply_to_directory=True):
         assert isinstance(uid, int)
         assert isinstance(gid, int)
 
-        if self.tmpname() is None:
+        inspected_path = self.__inspected_path()
+        if inspected_path is None:
             return
 
-        if not os.path.isdir(self.tmpname()):
+        if not os.path.isdir(inspected_path):
             recursive = False
 
         to_modify_list = list()
 
         # check if something has to be changed
         def check_action(tupel):
-            return self.check_chown(tupel[1], uid, gid)
+            if self.records_metadata():
+                metadata = self.__current_metadata(tupel[1])
+                return uid not in (-1, metadata['uid']) or gid not in (-1, metadata['gid'])
+            return self.check_chown(tupel[0], uid, gid)
 
         # append temp dir and original dir as tupel to to_modify__list
         def list_action(temp_dir, original_dir):
             return to_modify_list.append((temp_dir, original_dir))
 
         # enumerate all child filesystem entry
-        self.__visit(self.tmpname(), self.url(), list_action, recursive,
+        self.__visit(inspected_path, self.url(), list_action, recursive,
                      apply_to_file, apply_to_directory)
         # select entries with settings that must be changed (e.g. invalid
         # owner)
@@ -74,7 +151,7 @@ class FileAndDirectoryTransaction(with_metaclass(ABCMeta, Transaction)):
         if len(filtered_list) > 0:
             if self.__prompt_user_chown(uid, gid, recursive):
                 self.mark_as_modified()
-                for entry in filtered_list:
+                for entry in self.__working_entries(inspected_path, filtered_list):
                     self.do_chown(entry[0], entry[1], uid, gid)
         else:
             self.inform_user(
@@ -89,7 +166,14 @@ class FileAndDirectoryTransaction(with_metaclass(ABCMeta, Transaction)):
         return True
 
     def do_chown(self, temp_path, original_path, uid, gid):
-        os.chown(temp_path, uid, gid)
+        if self.records_metadata():
+            metadata = self.__metadata_changes.setdefault(original_path, dict())
+            if uid != -1:
+                metadata['uid'] = uid
+            if gid != -1:
+                metadata['gid'] = gid
+        else:
+            os.chown(temp_path, uid, gid)
         if core.RuntimeOptions().is_log_enabled():
             if uid != -1 and gid != -1:
                 self.add_change_command("chown %d:%d '%s'" %
@@ -103,7 +187,8 @@ class FileAndDirectoryTransaction(with_metaclass(ABCMeta, Transaction)):
 
     def chmod(self, mode, recursive=False, apply_to_file=False,
               apply_to_directory=True):
-        if self.tmpname() is None:
+        inspected_path = self.__inspected_path()
+        if inspected_path is None:
             return
 
         if isinstance(mode, str):
@@ -113,13 +198,16 @@ class FileAndDirectoryTransaction(with_metaclass(ABCMeta, Transaction)):
             def mode_action(_):
                 return mode
 
-        if not os.path.isdir(self.tmpname()):
+        if not os.path.isdir(inspected_path):
             recursive = False
 
         to_modify_list = list()
 
         # check if something has to be changed
         def check_action(tupel):
+            if self.records_metadata():
+                current_mode = self.__current_metadata(tupel[1])['mode']
+                return mode_action(current_mode) != current_mode
             return self.check_chmod(tupel[0], mode_action)
 
         # append temp dir and original dir as tupel to to_modify__list
@@ -127,7 +215,7 @@ class FileAndDirectoryTransaction(with_metaclass(ABCMeta, Transaction)):
             return to_modify_list.append((temp_dir, original_dir))
 
         # enumerate all child filesystem entry
-        self.__visit(self.tmpname(), self.url(), list_action, recursive,
+        self.__visit(inspected_path, self.url(), list_action, recursive,
                      apply_to_file, apply_to_directory)
 
         # select entries with settings that must be changed (e.g. invalid
@@ -137,7 +225,7 @@ class FileAndDirectoryTransaction(with_metaclass(ABCMeta, Transaction)):
         if len(filtered_list) > 0:
             if self.__prompt_user_chmod(mode, recursive):
                 self.mark_as_modified()
-                for entry in filtered_list:
+                for entry in self.__working_entries(inspected_path, filtered_list):
                     self.do_chmod(entry[0], entry[1], mode_action)
         else:
             self.inform_user(
@@ -152,8 +240,13 @@ class FileAndDirectoryTransaction(with_metaclass(ABCMeta, Transaction)):
         return True
 
     def do_chmod(self, temp_path, original_path, mode_action):
-        current_mode = stat.S_IMODE(os.stat(temp_path).st_mode)
-        os.chmod(temp_path, mode_action(current_mode))
+        if self.records_metadata():
+            current_mode = self.__current_metadata(original_path)['mode']
+            self.__metadata_changes.setdefault(original_path, dict())['mode'] = \
+                mode_action(current_mode)
+        else:
+            current_mode = stat.S_IMODE(os.stat(temp_path).st_mode)
+            os.chmod(temp_path, mode_action(current_mode))
         if core.RuntimeOptions().is_log_enabled():
             self.add_change_command("chmod %s '%s'" % (oct(mode_action(current_mode)),
                                                        original_path))
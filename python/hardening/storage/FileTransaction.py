@@ -15,12 +15,13 @@
 
 import errno
 import os
-import shutil
 import tempfile
-import subprocess
+
+import six
 
 from hardening import core
 from hardening.storage.TransactionInfo import TransactionInfo
+from hardening.storage.BackupStore import FORMAT_OBJECTS
 from hardening.storage.FileAndDirectoryTransaction import FileAndDirectoryTransaction
 
 
@@ -35,11 +36,12 @@ class FileTransaction(FileAndDirectoryTransaction):
     def __init__(self, filename):
         super(FileTransaction, self).__init__(filename)
         self.__filename = filename
-        self.__fd = None
+        self.__content = None
         self.__fdtemp = None
         self.__tmpname = None
         self.__lines = None
         self.__apply_changes = False
+        self.__backup_object = None
 
         # this will be overwritten in __begin__
         self.__original_file_exists = False
@@ -48,9 +50,39 @@ class FileTransaction(FileAndDirectoryTransaction):
         self.__actions = list()
 
     def tmpname(self):
+        """returns the name of the temporary file, which will replace the original file on commit
+
+        The temporary file is created when it is needed for the first time (see
+        FileTransaction::__create_tempfile), so calling this method creates it. In pretend mode,
+        no temporary file is created.
+
+        @return absolute file name, or `None`
+        """
+        if self.__tmpname is None and self.is_transaction_running() and not self.is_audit():
+            self.__create_tempfile()
         return self.__tmpname
 
+    def has_working_copy(self):
+        return self.__tmpname is not None
+
     def __begin__(self):
+        """
+        The contents of the original file are read into memory; the file is not kept open.
+        The temporary file is not created before it is needed (see FileTransaction::tmpname),
+        because most transactions do not change anything.
+        """
+        try:
+            with open(self.__filename, "r") as stream:
+                self.__content = stream.read()
+            self.__original_file_exists = True
+        except IOError as error:
+            if error.errno == errno.ENOENT:  # no such file or directory
+                self.__content = None
+                self.__original_file_exists = False
+            else:
+                raise error
+
+    def __create_tempfile(self):
         """
         We create the temporary file first and close it immediately.
         Then we reopen the file. The difference is that NamedTemporaryFile()
@@ -73,20 +105,10 @@ class FileTransaction(FileAndDirectoryTransaction):
 
         self.__fdtemp = open(self.__tmpname, "w+")
 
-        try:
-            self.__fd = open(self.__filename, "r+")
-            self.__original_file_exists = True
-
+        if self.__original_file_exists and os.path.exists(self.__filename):
             FileTransaction.transfer_owner(self.__filename, self.__fdtemp.name)
             FileTransaction.transfer_perm(self.__filename, self.__fdtemp.name)
 
-        except IOError as error:
-            if error.errno == errno.ENOENT:  # no such file or directory
-                self.__fd = None
-                self.__original_file_exists = False
-            else:
-                raise error
-
     @staticmethod
     def transfer_owner(src, dst):
         stat = os.stat(src)
@@ -98,24 +120,43 @@ class FileTransaction(FileAndDirectoryTransaction):
         os.chmod(dst, stat.st_mode)
 
     def __commit__(self):
-        self.write_to_tempfile()
-
         if core.RuntimeOptions().is_log_enabled():
             self.log_changes()
 
-        self.__write_changes_and_backup()
+        self.__write_changes()
 
     def __prepare_commit__(self):
+        if self.is_audit():
+            # the changes have been evaluated on the contents in memory; nothing is written
+            return
         self.__apply_changes |= self.must_apply_changes() or self.is_marked_as_deleted()
+        if not self.__apply_changes or not self.has_something_to_commit():
+            return
+
+        # this is the first moment at which the new contents must be written to disk
+        if not self.is_marked_as_deleted():
+            if self.__tmpname is None:
+                self.__create_tempfile()
+            self.write_to_tempfile()
+            self.__fdtemp.flush()
+
+        # the original contents are copied to the backup store before the commit is started, so
+        # that an interrupted commit can be undone (see storage::CommitLog)
+        try:
+            self.__backup()
+        except (IOError, OSError) as error:
+            raise core.HardeningFailure(
+                _("unable to write the backup of '%(filename)s': %(error)s")
+                % {'filename': self.__filename, 'error': error.strerror or str(error)})
 
     def __rollback__(self):
-        tmpname = self.__fdtemp.name
-        self.__fdtemp.close()
-        if os.path.exists(tmpname):
-            os.unlink(tmpname)
+        self.__remove_tempfile()
 
-        if self.__fd is not None:
-            self.__fd.close()
+    def __remove_tempfile(self):
+        if self.__fdtemp is not None:
+            self.__fdtemp.close()
+        if self.__tmpname is not None and os.path.lexists(self.__tmpname):
+            os.unlink(self.__tmpname)
 
     def delete(self):
         assert self.is_transaction_running()
@@ -142,8 +183,8 @@ class FileTransaction(FileAndDirectoryTransaction):
         self.__changelog.extend(lines)
 
     def log_changes(self):
-        for log_entry in self.__get_change_logs():
-            core.ChangeLog().append_log_item(log_entry)
+        if len(self.__get_change_logs()) > 0:
+            core.ChangeLog().append_log_item(*self.__get_change_logs())
 
     def mark_as_modified(self):
         if self.is_marked_as_deleted():
@@ -153,19 +194,17 @@ class FileTransaction(FileAndDirectoryTransaction):
         super(FileTransaction, self).mark_as_modified()
 
     def read(self, *args):
-        if self.__fd is None:
+        if self.__content is None:
             return None
-        self.__fd.seek(0)
-        return self.__fd.read(*args)
+        return six.StringIO(self.__content).read(*args)
 
     def readlines(self, *args):
-        if self.__fd is None:
+        if self.__content is None:
             return []
-        self.__fd.seek(0)
-        return self.__fd.readlines(*args)
+        return six.StringIO(self.__content).readlines(*args)
 
     def new_file_content(self):
-        return self.__fd.read()
+        return self.__content or ""
 
     def __get_change_logs(self):
         return self.__changelog
@@ -175,68 +214,87 @@ class FileTransaction(FileAndDirectoryTransaction):
                                             % {'tempname': self.__fdtemp.name})
         self.__fdtemp.write(self.new_file_content())
 
-    def __write_changes_and_backup(self):
-
-        def force_link(filename, linkname):
-            command = ["/bin/ln", "-f", filename, linkname]
-            core.LogManager().get_logger().info(_("invoking: %(command)s")
-                                                % {'command': command})
-            process = subprocess.Popen(command,
-                                       stdout=subprocess.PIPE,
-                                       stderr=subprocess.PIPE)
-            # pylint: disable=unused-variable
-            stdin, stderr = process.communicate()
-
-            if process.returncode != 0:
-                core.LogManager().get_logger().fatal(stderr.strip())
-                raise subprocess.CalledProcessError(
-                    process.returncode, command, output=stderr)
-            else:
-                core.LogManager().get_logger().info("success")
-
+    def __write_changes(self):
         # execute misc actions, such as chown and chmod
         for action in self.__actions:
             action()
 
-        if self.__apply_changes and self.has_something_to_commit():
-            if self.__original_file_exists:
-                # create temporary backup file, which will be moved later to
-                # the backup folder.
-                force_link(self.__filename, self.__backup_path())
-
+        must_write = self.__apply_changes and self.has_something_to_commit()
+        try:
             # replace the original file with the newly created file
-            if not self.is_marked_as_deleted():
+            if must_write and not self.is_marked_as_deleted():
                 self.create_directory(os.path.dirname(self.__filename))
-                force_link(self.__fdtemp.name, self.__filename)
+                TransactionInfo().get_backup_store().release(self.__filename)
+                self.__replace(self.__tmpname, self.__filename)
+                self.__tmpname = None
+
+            # close the temporary file
+            if self.__fdtemp is not None:
+                self.__fdtemp.close()
+
+            # delete original file
+            if self.is_marked_as_deleted() and self.__original_file_exists and \
+                    self.__apply_changes:
+                core.LogManager().get_logger().debug(_("deleting file '%(filename)s'")
+                                                     % {'filename': self.__filename})
+                TransactionInfo().get_backup_store().release(self.__filename)
+                os.unlink(self.__filename)
+
+            # the temporary file still exists if it has not replaced the original file
+            self.__remove_tempfile()
+        except (IOError, OSError) as error:
+            raise core.HardeningFailure(
+                _("unable to write '%(filename)s': %(error)s")
+                % {'filename': error.filename or self.__filename,
+                   'error': error.strerror or str(error)})
 
-        # close original and temporary file
-        self.__fdtemp.close()
-        if self.__fd is not None:
-            self.__fd.close()
-
-        # delete original file
-        if self.is_marked_as_deleted() and self.__original_file_exists and self.__apply_changes:
-            core.LogManager().get_logger().debug(_("deleting file '%(filename)s'")
-                                                 % {'filename': self.__filename})
-            os.unlink(self.__filename)
-
-        # unlink the temporary file. if __delete_file is False,
-        # there should be an additional hardlink to the file.
-        # if not, the file will be deleted
-        os.unlink(self.__tmpname)
-        if self.__original_file_exists and self.__apply_changes and self.has_something_to_commit():
-            shutil.move(self.__backup_path(), self.backup_path())
-
-        if self.__apply_changes and self.has_something_to_commit():
-            core.LogManager().get_logger().info(
-                _("Writing backup for '%(filename)s' to '%(backuppath)s'."
-                  % {'filename': self.__filename,
-                     'backuppath': self.backup_path()}))
-        else:
+        if not must_write:
             core.LogManager().get_logger().debug(
                 _("Omitting backup for '%(filename)s' because nothing had to be changed"
                   % {'filename': self.__filename}))
 
+    def __backup(self):
+        store = TransactionInfo().get_backup_store()
+        if not self.__original_file_exists or not os.path.lexists(self.__filename):
+            store.backup_absent(self.__filename)
+            return
+
+        entry = store.backup(self.__filename)
+        if 'object' in entry:
+            self.__backup_object = entry['object']
+            core.LogManager().get_logger().info(
+                _("Writing backup for '%(filename)s' to '%(backuppath)s'."
+                  % {'filename': self.__filename,
+                     'backuppath': self.backup_path() or TransactionInfo().get_backupdir()}))
+
+    @staticmethod
+    def __replace(source, destination):
+        """atomically replaces `destination` by `source`
+
+        If `source` is located on another filesystem (because no temporary file could be created
+        next to `destination`), it is copied next to `destination` first. The change is made
+        durable together with all other changes of the commit (see storage::CommitLog).
+        """
+        core.LogManager().get_logger().info(_("replacing '%(destination)s'")
+                                            % {'destination': destination})
+        try:
+            os.rename(source, destination)
+        except OSError as error:
+            if error.errno != errno.EXDEV:
+                raise
+            handle, staging = tempfile.mkstemp(prefix=os.path.basename(destination) + "_",
+                                               dir=os.path.dirname(destination))
+            os.close(handle)
+            try:
+                core.copy_file(source, staging)
+                os.rename(staging, destination)
+            # pylint: disable=bare-except
+            except:
+                os.unlink(staging)
+                raise
+            # like os.rename, the source does not exist anymore afterwards
+            os.unlink(source)
+
     @staticmethod
     def create_directory(directory):
         path = ""
@@ -246,17 +304,15 @@ class FileTransaction(FileAndDirectoryTransaction):
                 os.mkdir(path, 0o755)
 
     def backup_path(self):
-        backupdir = TransactionInfo().get_backupdir(os.path.dirname(self.__filename))
-        return os.path.join(backupdir, os.path.basename(self.__filename))
+        """returns the name of the file in the backup store which contains the original contents
 
-    def __backup_name(self):
-        original_name = os.path.basename(self.__filename)
-        return '.' + original_name + "_backup_" + TransactionInfo().get_timestamp()
-
-    def __backup_path(self):
-        filename_parts = list(os.path.split(self.__filename))
-        filename_parts[-1] = self.__backup_name()
-        return os.path.join(*filename_parts)
+        @return file name, or `None` if no backup has been written or if the backup has been
+        written to an archive (see storage::BackupArchive)
+        """
+        store = TransactionInfo().get_backup_store()
+        if self.__backup_object is None or store.backup_format() != FORMAT_OBJECTS:
+            return None
+        return store.object_path(self.__backup_object)
 
     def __mark_file_as_deleted(self):
         if self.has_modifications_to_save():
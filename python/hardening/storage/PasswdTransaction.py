@@ -13,7 +13,6 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import pwd
 import os
 import subprocess
 import psutil
@@ -21,6 +20,7 @@ from hardening import core
 from hardening.storage import StorageHandler
 from hardening.info import lib
 from hardening.storage.CommandTransaction import CommandTransaction
+from hardening.storage.TransactionInfo import TransactionInfo
 
 
 @StorageHandler("passwd")
@@ -28,6 +28,11 @@ class PasswdTransaction(CommandTransaction):
     """
     Transaction for passwd changes, e.g. creating or modifying users
     this class is a sublass of CommandTransaction
+
+    A missing user is created when the transaction is begun, so that the utils which are set up
+    afterwards (e.g. ChangeOwner) can use it. The user is removed again on rollback and by
+    `--restore`. In pretend mode, the user is not created; the `useradd` command is only reported
+    when the transaction is committed.
     """
 
     def __init__(self, username, **_):
@@ -43,26 +48,33 @@ class PasswdTransaction(CommandTransaction):
 
     def __begin__(self):
 
-        for proc in psutil.process_iter():
-            if self.__username == proc.username():
-                raise core.HardeningFailure(
-                    _("User %(username)s has running processes, you cannot modify that user.")
-                    % {'username': self.__username})
+        # processes of the running system do not belong to the users of a root filesystem
+        if core.RuntimeOptions().root_path() is None:
+            for proc in psutil.process_iter():
+                if self.__username == proc.username():
+                    raise core.HardeningFailure(
+                        _("User %(username)s has running processes, you cannot modify that user.")
+                        % {'username': self.__username})
+
+        if core.RuntimeOptions().pretend_mode() or lib.Passwd().has_passwd_entry(self.__username):
+            self.__create_user = False
+            return
 
-        if not lib.Passwd().has_passwd_entry(self.__username):
-            process = subprocess.Popen(["/usr/sbin/useradd", self.__username],
+        cmd = core.RuntimeOptions().rebase_command(["/usr/sbin/useradd", self.__username])
+        with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+            process = subprocess.Popen(cmd,
                                        stdout=subprocess.PIPE,
                                        stderr=subprocess.PIPE)
-            # pylint: disable=unused-variable
-            stdin, stderr = process.communicate()
-            if process.returncode != 0:
-                core.LogManager().get_logger().fatal(stderr.strip())
-                raise subprocess.CalledProcessError(
-                    process.returncode, ["/usr/sbin/useradd", self.__username], output=stderr)
-            else:
-                self.__create_user = True
-        else:
-            self.__create_user = False
+            stderr = process.communicate()[1]
+        if process.returncode != 0:
+            core.LogManager().get_logger().fatal(stderr.strip())
+            raise subprocess.CalledProcessError(process.returncode, cmd, output=stderr)
+        self.__create_user = True
+
+        # the user is removed by a rollback (see PasswdTransaction::get_rollback_command) and by
+        # restoring the backup of this run
+        TransactionInfo().get_backup_store().backup_command(
+            cmd, core.RuntimeOptions().rebase_command(["/usr/sbin/userdel", self.__username]))
 
     def set_pw_dir(self, directory):
         if self.__pw_dir is not None and self.__pw_dir != directory:
@@ -80,6 +92,12 @@ class PasswdTransaction(CommandTransaction):
         if self.__pw_shell is None:
             self.__pw_shell = shell
 
+    def touched_paths(self):
+        # usermod may create or move the home directory
+        if self.__pw_dir is None:
+            return list()
+        return [core.RuntimeOptions().rebase_path(os.path.normpath(self.__pw_dir))]
+
     def get_commit_command(self):
         option_values = list()
         has_changes = False
@@ -87,7 +105,7 @@ class PasswdTransaction(CommandTransaction):
         current_shell = None
 
         try:
-            self.__original_user = pwd.getpwnam(self.__username)
+            self.__original_user = lib.Passwd().get_passwd_entry(self.__username)
             current_homedir = self.__original_user[5]
             current_shell = self.__original_user[6]
             option_values.extend(["/usr/sbin/usermod", self.__username])
@@ -119,15 +137,15 @@ class PasswdTransaction(CommandTransaction):
             else:
 
                 # prevent usermod from raising E_HOMEDIR (12)
-                if not os.path.exists(self.__pw_dir):
+                if not os.path.exists(core.RuntimeOptions().rebase_path(self.__pw_dir)):
                     if current_homedir is not None and not os.path.isdir(
-                            current_homedir):
+                            core.RuntimeOptions().rebase_path(current_homedir)):
                         core.LogManager().get_logger().warning(
                             _("directory %(dirname)s is not a directory and will not be moved")
                             % {'dirname': self.__pw_dir})
                     else:
                         opts.append("-m")
-                elif not os.path.isdir(self.__pw_dir):
+                elif not os.path.isdir(core.RuntimeOptions().rebase_path(self.__pw_dir)):
                     raise core.HardeningFailure(_("directory %(dirname)s is not a directory"
                                                   % {'dirname': self.__pw_dir}))
                 else:
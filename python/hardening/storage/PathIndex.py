@@ -0,0 +1,82 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import bisect
+import os
+
+
+class PathIndex(object):
+    """maps filesystem paths to values and finds the values of overlapping paths
+
+    Two paths overlap if they are equal or if one of them is located below the other one (e.g.
+    `/etc/apache2` and `/etc/apache2/apache2.conf`). Values of parent directories are found by
+    looking up every component of a path; values of contained files are found using a sorted
+    list of all paths. So finding overlapping paths takes `O(depth + log n)` steps, plus the
+    number of results.
+    """
+
+    def __init__(self):
+        # key: normalized path, value: list of values, in the order in which they were added
+        self.__values = dict()
+        self.__sorted_paths = list()
+
+    def add(self, path, value):
+        """adds a value for a path
+
+        @param path: absolute filesystem path
+        @param value: arbitrary object
+        """
+        path = os.path.normpath(path)
+        if path not in self.__values:
+            self.__values[path] = list()
+            bisect.insort(self.__sorted_paths, path)
+        self.__values[path].append(value)
+
+    def get(self, path):
+        """returns the values which have been added for exactly this path
+
+        @param path: absolute filesystem path
+        @return list of values
+        """
+        return list(self.__values.get(os.path.normpath(path), []))
+
+    def overlapping(self, path):
+        """returns the values of all paths which overlap `path`
+
+        @param path: absolute filesystem path
+        @return list of values: first those of `path` and its parent directories (innermost
+        first), then those of the contained files and directories (in the order of their paths)
+        """
+        path = os.path.normpath(path)
+        result = list()
+
+        parent = path
+        while True:
+            result.extend(self.__values.get(parent, []))
+            next_parent = os.path.dirname(parent)
+            if next_parent == parent:
+                break
+            parent = next_parent
+
+        prefix = path.rstrip(os.sep) + os.sep
+        idx = bisect.bisect_left(self.__sorted_paths, prefix)
+        while idx < len(self.__sorted_paths) and self.__sorted_paths[idx].startswith(prefix):
+            # the root directory is its own prefix
+            if self.__sorted_paths[idx] != path:
+                result.extend(self.__values[self.__sorted_paths[idx]])
+            idx += 1
+        return result
+
+    def __len__(self):
+        return len(self.__values)
@@ -95,12 +95,14 @@ class ServiceTransaction(CommandTransaction):
         return ["/bin/systemctl", self.__rollback_action, self.__svcname]
 
     def get_status(self):
-        cmd = ["/bin/systemctl", "is-enabled", self.__svcname]
-        process = subprocess.Popen(cmd,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE)
-
-        stdout, stderr = process.communicate()
+        cmd = core.RuntimeOptions().rebase_command(
+            ["/bin/systemctl", "is-enabled", self.__svcname])
+        with core.TimingReport().measure(core.TimingReport.SUBPROCESS, " ".join(cmd)):
+            process = subprocess.Popen(cmd,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE)
+
+            stdout, stderr = process.communicate()
         if process.returncode != 0:
             core.LogManager().get_logger().fatal(stderr.strip())
             return SERVICESTATE_DISABLED
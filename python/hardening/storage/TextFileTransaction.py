@@ -51,7 +51,7 @@ class TextFileTransaction(FileTransaction):
     def __prepare_commit__(self):
         if core.RuntimeOptions().is_log_enabled():
             diff = list(
-                difflib.unified_diff(self.__original_lines, self.__lines, self.tmpname(),
+                difflib.unified_diff(self.__original_lines, self.__lines, self.url(),
                                      self.url()))
             if len(diff) > 0:
                 self.append_to_changelog(
@@ -13,10 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import inspect
 import os
 from abc import ABCMeta, abstractmethod
 from collections import namedtuple
+from operator import methodcaller
 
 from six import with_metaclass
 
@@ -35,6 +35,74 @@ class TransactionStatus(object):
     ROLLEDBACK = "ROLLEDBACK"
 
 
+# operations which change the status of a transaction
+OPERATION_BEGIN = "begin"
+OPERATION_PREPARE_COMMIT = "prepare_commit"
+OPERATION_COMMIT = "commit"
+OPERATION_ROLLBACK = "rollback"
+
+StateChange = namedtuple('StateChange', ['action', 'condition', 'next_state'])
+
+# key: current status, value: dictionary which maps every allowed operation to its state change.
+# `action` and `condition` are called with the transaction as single argument
+STATE_CHANGES = {
+    TransactionStatus.NEW: {
+        OPERATION_BEGIN:
+            StateChange(action=methodcaller('__begin__'),
+                        condition=None,
+                        next_state=TransactionStatus.RUNNING),
+        OPERATION_PREPARE_COMMIT:
+            StateChange(action=None,
+                        condition=lambda transaction: not transaction.has_something_to_commit(),
+                        next_state=TransactionStatus.NEW),
+        OPERATION_COMMIT:
+            StateChange(action=None,
+                        condition=None,
+                        next_state=TransactionStatus.COMMITTED),
+        OPERATION_ROLLBACK:
+            StateChange(action=None,
+                        condition=None,
+                        next_state=TransactionStatus.ROLLEDBACK)
+    },
+    TransactionStatus.RUNNING: {
+        OPERATION_BEGIN:
+            StateChange(action=None,
+                        condition=None,
+                        next_state=TransactionStatus.RUNNING),
+        OPERATION_PREPARE_COMMIT:
+            StateChange(action=methodcaller('__prepare_commit__'),
+                        condition=None,
+                        next_state=TransactionStatus.COMMITPREPARED),
+        OPERATION_ROLLBACK:
+            StateChange(action=methodcaller('__rollback__'),
+                        condition=None,
+                        next_state=TransactionStatus.ROLLEDBACK)
+    },
+    TransactionStatus.COMMITPREPARED: {
+        OPERATION_COMMIT:
+            StateChange(action=methodcaller('__commit__'),
+                        condition=None,
+                        next_state=TransactionStatus.COMMITTED),
+        OPERATION_ROLLBACK:
+            StateChange(action=methodcaller('__rollback__'),
+                        condition=None,
+                        next_state=TransactionStatus.ROLLEDBACK)
+    },
+    # the transition from committed to rolledback is required enable the TransactionManager
+    # to roll back all transitions, independant of their state. A Transaction should
+    # do a full cleanup during the commit operation as well as the
+    # rollback operation
+    TransactionStatus.COMMITTED: {
+        OPERATION_ROLLBACK:
+            StateChange(action=methodcaller('__rollback__'),
+                        condition=None,
+                        next_state=TransactionStatus.ROLLEDBACK)
+    },
+    TransactionStatus.ROLLEDBACK: {
+    }
+}
+
+
 class Transaction(with_metaclass(ABCMeta)):
     """
     parent class for all transaction
@@ -47,66 +115,7 @@ class Transaction(with_metaclass(ABCMeta)):
         self.__has_modifications = False
         self.__url = url
         self.__change_commands = list()
-
-        operation = namedtuple(
-            'operation', ['action', 'condition', 'next_state'])
-
-        self.__transaction_statechanges = {
-            TransactionStatus.NEW: {
-                self.begin:
-                    operation(action=self.__begin__,
-                              condition=None,
-                              next_state=TransactionStatus.RUNNING),
-                self.prepare_commit:
-                    operation(action=None,
-                              condition=lambda: not self.has_something_to_commit(),
-                              next_state=TransactionStatus.NEW),
-                self.commit:
-                    operation(action=None,
-                              condition=None,
-                              next_state=TransactionStatus.COMMITTED),
-                self.rollback:
-                    operation(action=None,
-                              condition=None,
-                              next_state=TransactionStatus.ROLLEDBACK)
-            },
-            TransactionStatus.RUNNING: {
-                self.begin:
-                    operation(action=None,
-                              condition=None,
-                              next_state=TransactionStatus.RUNNING),
-                self.prepare_commit:
-                    operation(action=self.__prepare_commit__,
-                              condition=None,
-                              next_state=TransactionStatus.COMMITPREPARED),
-                self.rollback:
-                    operation(action=self.__rollback__,
-                              condition=None,
-                              next_state=TransactionStatus.ROLLEDBACK)
-            },
-            TransactionStatus.COMMITPREPARED: {
-                self.commit:
-                    operation(action=self.__commit__,
-                              condition=None,
-                              next_state=TransactionStatus.COMMITTED),
-                self.rollback:
-                    operation(action=self.__rollback__,
-                              condition=None,
-                              next_state=TransactionStatus.ROLLEDBACK)
-            },
-            # the transition from committed to rolledback is required enable the TransactionManager
-            # to roll back all transitions, independant of their state. A Transaction should
-            # do a full cleanup during the commit operation as well as the
-            # rollback operation
-            TransactionStatus.COMMITTED: {
-                self.rollback:
-                    operation(action=self.__rollback__,
-                              condition=None,
-                              next_state=TransactionStatus.ROLLEDBACK)
-            },
-            TransactionStatus.ROLLEDBACK: {
-            }
-        }
+        self.__dependencies = list()
 
     def url(self):
         return self.__url
@@ -114,50 +123,72 @@ class Transaction(with_metaclass(ABCMeta)):
     def add_change_command(self, cmd):
         self.__change_commands.append(cmd)
 
+    def add_dependency(self, transaction):
+        """declares that this transaction must be committed after `transaction`, e.g. because
+        `transaction` creates the user which becomes the owner of a file
+
+        @param transaction: the transaction this transaction depends on (see
+        TransactionManager::dependency_groups)
+        """
+        self.__dependencies.append(transaction)
+
+    def dependencies(self):
+        """returns the transactions which have been passed to Transaction::add_dependency
+
+        @return list of transactions
+        """
+        return list(self.__dependencies)
+
     def is_transaction_running(self):
         return self.__status == TransactionStatus.RUNNING
 
     def begin(self):
-        self.__change_state()
+        self.__change_state(OPERATION_BEGIN)
 
     def prepare_commit(self):
-        self.__change_state()
+        with self.__measure(OPERATION_PREPARE_COMMIT):
+            self.__change_state(OPERATION_PREPARE_COMMIT)
 
     def commit(self):
-        if core.RuntimeOptions().difference_mode() and len(self.__change_commands) > 0:
-            if not io.create_writer().prompt_user_yesnocancel(
-                    _("Do you want to run the following command(s)?"),
-                    quoted=self.__change_commands):
-                self.__status = TransactionStatus.COMMITTED
-                return
+        with self.__measure(OPERATION_COMMIT):
+            if core.RuntimeOptions().difference_mode() and len(self.__change_commands) > 0:
+                if not io.create_writer().prompt_user_yesnocancel(
+                        _("Do you want to run the following command(s)?"),
+                        quoted=self.__change_commands):
+                    self.__status = TransactionStatus.COMMITTED
+                    return
 
-        if core.RuntimeOptions().is_log_enabled():
-            for cmd in self.__change_commands:
-                core.ChangeLog().append_log_item(cmd)
+            if core.RuntimeOptions().is_log_enabled() and len(self.__change_commands) > 0:
+                core.ChangeLog().append_log_item(*self.__change_commands)
 
-        self.__has_modifications |= (len(self.__change_commands) > 0)
-        self.__change_state()
+            self.__has_modifications |= (len(self.__change_commands) > 0)
+            self.__change_state(OPERATION_COMMIT)
 
     def rollback(self):
-        self.__change_state()
+        with self.__measure(OPERATION_ROLLBACK):
+            self.__change_state(OPERATION_ROLLBACK)
+
+    def __measure(self, operation):
+        return core.TimingReport().measure(core.TimingReport.TRANSACTION, str(self),
+                                           operation=operation)
 
-    def __change_state(self):
-        current_status = self.__transaction_statechanges[self.status()]
-        current_frame = inspect.currentframe()
+    def __change_state(self, operation):
+        """performs an operation according to `STATE_CHANGES`
 
-        calling_frame = inspect.getframeinfo(
-            inspect.getouterframes(current_frame, 2)[1][0])
+        @param operation: one of `OPERATION_BEGIN`, `OPERATION_PREPARE_COMMIT`, `OPERATION_COMMIT`
+        or `OPERATION_ROLLBACK`
+        """
         try:
-            operation = current_status[getattr(self, calling_frame.function)]
+            state_change = STATE_CHANGES[self.__status][operation]
         except KeyError:
             raise RuntimeError(
                 _("invalid transaction state change: %(status)s --(%(function)s)-> ??")
-                % {'status': self.__status, 'function': calling_frame.function})
+                % {'status': self.__status, 'function': operation})
 
-        if operation.condition is None or operation.condition():
-            if operation.action is not None:
-                operation.action()
-            self.__status = operation.next_state
+        if state_change.condition is None or state_change.condition(self):
+            if state_change.action is not None:
+                state_change.action(self)
+            self.__status = state_change.next_state
 
     def prompt_user(self, message="", quoted=None):
         return self.__writer.prompt_user_yesnocancel(message, quoted=quoted)
@@ -169,16 +200,6 @@ class Transaction(with_metaclass(ABCMeta)):
             return self.__writer.display_message(
                 message=message, headline=None)
 
-    @staticmethod
-    def __get_executing_util():
-        for frame in inspect.stack():
-            if 'self' in frame[0].f_locals:
-                cls = frame[0].f_locals['self'].__class__
-                if "HardeningUtil" in [
-                        x.__name__ for x in inspect.getmro(cls)]:
-                    return frame[0].f_locals['self']
-        raise RuntimeError("no util found in stack: %s" % inspect.stack())
-
     def status(self):
         return self.__status
 
@@ -200,7 +221,7 @@ class Transaction(with_metaclass(ABCMeta)):
         return self.url() == other.url()
 
     def __hash__(self):
-        return hash(self.__class__)
+        return hash((self.__class__, self.url()))
 
     def __str__(self):
         return str(self.url_schema()) + ":" + str(self.url())
@@ -16,10 +16,13 @@
 from datetime import datetime
 import os
 import tempfile
+import threading
 
-from hardening import info
+from hardening import info, constants
 from hardening.core import singleton
 from hardening.core import RuntimeOptions
+from hardening.storage.BackupStore import BackupStore, FORMAT_OBJECTS
+from hardening.storage.CommitLog import CommitLog
 
 
 @singleton
@@ -30,12 +33,36 @@ class TransactionInfo(object):
 
     def __init__(self):
         self.__timestamp = datetime.now().strftime("%Y%m%d_%H:%M:%S")
-        self.__dirname = os.path.join(info.Configuration().get_property(
-            "Backup", "BaseDir", default=tempfile.gettempdir()), self.__timestamp)
+        self.__basedir = self.__root_subdir(info.Configuration().get_property(
+            "Backup", "BaseDir", default=tempfile.gettempdir()))
+        self.__dirname = os.path.join(self.__basedir, self.__timestamp)
+        self.__cachedir = self.__root_subdir(info.Configuration().get_property(
+            constants.CONFIG_CACHE, constants.CONFIG_BASEDIR,
+            default=os.path.join(os.path.expanduser("~"), ".hardening-cache")))
+        self.__backup_store = None
+        self.__commit_log = None
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def __root_subdir(dirname):
+        # every root filesystem gets its own backups and caches, so that several root filesystems
+        # can be hardened at the same time
+        root = RuntimeOptions().root_path()
+        if root is None:
+            return dirname
+        return os.path.join(dirname, RuntimeOptions.root_identifier(root))
 
     def get_timestamp(self):
         return self.__timestamp
 
+    def get_basedir(self):
+        """returns the directory which contains the backup directories of all runs"""
+        return self.__basedir
+
+    def get_cachedir(self):
+        """returns the directory which contains data cached between runs (see Cache/BaseDir)"""
+        return self.__cachedir
+
     def get_backupdir(self, subdir=None):
         if subdir is None:
             dirname = self.__dirname
@@ -43,8 +70,28 @@ class TransactionInfo(object):
             dirname = os.path.join(self.__dirname, *subdir.split(os.sep))
 
         if not os.path.exists(dirname):
-            mode = info.Configuration().get_property(
-                "Backup", "BaseDirMode", default=0o700)
             if not RuntimeOptions().pretend_mode():
-                os.makedirs(dirname, mode)
+                os.makedirs(dirname, self.__dirmode())
         return dirname
+
+    def get_backup_store(self):
+        """returns the store which records the original state of all changed paths of this run"""
+        with self.__lock:
+            if self.__backup_store is None:
+                self.__backup_store = BackupStore(
+                    self.__basedir, self.__dirname, self.__dirmode(),
+                    info.Configuration().get_property(constants.CONFIG_BACKUP,
+                                                      constants.CONFIG_FORMAT,
+                                                      default=FORMAT_OBJECTS))
+            return self.__backup_store
+
+    def get_commit_log(self):
+        """returns the write-ahead log of the commits of this root filesystem"""
+        with self.__lock:
+            if self.__commit_log is None:
+                self.__commit_log = CommitLog(self.__basedir, self.__dirmode())
+            return self.__commit_log
+
+    @staticmethod
+    def __dirmode():
+        return info.Configuration().get_property("Backup", "BaseDirMode", default=0o700)
@@ -112,10 +112,9 @@ class XmlTransaction(FileTransaction):
                                              self.__xml).split(os.linesep),
                                          fromfile=self.url()))
         if len(diff) > 0:
-            core.ChangeLog().append_log_item("###########################################")
-            core.ChangeLog().append_log_item("patch '%s' <<EOF" % self.url())
-            core.ChangeLog().append_log_item(*diff)
-            core.ChangeLog().append_log_item("EOF")
+            core.ChangeLog().append_log_item("###########################################",
+                                             "patch '%s' <<EOF" % self.url(),
+                                             *(diff + ["EOF"]))
 
 
 # pylint: disable=no-member
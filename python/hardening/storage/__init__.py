@@ -14,6 +14,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import os
+import threading
+
+
 # pylint: disable=too-few-public-methods
 class StorageHandler(object):
     """
@@ -35,7 +39,19 @@ class StorageHandler(object):
 from hardening.storage.Transaction import Transaction
 # noinspection PyPep8
 # pylint: disable=wrong-import-position
+from hardening.storage.BackupArchive import BackupArchive
+# noinspection PyPep8
+# pylint: disable=wrong-import-position
+from hardening.storage.BackupStore import BackupStore
+# noinspection PyPep8
+# pylint: disable=wrong-import-position
+from hardening.storage.CommitLog import CommitLog
+# noinspection PyPep8
+# pylint: disable=wrong-import-position
 from hardening.storage.TransactionInfo import TransactionInfo
+# noinspection PyPep8
+# pylint: disable=wrong-import-position
+from hardening.storage.PathIndex import PathIndex
 
 # noinspection PyPep8
 # pylint: disable=wrong-import-position
@@ -51,19 +67,163 @@ class TransactionManager(object):
 
     def __init__(self):
         self.__transactions = list()
+        # key: normalized (schema, address), see TransactionManager::__registry_key
         self.__transaction_index = dict()
+        self.__path_index = PathIndex()
         self.__transaction_classes = dict()
+        self.__lock = threading.RLock()
 
     def register_storage_handler(self, url_schema, cls):
         assert url_schema not in self.__transaction_classes
         self.__transaction_classes[url_schema] = cls
 
     def commit_all(self):
-        for transaction in self.__transactions:
-            transaction.prepare_commit()
+        """commits all transactions, using a two-phase commit
+
+        First, consecutive commands are folded into single invocations where possible (see
+        CommandTransaction::coalesce) and Transaction::prepare_commit() is run for all transactions
+        concurrently. Then, every group of dependent transactions (see
+        TransactionManager::dependency_groups) is committed sequentially, while independent groups
+        are committed concurrently. If any transaction fails, no further transactions are
+        committed, the transactions which have been committed already are undone (see below) and
+        the exception is passed to the caller, which is expected to call
+        TransactionManager::rollback_all().
+
+        In difference mode, the user has to confirm the changes of every transaction, so all
+        transactions are processed sequentially in that case.
+
+        The original state of every changed path is written to the backup store (see
+        storage::BackupStore) while the commit is prepared. Before the first transaction is
+        committed, the intended changes are recorded in a write-ahead log (see storage::CommitLog),
+        so that a commit which is interrupted by a crash or a power loss is undone by the next run.
+        A commit which fails is undone immediately, using the same log (see
+        scheduler::Restorer::recover). The files are not synced one by one; all changes of the
+        batch are synced at once instead.
+
+        Afterwards, the manifest of the backups of the current run is written and the log of a
+        successful commit is removed.
+
+        @return list of the committed transactions
+        """
+        if core.RuntimeOptions().difference_mode():
+            pool = core.WorkerPool(1)
+        else:
+            pool = core.WorkerPool(core.RuntimeOptions().jobs())
+
+        transactions = list(self.__transactions)
+
+        merged = CommandTransaction.coalesce(transactions)
+        if merged > 0:
+            core.LogManager().get_logger().debug(
+                "folded %(merged)d commands into other commands" % {'merged': merged})
+
+        store = TransactionInfo().get_backup_store()
+        first_entry = len(store.entries())
+        pool.map(lambda transaction: transaction.prepare_commit(), transactions)
+        commit_log = self.__begin_commit_log(transactions, store.entries()[first_entry:])
+
+        aborted = threading.Event()
+
+        def commit_group(group):
+            for transaction in group:
+                if aborted.is_set():
+                    return
+                # pylint: disable=bare-except
+                try:
+                    transaction.commit()
+                except:
+                    aborted.set()
+                    raise
+
+        # pylint: disable=bare-except
+        try:
+            pool.map(commit_group, self.dependency_groups(transactions))
+        except:
+            # the manifest must list every change which has been made, even if the commit fails
+            store.write_manifest()
+            if commit_log is not None:
+                self.__undo_commit(commit_log)
+            raise
+
+        store.write_manifest()
+        if commit_log is not None:
+            commit_log.finish()
+        return transactions
+
+    @staticmethod
+    def __undo_commit(commit_log):
+        """undoes the changes of a batch whose commit has failed, using its write-ahead log
+
+        If the changes cannot be undone, the log is kept, so that the next run tries again.
+        """
+        # pylint: disable=cyclic-import
+        from hardening.scheduler.Restorer import Restorer
+
+        commit_log.abort()
+        # noinspection PyBroadException
+        # pylint: disable=broad-except
+        try:
+            failures = Restorer.recover()
+        except Exception as error:
+            core.LogManager().get_logger().error(str(error))
+            return
+        if len(failures) > 0:
+            core.LogManager().get_logger().error(
+                _("unable to undo the changes to: %(failures)s")
+                % {'failures': ", ".join(failures)})
+
+    @staticmethod
+    def __begin_commit_log(transactions, entries):
+        """records the intended changes of a batch of prepared transactions
 
-        for transaction in self.__transactions:
-            transaction.commit()
+        @param transactions: the prepared transactions
+        @param entries: the manifest entries which have been recorded while preparing them
+        @return the open storage::CommitLog, or `None` if nothing is going to be changed
+        """
+        if core.RuntimeOptions().pretend_mode():
+            return None
+
+        has_commands = any(isinstance(t, CommandTransaction) and
+                           t.get_commit_command() is not None for t in transactions)
+        if len(entries) == 0 and not has_commands:
+            return None
+
+        temporary_files = [t.tmpname() for t in transactions
+                           if isinstance(t, FileAndDirectoryTransaction)]
+
+        # the manifest (and the index of an archive) must be written before any file is replaced
+        store = TransactionInfo().get_backup_store()
+        store.write_manifest()
+        commit_log = TransactionInfo().get_commit_log()
+        commit_log.begin(TransactionInfo().get_timestamp(), store.backup_format(), entries,
+                         [name for name in temporary_files if name is not None])
+        return commit_log
+
+    def checkpoint(self):
+        """commits all transactions (see TransactionManager::commit_all) and removes them from
+        the list of managed transactions.
+
+        Utils which request a transaction for the same URL afterwards get a new transaction,
+        which works on the committed state. Transactions which have been checkpointed are not
+        affected by TransactionManager::rollback_all() anymore.
+
+        @return list of the committed transactions
+        """
+        self.commit_all()
+        return self.clear()
+
+    def clear(self):
+        """removes all transactions from the list of managed transactions, without committing or
+        rolling them back
+
+        @return list of the removed transactions
+        """
+        with self.__lock:
+            transactions = self.__transactions
+            self.__transactions = list()
+            self.__transaction_index = dict()
+            self.__path_index = PathIndex()
+        return transactions
 
     def rollback_all(self):
         if not self.__transactions:
@@ -78,30 +238,138 @@ class TransactionManager(object):
         if url is None:
             url = "notransaction:acknuo4aw784zrpyonsuircpywl4u38oxw8m49u8w30mp0a48uw3p984xuawop"
 
-        if url not in self.__transaction_index:
+        with self.__lock:
+            return self.__create_transaction(url, **kwargs)
 
-            schema, address = self.parse_url(url)
-            core.LogManager().get_logger().debug("creating transaction for '%(address)s'"
-                                                 % {'address': address})
+    def __create_transaction(self, url, **kwargs):
+        schema, address = self.parse_url(url)
+        transaction_class = self.__transaction_classes[schema]
+        if issubclass(transaction_class, FileAndDirectoryTransaction):
+            # when hardening a root filesystem (see core::RuntimeOptions::root_path), all
+            # files and directories are located below the root directory
+            address = core.RuntimeOptions().rebase_path(address)
 
-            if schema not in self.__transaction_classes.keys():
-                raise SyntaxError(
-                    _("invalid schema for transaction: %(schema)s")
-                    % {'schema': schema})
+        key = self.__registry_key(transaction_class, schema, address)
+        if key in self.__transaction_index:
+            core.LogManager().get_logger().debug("using existing transaction for '%(url)s'"
+                                                 % {'url': url})
+            return self.__transaction_index[key]
 
-            transaction = self.__transaction_classes[schema](address, **kwargs)
+        core.LogManager().get_logger().debug("creating transaction for '%(address)s'"
+                                             % {'address': address})
+        transaction = transaction_class(address, **kwargs)
 
-            assert transaction not in self.__transaction_index.values()
-            self.__transaction_index[url] = transaction
+        self.__transaction_index[key] = transaction
+        self.__transactions.append(transaction)
+        path = self.__filesystem_path(transaction)
+        if path is not None:
+            self.__path_index.add(path, transaction)
+        return transaction
 
-            assert transaction not in self.__transactions
-            self.__transactions.append(transaction)
+    @staticmethod
+    def __registry_key(transaction_class, schema, address):
+        # different spellings of the same path (e.g. `/etc//ssh/`) refer to the same transaction
+        if issubclass(transaction_class, FileAndDirectoryTransaction) and address:
+            return schema, os.path.normpath(address)
+        return schema, address
 
-        else:
-            core.LogManager().get_logger().debug("using existing transaction for '%(url)s'"
-                                                 % {'url': url})
+    def find_transaction(self, url):
+        """returns the transaction which has been created for a url
+
+        @param url: url, as passed to TransactionManager::create_transaction
+        @return the transaction, or `None` if no transaction has been created for `url`
+        """
+        schema, address = self.parse_url(url)
+        transaction_class = self.__transaction_classes[schema]
+        if issubclass(transaction_class, FileAndDirectoryTransaction):
+            address = core.RuntimeOptions().rebase_path(address)
+        with self.__lock:
+            return self.__transaction_index.get(
+                self.__registry_key(transaction_class, schema, address))
+
+    def overlapping_transactions(self, path):
+        """returns all file and directory transactions whose paths overlap `path`, i.e. which
+        work on `path`, on one of its parent directories or on a file or directory below `path`
+
+        @param path: absolute filesystem path (already rebased, see
+        core::RuntimeOptions::rebase_path)
+        @return list of transactions
+        """
+        with self.__lock:
+            return self.__path_index.overlapping(path)
+
+    def dependency_groups(self, transactions):
+        """partitions transactions into groups which can be processed independently
+
+        Two transactions depend on each other if
+         - they refer to the same or to nested filesystem paths (e.g. `dir:/etc/apache2` and
+           `file:/etc/apache2/apache2.conf`),
+         - both are command transactions (including storage::PasswdTransaction and
+           storage::ServiceTransaction), because the order in which commands are run is
+           significant (e.g. `a2dismod` must run before `a2enmod`),
+         - a file or directory transaction refers to a path which a command transaction passes to
+           its command (see CommandTransaction::touched_paths), or
+         - one of them has been passed to Transaction::add_dependency of the other one, e.g. the
+           transaction which creates the user who becomes the owner of a directory.
+        Transactions which are not related in one of these ways end up in different groups, even
+        if commands are run before them.
+
+        @param transactions: list of transactions, in the order in which they are processed
+        @return list of groups (lists of transactions). The order of the transactions inside a
+        group, as well as the order of the groups, matches the order of `transactions`
+        """
+        transactions = list(transactions)
+        group_of = list(range(len(transactions)))
+
+        def find(idx):
+            while group_of[idx] != idx:
+                group_of[idx] = group_of[group_of[idx]]
+                idx = group_of[idx]
+            return idx
+
+        def union(idx1, idx2):
+            root1, root2 = find(idx1), find(idx2)
+            if root1 != root2:
+                group_of[max(root1, root2)] = min(root1, root2)
+
+        path_index = PathIndex()
+        first_occurrence = dict()
+        last_command = None
+        for idx, transaction in enumerate(transactions):
+            if id(transaction) in first_occurrence:
+                union(first_occurrence[id(transaction)], idx)
+                continue
+            first_occurrence[id(transaction)] = idx
+
+            if isinstance(transaction, CommandTransaction):
+                if last_command is not None:
+                    union(last_command, idx)
+                last_command = idx
+                paths = transaction.touched_paths()
+            else:
+                path = self.__filesystem_path(transaction)
+                paths = [path] if path is not None else list()
+
+            for path in paths:
+                for other in path_index.overlapping(path):
+                    union(other, idx)
+                path_index.add(path, idx)
+
+        for idx, transaction in enumerate(transactions):
+            for dependency in transaction.dependencies():
+                if id(dependency) in first_occurrence:
+                    union(first_occurrence[id(dependency)], idx)
+
+        groups = dict()
+        for idx, transaction in enumerate(transactions):
+            groups.setdefault(find(idx), list()).append(transaction)
+        return [groups[key] for key in sorted(groups.keys())]
 
-        return self.__transaction_index[url]
+    @staticmethod
+    def __filesystem_path(transaction):
+        if isinstance(transaction, FileAndDirectoryTransaction) and transaction.url() is not None:
+            return os.path.normpath(transaction.url())
+        return None
 
     def parse_url(self, url):
         parts = url.split(':')
@@ -25,6 +25,17 @@ class CommandUtil(HardeningUtil):
     def get_rollback_command(self):
         return []
 
+    def get_commit_prefix(self):
+        """returns the leading part of the commit command, if commands of consecutive utils
+        may be folded into a single invocation, such as `a2enmod mod1 mod2 ...`.
+        Returns `None` if the command cannot be merged.
+        """
+        return None
+
+    def get_rollback_prefix(self):
+        """like CommandUtil::get_commit_prefix, but for the rollback command"""
+        return None
+
     def __setup__(self):
         pass
 
@@ -36,8 +47,10 @@ class CommandUtil(HardeningUtil):
                 quoted=[" ".join(self.get_commit_command())])
 
         if __run_cmd:
-            self.transaction().set_commit_command(self.get_commit_command())
-            self.transaction().set_rollback_command(self.get_rollback_command())
+            self.transaction().set_commit_command(self.get_commit_command(),
+                                                  prefix=self.get_commit_prefix())
+            self.transaction().set_rollback_command(self.get_rollback_command(),
+                                                    prefix=self.get_rollback_prefix())
 
     def __finish__(self):
         pass
@@ -33,6 +33,9 @@ class HardeningUtil(six.with_metaclass(ABCMeta)):
             option_values = dict()
 
         self.__transaction = None
+        # a cached execution plan contains the resolved key (see scheduler::PlanCache)
+        self.__transaction_key = kwargs.get('transaction_key')
+        self.__fingerprint = None
 
         for opt in option_values.keys():
             if opt not in self.valid_options():
@@ -115,17 +118,8 @@ class HardeningUtil(six.with_metaclass(ABCMeta)):
         return key in self.__option_values
 
     def is_enabled(self):
-        res = self.get_option(constants.CONFIG_RUNIF, None)
-        if res is None:
-            return True
-        if isinstance(res, bool):
-            return res
-        elif isinstance(res, str):
-            return info.Configuration().interpolate(res)
-        else:
-            assert isinstance(res, list)
-            return six.moves.reduce(lambda x, y: x and y,
-                                    [info.Configuration().interpolate(r) for r in res])
+        return info.RunConditions().is_true(
+            self.get_option(constants.CONFIG_RUNIF, None, interpolate=False))
 
     @staticmethod
     def store_result(*key, **kwargs):
@@ -135,21 +129,40 @@ class HardeningUtil(six.with_metaclass(ABCMeta)):
         info.Configuration().set_property(*key, value=result)
 
     def __eq__(self, other):
-        res = self.__class__.__name__ == other.__class__.__name__ \
-            and self.option_values == other.option_values
-        return res
+        if not isinstance(other, HardeningUtil):
+            return False
+        return self.fingerprint() == other.fingerprint()
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __hash__(self):
+        return hash(self.fingerprint())
+
+    def fingerprint(self):
+        """returns a hash value of the class name and the (not interpolated) options of this util
+
+        Two utils are equal if they have the same fingerprint. The fingerprint is calculated only
+        once, so the options must not be changed after the util has been created.
+
+        @return hexadecimal digest as string (see core::fingerprint)
+        """
+        if self.__fingerprint is None:
+            self.__fingerprint = core.fingerprint(self.__class__.__name__, self.__option_values)
+        return self.__fingerprint
+
     def __str__(self):
         return self.__class__.__name__
 
     def get_transaction_key(self):
         if constants.CONFIG_TRANSACTION not in self.__option_values.keys():
             return None
-        return info.Configuration().interpolate(
-            self.__option_values[constants.CONFIG_TRANSACTION])
+
+        # the resolved key is part of the cached execution plan (see scheduler::PlanCache)
+        if self.__transaction_key is None:
+            self.__transaction_key = info.Configuration().interpolate(
+                self.__option_values[constants.CONFIG_TRANSACTION])
+        return self.__transaction_key
 
     @staticmethod
     def get_transaction_kwargs():
@@ -161,13 +174,14 @@ class HardeningUtil(six.with_metaclass(ABCMeta)):
             **self.get_transaction_kwargs())
 
     def setup(self):
-        self.transaction().begin()
-        assert self.transaction().is_transaction_running()
+        with self.__measure("setup"):
+            self.transaction().begin()
+            assert self.transaction().is_transaction_running()
 
-        core.LogManager().get_logger().debug(
-            _("running %(transaction)s.begin()"), {'transaction': self.transaction().url()})
+            core.LogManager().get_logger().debug(
+                _("running %(transaction)s.begin()"), {'transaction': self.transaction().url()})
 
-        self.__invoke(self.__setup__)
+            self.__invoke(self.__setup__)
 
     def __setup__(self):
         pass
@@ -176,7 +190,8 @@ class HardeningUtil(six.with_metaclass(ABCMeta)):
         core.LogManager().get_logger().debug(
             _("running %(transaction)s.finish()"), {'transaction': self.__class__.__name__})
 
-        self.__invoke(self.__finish__)
+        with self.__measure("finish"):
+            self.__invoke(self.__finish__)
 
     def __finish__(self):
         pass
@@ -188,8 +203,9 @@ class HardeningUtil(six.with_metaclass(ABCMeta)):
     def run(self):
         core.LogManager().get_logger().debug(
             _("running %(transaction)s.run()"), {'transaction': self.__class__.__name__})
-        self.print_metainfo()
-        self.__invoke(self.__run__)
+        with self.__measure("run"):
+            self.print_metainfo()
+            self.__invoke(self.__run__)
 
     def print_metainfo(self):
         io.create_writer().display_message(
@@ -239,6 +255,13 @@ class HardeningUtil(six.with_metaclass(ABCMeta)):
     def get_description(self):
         return self.get_metainfo(constants.CONFIG_DESCRIPTION)
 
+    def __measure(self, phase):
+        module = self.get_runtimeinfo(constants.OPTION_MODULE, interpolate=False)
+        section = self.get_runtimeinfo(constants.OPTION_SECTION, interpolate=False)
+        name = "/".join([str(x) for x in [module, section, self] if x is not None])
+        return core.TimingReport().measure(core.TimingReport.UTIL, name, phase=phase,
+                                           module=module, section=section)
+
     def __invoke(self, method):
         self.__set_current_util()
         method()
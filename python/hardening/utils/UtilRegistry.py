@@ -0,0 +1,96 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import importlib
+import inspect
+import os
+import threading
+
+from hardening import core, constants
+from hardening.utils.HardeningUtil import HardeningUtil
+
+
+@core.singleton
+class UtilRegistry(object):
+    """maps util names, as used in the `RunUtils` entries of the module configuration files
+    (e.g. `configfile.IniFileEntry`), to util classes
+
+    Every util class is imported and validated only once, when it is requested for the first time.
+    """
+
+    def __init__(self):
+        self.__classes = dict()
+        self.__lock = threading.Lock()
+
+    def get_class(self, util_name):
+        """returns the util class with the given name
+
+        @param util_name: name of the util, relative to the `utils` package
+        @return subclass of utils::HardeningUtil
+        """
+        with self.__lock:
+            if util_name not in self.__classes:
+                self.__classes[util_name] = self.__import_class(util_name)
+            return self.__classes[util_name]
+
+    @staticmethod
+    def get_name(util_class):
+        """returns the name by which a util class can be requested using UtilRegistry::get_class
+
+        @param util_class: subclass of utils::HardeningUtil
+        @return name of the util, relative to the `utils` package
+        """
+        prefix = 'hardening.' + constants.PACKAGES_PACKAGE + '.'
+        module_name = util_class.__module__
+        if not module_name.startswith(prefix) or \
+                module_name.split('.')[-1] != util_class.__name__:
+            raise SyntaxError(_("'%(util)s' is not part of the utils package")
+                              % {'util': util_class.__name__})
+        return module_name[len(prefix):]
+
+    def get_classes(self):
+        """imports all util classes of the `utils` package
+
+        @return list of (util_name, util_class) tuples, sorted by name
+        """
+        searchpath = os.path.dirname(inspect.getfile(HardeningUtil))
+
+        util_names = list()
+        for root, _, files in os.walk(searchpath):
+            for code_file in [f for f in files if f.endswith(".py") and not f.startswith("__")]:
+                relative_path = os.path.relpath(os.path.join(root, code_file[:-3]), searchpath)
+                util_names.append(relative_path.replace(os.sep, '.'))
+
+        result = list()
+        for util_name in sorted(util_names):
+            try:
+                result.append((util_name, self.get_class(util_name)))
+            except SyntaxError:
+                continue
+        return result
+
+    @staticmethod
+    def __import_class(util_name):
+        pkg_name = 'hardening.' + constants.PACKAGES_PACKAGE + '.' + util_name
+        cls_name = util_name.split('.')[-1]
+
+        cls = getattr(importlib.import_module(pkg_name), cls_name, None)
+        if not inspect.isclass(cls) or not issubclass(cls, HardeningUtil):
+            raise SyntaxError(_("'%(util)s' is not a subclass of HardeningUtil")
+                              % {'util': util_name})
+
+        core.LogManager().get_logger().debug(_("imported %(module)s.%(class)s") %
+                                             {'module': pkg_name, 'class': cls_name})
+        return cls
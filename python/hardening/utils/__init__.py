@@ -98,3 +98,5 @@ class ModuleSettings(object):
         cls.options = staticmethod(lambda: self.__options)
 
         return cls
+
+from hardening.utils.UtilRegistry import UtilRegistry
@@ -46,3 +46,9 @@ class ApacheDismod(hardening.utils.CommandUtil.CommandUtil):
         command = ["a2enmod"]
         command.extend(self.__enabled_modules)
         return command
+
+    def get_commit_prefix(self):
+        return ["a2dismod", "-q", "-f"]
+
+    def get_rollback_prefix(self):
+        return ["a2enmod"]
@@ -33,3 +33,9 @@ class ApacheEnmod(hardening.utils.CommandUtil.CommandUtil):
     def get_rollback_command(self):
         return ["a2dismod", "-q", "-f",
                 self.get_option(constants.OPTION_MODNAME)]
+
+    def get_commit_prefix(self):
+        return ["a2enmod"]
+
+    def get_rollback_prefix(self):
+        return ["a2dismod", "-q", "-f"]
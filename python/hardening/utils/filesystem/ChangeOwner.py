@@ -47,8 +47,18 @@ class ChangeOwner(utils.HardeningUtil):
         group = self.get_option(constants.OPTION_GROUP)
 
         if user is not None:
+            passwd_transaction = storage.TransactionManager().find_transaction("passwd:" + user)
+            if passwd_transaction is not None:
+                # the user must exist before the owner is changed
+                self.transaction().add_dependency(passwd_transaction)
+
             if lib.Passwd().has_passwd_entry(user):
                 self.__uid = lib.Passwd().get_uid(user)
+            elif core.RuntimeOptions().pretend_mode() and passwd_transaction is not None:
+                # the user is not created in pretend mode (see storage::PasswdTransaction)
+                core.LogManager().get_logger().info(
+                    _("the owner of '%(path)s' cannot be checked, because the user '%(user)s' "
+                      "does not exist yet") % {'path': self.transaction().url(), 'user': user})
             else:
                 raise core.HardeningFailure(_("invalid user name: '%(user)s'")
                                             % {'user': user})
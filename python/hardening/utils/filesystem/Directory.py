@@ -15,7 +15,7 @@
 
 import os
 
-from hardening import utils, constants
+from hardening import core, utils, constants
 
 
 @utils.ModuleSettings(
@@ -29,7 +29,7 @@ class Directory(utils.HardeningUtil):
     """
 
     def __run__(self):
-        path = self.get_option(constants.OPTION_PATH)
+        path = core.RuntimeOptions().rebase_path(self.get_option(constants.OPTION_PATH))
 
         # create the directory
         if not os.path.exists(path):
@@ -0,0 +1,179 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from hardening.storage import BackupStore, BackupArchive
+
+
+class TestBackupStore(unittest.TestCase):
+    def testDeduplication(self):
+        first = self.create_file('first.conf', "PermitRootLogin no\n")
+        second = self.create_file('second.conf', "PermitRootLogin no\n")
+
+        store = self.create_store('run1')
+        first_entry = store.backup(first)
+        second_entry = store.backup(second)
+
+        self.assertEqual(first_entry['object'], second_entry['object'])
+        self.assertEqual(1, len(os.listdir(os.path.join(self.__basedir, 'objects'))))
+        with open(store.object_path(first_entry['object'])) as stream:
+            self.assertEqual("PermitRootLogin no\n", stream.read())
+
+    def testManifest(self):
+        filename = self.create_file('sshd_config', "Port 22\n")
+        os.chmod(filename, 0o640)
+
+        store = self.create_store('run1')
+        store.write_manifest()
+        self.assertFalse(os.path.exists(store.manifest_path()))
+
+        store.backup(filename)
+        store.backup_metadata(self.__workdir)
+        store.backup_absent(os.path.join(self.__workdir, 'new.conf'))
+        store.write_manifest()
+
+        entries = BackupStore.read_manifest(os.path.join(self.__basedir, 'run1'))['entries']
+        self.assertEqual(['file', 'metadata', 'absent'], [entry['type'] for entry in entries])
+        self.assertEqual(0o640, entries[0]['mode'])
+        self.assertEqual(BackupStore.digest(filename), entries[0]['object'])
+
+    def testRelease(self):
+        filename = self.create_file('sshd_config', "Port 22\n")
+
+        store = self.create_store('run1')
+        object_path = store.object_path(store.backup(filename)['object'])
+        self.assertNotEqual(os.stat(filename).st_ino, os.stat(object_path).st_ino)
+
+        # the file is modified in place after the backup, so it must not be linked
+        with open(filename, 'a') as stream:
+            stream.write("PermitRootLogin no\n")
+        store.release(filename)
+        with open(object_path) as stream:
+            self.assertEqual("Port 22\n", stream.read())
+
+    def testReleaseLinkedFile(self):
+        filename = self.create_file('sshd_config', "Port 22\n")
+        other_link = os.path.join(self.__workdir, 'sshd_config.link')
+        os.link(filename, other_link)
+
+        store = self.create_store('run1')
+        object_path = store.object_path(store.backup(filename)['object'])
+        store.release(filename)
+        self.assertNotEqual(os.stat(filename).st_ino, os.stat(object_path).st_ino)
+
+        # the file is replaced, but the other link is still modified in place afterwards
+        os.unlink(filename)
+        with open(other_link, 'a') as stream:
+            stream.write("PermitRootLogin no\n")
+        with open(object_path) as stream:
+            self.assertEqual("Port 22\n", stream.read())
+
+    def testCollectGarbage(self):
+        for run in ('run1', 'run2', 'run3'):
+            store = self.create_store(run)
+            store.backup(self.create_file('common.conf', "shared\n"))
+            store.backup(self.create_file(run + '.conf', run + "\n"))
+            store.close()
+
+        # the staging file of an object which is being stored by another process
+        staging = os.path.join(self.__basedir, 'objects', 'ab', '.tmp1234')
+        os.makedirs(os.path.dirname(staging))
+        open(staging, 'w').close()
+
+        self.assertEqual((0, 0), store.collect_garbage())
+        self.assertTrue(os.path.exists(staging))
+        os.unlink(staging)
+        self.assertEqual((1, 1), store.collect_garbage(keep_runs=2))
+        self.assertEqual(['run2', 'run3'], [os.path.basename(r) for r in store.runs()])
+
+        objects = os.path.join(self.__basedir, 'objects')
+        self.assertEqual(3, sum(len(os.listdir(os.path.join(objects, prefix)))
+                                for prefix in os.listdir(objects)))
+
+    def testConcurrentRun(self):
+        running = self.create_store('run1')
+        running_object = running.object_path(
+            running.backup(self.create_file('sshd_config', "Port 22\n"))['object'])
+
+        # the manifest of the running run has not been written yet
+        store = self.create_store('run2')
+        store.backup(self.create_file('login.defs', "UMASK 027\n"))
+        store.close()
+        self.assertEqual((0, None), store.collect_garbage(keep_runs=1))
+        self.assertTrue(os.path.exists(running_object))
+
+        running.close()
+        self.assertEqual((1, 1), store.collect_garbage(keep_runs=1))
+        self.assertFalse(os.path.exists(running_object))
+
+    def testCollectGarbageOfRunningStore(self):
+        store = self.create_store('run1')
+        object_path = store.object_path(
+            store.backup(self.create_file('sshd_config', "Port 22\n"))['object'])
+
+        # the store converts its own shared lock, and keeps the objects it has recorded
+        self.assertEqual((0, 0), store.collect_garbage())
+        self.assertTrue(os.path.exists(object_path))
+
+        # the shared lock is held again afterwards
+        other = self.create_store('run2')
+        self.assertEqual((0, None), other.collect_garbage())
+        store.close()
+
+    def testArchive(self):
+        first = self.create_file('first.conf', "PermitRootLogin no\n" * 100)
+        second = self.create_file('second.conf', "Port 22\n")
+
+        rundir = os.path.join(self.__basedir, 'run1')
+        store = BackupStore(self.__basedir, rundir, backup_format='archive')
+        digests = [store.backup(name)['object'] for name in (first, second, first)]
+        store.close()
+
+        # nothing has been written to the object store
+        self.assertFalse(os.path.exists(os.path.join(self.__basedir, 'objects')))
+        self.assertEqual('archive', BackupStore.read_manifest(rundir)['format'])
+
+        index = BackupArchive.read_index(rundir)
+        self.assertEqual(2, len(index))
+        extracted = io.BytesIO()
+        BackupArchive.extract(rundir, index[digests[1]], extracted)
+        self.assertEqual(b"Port 22\n", extracted.getvalue())
+
+        # the archive is a valid gzip file, which contains all objects
+        with gzip.open(os.path.join(rundir, 'backup.gz'), 'rb') as archive:
+            self.assertEqual(b"PermitRootLogin no\n" * 100 + b"Port 22\n", archive.read())
+
+    def create_store(self, run):
+        return BackupStore(self.__basedir, os.path.join(self.__basedir, run))
+
+    def create_file(self, name, content):
+        filename = os.path.join(self.__workdir, name)
+        with open(filename, 'w') as stream:
+            stream.write(content)
+        return filename
+
+    def setUp(self):
+        self.__basedir = tempfile.mkdtemp()
+        self.__workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.__basedir)
+        shutil.rmtree(self.__workdir)
@@ -0,0 +1,103 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from hardening import core, info, storage
+from hardening.scheduler.CheckpointJournal import CheckpointJournal, JOURNAL_FILENAME
+
+
+class TestCheckpointJournal(unittest.TestCase):
+    """
+    Tests which runs can be resumed
+    """
+
+    def testTruncatedLastLine(self):
+        filename = self.__write_journal([self.__start(), self.__checkpoint("sshd")],
+                                        '{"event": "checkp')
+
+        self.assertEqual((filename, [self.__checkpoint("sshd")]),
+                         CheckpointJournal.find_resumable())
+
+    def testFinishedRun(self):
+        self.__write_journal([self.__start(), self.__checkpoint("sshd"), {'event': 'finished'}])
+        self.assertIsNone(CheckpointJournal.find_resumable())
+
+    def testChangedConfiguration(self):
+        start = self.__start()
+        start['configuration'] = "0" * 64
+        self.__write_journal([start, self.__checkpoint("sshd")])
+        self.assertIsNone(CheckpointJournal.find_resumable())
+
+    def testLastRunOnly(self):
+        self.__write_journal([self.__start(), self.__checkpoint("sshd")], run="20170301_12:00:00")
+        self.__write_journal([self.__start(), {'event': 'finished'}], run="20170301_13:00:00")
+        self.assertIsNone(CheckpointJournal.find_resumable())
+
+    def testCopyCheckpoints(self):
+        self.__write_journal([self.__start(), self.__checkpoint("sshd"),
+                              self.__checkpoint("apache")])
+        filename, records = CheckpointJournal.find_resumable()
+
+        # the apache module has been disabled since the last run
+        journal = CheckpointJournal(["sshd", "php"], resumed_journal=filename)
+        journal.copy_checkpoints(records)
+        self.assertEqual(["sshd"], journal.completed_modules())
+
+        with open(os.path.join(storage.TransactionInfo().get_backupdir(),
+                               JOURNAL_FILENAME)) as stream:
+            written = [json.loads(line) for line in stream]
+        self.assertEqual(filename, written[0]['resumed_from'])
+        self.assertEqual([self.__checkpoint("sshd")], written[1:])
+
+    @staticmethod
+    def __start():
+        return {'event': 'start', 'modules': ["sshd", "apache"],
+                'configuration': CheckpointJournal.configuration_fingerprint(),
+                'resumed_from': None}
+
+    @staticmethod
+    def __checkpoint(module):
+        return {'event': 'checkpoint', 'module': module, 'sections': ["main"],
+                'transactions': [{'transaction': "file:/etc/%s.conf" % module,
+                                  'status': "COMITTED", 'modified': True}]}
+
+    def __write_journal(self, records, tail="", run="20170301_12:00:00"):
+        dirname = os.path.join(self.__basedir, run)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        filename = os.path.join(dirname, JOURNAL_FILENAME)
+        with open(filename, "w") as stream:
+            for record in records:
+                stream.write(json.dumps(record, sort_keys=True) + "\n")
+            stream.write(tail)
+        return filename
+
+    def setUp(self):
+        core.RuntimeOptions().enable_silent_mode()
+        self.__basedir = tempfile.mkdtemp()
+        self.__original_basedir = info.Configuration().get_property("Backup", "BaseDir",
+                                                                    interpolate=False)
+        info.Configuration().set_property("Backup", "BaseDir", value=self.__basedir)
+        core.reset_singleton(storage.TransactionInfo)
+
+    def tearDown(self):
+        info.Configuration().set_property("Backup", "BaseDir", value=self.__original_basedir)
+        core.reset_singleton(storage.TransactionInfo)
+        shutil.rmtree(self.__basedir)
@@ -0,0 +1,73 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from hardening import storage
+
+
+class TestCommandTransaction(unittest.TestCase):
+    """
+    Tests how consecutive commands are folded into a single invocation
+    """
+
+    @staticmethod
+    def create_enmod(module):
+        transaction = storage.CommandTransaction(module)
+        transaction.set_commit_command(["a2enmod", module], prefix=["a2enmod"])
+        transaction.set_rollback_command(["a2dismod", "-q", "-f", module],
+                                         prefix=["a2dismod", "-q", "-f"])
+        return transaction
+
+    def testCoalesce(self):
+        dismod = storage.CommandTransaction("dismod")
+        dismod.set_commit_command(["a2dismod", "-q", "-f", "status", "cgi"],
+                                  prefix=["a2dismod", "-q", "-f"])
+        dismod.set_rollback_command(["a2enmod", "status", "cgi"], prefix=["a2enmod"])
+        headers = self.create_enmod("headers")
+        alias = self.create_enmod("alias")
+        config = storage.TextFileTransaction("/etc/apache2/apache2.conf")
+        ssl = self.create_enmod("ssl")
+
+        merged = storage.CommandTransaction.coalesce([dismod, headers, alias, config, ssl])
+
+        self.assertEqual(merged, 2)
+        self.assertEqual(dismod.get_commit_command(), ["a2dismod", "-q", "-f", "status", "cgi"])
+        self.assertEqual(headers.get_commit_command(), ["a2enmod", "headers", "alias", "ssl"])
+        self.assertEqual(headers.get_rollback_command(),
+                         ["a2dismod", "-q", "-f", "ssl", "alias", "headers"])
+        for transaction in [alias, ssl]:
+            self.assertIsNone(transaction.get_commit_command())
+            self.assertIsNone(transaction.get_rollback_command())
+
+    def testNotMergeable(self):
+        headers = self.create_enmod("headers")
+        restart = storage.CommandTransaction("restart")
+        restart.set_commit_command(["service", "apache2", "restart"])
+        alias = self.create_enmod("alias")
+
+        self.assertEqual(storage.CommandTransaction.coalesce([headers, restart, alias]), 0)
+        self.assertEqual(headers.get_commit_command(), ["a2enmod", "headers"])
+        self.assertEqual(alias.get_commit_command(), ["a2enmod", "alias"])
+
+    def testInvalidPrefix(self):
+        transaction = storage.CommandTransaction("invalid")
+        transaction.set_commit_command(["a2enmod", "headers"], prefix=["a2dismod"])
+        headers = self.create_enmod("headers")
+
+        self.assertEqual(storage.CommandTransaction.coalesce([transaction, headers]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from hardening import core
+from hardening.storage import CommitLog
+
+
+class TestCommitLog(unittest.TestCase):
+    def testInterruptedCommit(self):
+        commit_log = CommitLog(self.__basedir)
+        entries = [{'path': os.path.join(self.__basedir, 'sshd_config'), 'type': 'absent'}]
+
+        # commands are only recorded while a batch is being committed
+        commit_log.record_command(['a2enmod', 'headers'], ['a2dismod', 'headers'])
+        self.assertIsNone(commit_log.read())
+
+        commit_log.begin('20170301_12:00:00', 'objects', entries, ['/etc/sshd_config_x'])
+        commit_log.record_command(['a2enmod', 'headers'], ['a2dismod', 'headers'])
+
+        # the run has been killed while writing the next record
+        with open(commit_log.filename(), 'a') as stream:
+            stream.write('{"event": "comm')
+
+        begin, commands = CommitLog(self.__basedir).read()
+        self.assertEqual('20170301_12:00:00', begin['run'])
+        self.assertEqual(entries, begin['entries'])
+        self.assertEqual(['/etc/sshd_config_x'], begin['temporary'])
+        self.assertEqual([{'type': 'command', 'commit': ['a2enmod', 'headers'],
+                           'command': ['a2dismod', 'headers']}], commands)
+
+    def testFinishedCommit(self):
+        commit_log = CommitLog(self.__basedir)
+        commit_log.begin('20170301_12:00:00', 'objects', [], [])
+        self.assertTrue(commit_log.is_open())
+
+        commit_log.finish()
+        self.assertFalse(commit_log.is_open())
+        self.assertFalse(os.path.exists(commit_log.filename()))
+        self.assertIsNone(commit_log.read())
+
+    def testAbortedCommit(self):
+        commit_log = CommitLog(self.__basedir)
+        commit_log.begin('20170301_12:00:00', 'objects', [], [])
+        commit_log.abort()
+        self.assertFalse(commit_log.is_open())
+
+        # the log is kept until the changes of the aborted commit have been undone
+        self.assertEqual('20170301_12:00:00', commit_log.read()[0]['run'])
+        self.assertRaises(core.HardeningFailure, commit_log.begin, '20170301_12:00:01',
+                          'objects', [], [])
+
+        commit_log.remove()
+        self.assertIsNone(commit_log.read())
+
+    def setUp(self):
+        self.__basedir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.__basedir)
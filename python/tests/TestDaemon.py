@@ -0,0 +1,112 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+import hardening.scheduler as scheduler
+from hardening import core
+from hardening.scheduler.Daemon import Daemon
+
+
+class TestDaemon(unittest.TestCase):
+    """
+    Tests how the daemon reacts to signals and failing requests
+    """
+
+    def testSigterm(self):
+        responses = self.__serve([lambda: None, self.__send_signal(signal.SIGTERM)],
+                                 SystemExit)
+        self.assertEqual(['ok', None], responses)
+
+    def testSigint(self):
+        responses = self.__serve([self.__send_signal(signal.SIGINT)], KeyboardInterrupt)
+        self.assertEqual([None], responses)
+
+    def testFailingRequest(self):
+        def fail():
+            raise SystemExit(-1)
+
+        # the daemon goes on after the failing request, and is stopped by the next one
+        responses = self.__serve([fail, self.__send_signal(signal.SIGTERM)], SystemExit)
+        self.assertEqual(['error', None], responses)
+
+    @staticmethod
+    def __send_signal(signum):
+        return lambda: os.kill(os.getpid(), signum)
+
+    def __serve(self, runs, expected_exception):
+        """runs the daemon in this thread, and sends one `check` request per element of `runs`
+
+        @param runs: callables, which are invoked instead of Scheduler::run_hardening_modules
+        @param expected_exception: the exception which stops the daemon
+        @return list of the statuses of the responses, `None` if there has not been any response
+        """
+        pending_runs = list(runs)
+
+        class FakeScheduler(object):
+            @staticmethod
+            def run_hardening_modules():
+                pending_runs.pop(0)()
+
+        responses = list()
+
+        def send_requests():
+            while not os.path.exists(self.__socket_path):
+                time.sleep(0.01)
+            for _ in runs:
+                client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                client.connect(self.__socket_path)
+                stream = client.makefile('rwb')
+                stream.write(json.dumps({'action': 'check'}).encode('utf-8') + b"\n")
+                stream.flush()
+                line = stream.readline()
+                responses.append(json.loads(line.decode('utf-8'))['status'] if line else None)
+                stream.close()
+                client.close()
+
+        client_thread = threading.Thread(target=send_requests)
+        client_thread.daemon = True
+        original_scheduler = scheduler.Scheduler
+        scheduler.Scheduler = FakeScheduler
+        try:
+            client_thread.start()
+            self.assertRaises(expected_exception, Daemon(self.__socket_path).serve)
+        finally:
+            scheduler.Scheduler = original_scheduler
+        client_thread.join(10)
+
+        self.assertFalse(os.path.exists(self.__socket_path))
+        self.assertEqual([], pending_runs)
+        return responses
+
+    def setUp(self):
+        self.__tmpdir = tempfile.mkdtemp()
+        self.__socket_path = os.path.join(self.__tmpdir, "hardening.sock")
+        self.__handlers = {signum: signal.getsignal(signum)
+                           for signum in (signal.SIGTERM, signal.SIGINT)}
+
+    def tearDown(self):
+        for signum, handler in self.__handlers.items():
+            signal.signal(signum, handler)
+        core.RuntimeOptions().enable_silent_mode()
+        shutil.rmtree(self.__tmpdir)
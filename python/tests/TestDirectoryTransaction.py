@@ -28,20 +28,21 @@ class TestDirectoryTransactionTestCase(unittest.TestCase):
     """
 
     def testRollback1(self):
+        current_mode = stat.S_IMODE(os.stat(self.transaction().url()).st_mode)
         self.transaction().chmod(0o777)
 
-        self.assertTrue(os.path.exists(self.transaction().tmpname()))
+        self.assertIsNone(self.transaction().tmpname())
         self.transaction().rollback()
-        self.assertFalse(os.path.exists(self.transaction().tmpname()))
+        self.assertEqual(current_mode, stat.S_IMODE(os.stat(self.transaction().url()).st_mode))
 
     def testChmod1(self):
         new_mode = 0o741
         self.transaction().chmod(new_mode)
 
-        # make sure the new settings have been applied to the temporary
-        # directory
-        current_mode = os.stat(self.transaction().tmpname()).st_mode
-        self.assertEqual(new_mode, stat.S_IMODE(current_mode))
+        # the new settings are only recorded, the directory is not copied
+        self.assertIsNone(self.transaction().tmpname())
+        self.assertEqual({self.transaction().url(): {'mode': new_mode}},
+                         self.transaction().metadata_changes())
 
         # the new settings should not apply to the current directory yet
         current_mode = os.stat(self.transaction().url()).st_mode
@@ -51,9 +52,7 @@ class TestDirectoryTransactionTestCase(unittest.TestCase):
         current_mode = os.stat(self.transaction().url()).st_mode
         self.assertNotEqual(new_mode, stat.S_IMODE(current_mode))
 
-        self.assertTrue(os.path.exists(self.transaction().tmpname()))
         self.transaction().commit()
-        self.assertFalse(os.path.exists(self.transaction().tmpname()))
 
         current_mode = os.stat(self.transaction().url()).st_mode
         self.assertEqual(new_mode, stat.S_IMODE(current_mode))
@@ -72,6 +71,36 @@ class TestDirectoryTransactionTestCase(unittest.TestCase):
         current_mode = os.stat(self.transaction().url()).st_mode
         self.assertEqual(desired_mode, stat.S_IMODE(current_mode))
 
+    def testRollbackAfterCommit(self):
+        os.chmod(self.filename(), 0o755)
+        status = os.stat(self.filename())
+        self.transaction().chmod(0o700)
+        self.transaction().chown(status.st_uid + 1, status.st_gid + 1)
+
+        self.transaction().prepare_commit()
+        self.transaction().commit()
+        self.assertEqual(0o700, stat.S_IMODE(os.stat(self.filename()).st_mode))
+        self.assertEqual(status.st_uid + 1, os.stat(self.filename()).st_uid)
+
+        self.transaction().rollback()
+        status_after_rollback = os.stat(self.filename())
+        self.assertEqual(0o755, stat.S_IMODE(status_after_rollback.st_mode))
+        self.assertEqual((status.st_uid, status.st_gid),
+                         (status_after_rollback.st_uid, status_after_rollback.st_gid))
+
+    def testReplayJournal(self):
+        subdir = os.path.join(self.filename(), "subdir")
+        os.mkdir(subdir, 0o755)
+        os.chmod(self.filename(), 0o700)
+        journal = [[self.filename(), os.getuid(), os.getgid(), 0o700],
+                   [subdir, os.getuid(), os.getgid(), 0o755],
+                   [self.filename(), os.getuid(), os.getgid(), 0o750]]
+        os.chmod(subdir, 0o711)
+
+        DirectoryTransaction.replay_journal(journal)
+        self.assertEqual(0o700, stat.S_IMODE(os.stat(self.filename()).st_mode))
+        self.assertEqual(0o755, stat.S_IMODE(os.stat(subdir).st_mode))
+
     def setUp(self):
         RuntimeOptions().enable_silent_mode()
         origdir = tempfile.mkdtemp()
@@ -0,0 +1,66 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from hardening import core
+
+
+class TestFileCopy(unittest.TestCase):
+    def testCopy(self):
+        source = self.create_file('source', "PermitRootLogin no\n" * 1000, 0o640)
+        destination = os.path.join(self.__dirname, 'destination')
+
+        method = core.copy_file(source, destination, sync=True)
+        self.assertIn(method, ('reflink', 'copy_file_range', 'copy'))
+        self.assertNotEqual(os.stat(source).st_ino, os.stat(destination).st_ino)
+        self.assertEqual(0o640, stat.S_IMODE(os.stat(destination).st_mode))
+        with open(destination) as stream:
+            self.assertEqual("PermitRootLogin no\n" * 1000, stream.read())
+
+        # an existing file is replaced
+        source = self.create_file('empty', "", 0o600)
+        core.copy_file(source, destination)
+        self.assertEqual(0, os.path.getsize(destination))
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(destination).st_mode))
+
+    def testLink(self):
+        source = self.create_file('source', "Port 22\n", 0o644)
+        destination = self.create_file('destination', "outdated\n", 0o600)
+
+        method = core.copy_file(source, destination, allow_link=True)
+        if method == 'hardlink':
+            self.assertEqual(os.stat(source).st_ino, os.stat(destination).st_ino)
+        else:
+            self.assertEqual('reflink', method)
+        with open(destination) as stream:
+            self.assertEqual("Port 22\n", stream.read())
+
+    def create_file(self, name, content, mode):
+        filename = os.path.join(self.__dirname, name)
+        with open(filename, 'w') as stream:
+            stream.write(content)
+        os.chmod(filename, mode)
+        return filename
+
+    def setUp(self):
+        self.__dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.__dirname)
@@ -0,0 +1,57 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from hardening import core
+
+
+class TestFileMonitor(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, "sshd_config")
+        with open(self.filename, 'w') as stream:
+            stream.write("PermitRootLogin yes\n")
+        self.monitor = core.FileMonitor()
+
+    def tearDown(self):
+        self.monitor.close()
+        shutil.rmtree(self.dirname)
+
+    def testReplacedFile(self):
+        if not self.monitor.is_supported():
+            self.skipTest("inotify is not available")
+
+        self.monitor.watch(self.filename)
+        self.assertEqual(self.monitor.wait(0), set())
+
+        # most tools do not change files in place, but replace them
+        with open(self.filename + ".new", 'w') as stream:
+            stream.write("PermitRootLogin no\n")
+        os.rename(self.filename + ".new", self.filename)
+
+        self.assertIn(self.filename, self.monitor.wait(5))
+
+    def testMissingFile(self):
+        self.monitor.watch(os.path.join(self.dirname, "missing", "php.ini"))
+        if self.monitor.is_supported():
+            self.assertEqual(self.monitor.wait(0), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
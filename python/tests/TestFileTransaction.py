@@ -15,9 +15,13 @@
 
 import unittest
 import tempfile
+import errno
 import os
+import shutil
+import stat
 import difflib
-from hardening.storage import FileTransaction
+from hardening import core
+from hardening.storage import FileTransaction, TextFileTransaction
 from hardening.core import RuntimeOptions
 
 
@@ -30,7 +34,7 @@ class TestFileTransactionTestCase(unittest.TestCase):
         self.transaction().prepare_commit()
         self.transaction().commit()
         self.assertTrue(os.path.exists(self.filename()))
-        self.assertFalse(os.path.exists(self.transaction().backup_path()))
+        self.assertIsNone(self.transaction().backup_path())
 
         original = open(self.filename())
 
@@ -93,3 +97,169 @@ maiores alias consequatur aut perferendis doloribus asperiores repellat.
 
     def teststring(self):
         return self.__teststring
+
+
+class TestFileReplacementTestCase(unittest.TestCase):
+    """
+    Tests how the original file is replaced on commit
+    """
+
+    def testAtomicReplacement(self):
+        with open(self.__filename) as reader:
+            self.__commit()
+
+            # a reader of the original file still sees the complete original contents
+            self.assertEqual("original\n", reader.read())
+
+        self.assertNotEqual(self.__original_status.st_ino, os.stat(self.__filename).st_ino)
+        self.assertEqual("original\nchanged\n", self.__contents())
+        self.assertEqual(["sshd_config"], os.listdir(self.__dirname))
+
+    def testMetadata(self):
+        self.__commit()
+        status = os.stat(self.__filename)
+        self.assertEqual(0o640, stat.S_IMODE(status.st_mode))
+        self.assertEqual((self.__original_status.st_uid, self.__original_status.st_gid),
+                         (status.st_uid, status.st_gid))
+
+    def testCrossDeviceFallback(self):
+        renamed = self.__commit(self.__cross_device_rename)
+
+        # the temporary file has been copied next to the original file, and renamed from there
+        self.assertEqual(2, len(renamed))
+        self.assertEqual(os.path.dirname(renamed[1]), self.__dirname)
+        self.assertEqual("original\nchanged\n", self.__contents())
+        self.assertEqual(["sshd_config"], os.listdir(self.__dirname))
+
+        status = os.stat(self.__filename)
+        self.assertNotEqual(self.__original_status.st_ino, status.st_ino)
+        self.assertEqual(0o640, stat.S_IMODE(status.st_mode))
+        self.assertEqual((self.__original_status.st_uid, self.__original_status.st_gid),
+                         (status.st_uid, status.st_gid))
+
+    def testFailingCrossDeviceFallback(self):
+        original_copy_file = core.copy_file
+
+        def failing_copy_file(*_, **__):
+            raise IOError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+        transaction = self.__prepare()
+        core.copy_file = failing_copy_file
+        try:
+            self.assertRaises(core.HardeningFailure, self.__commit, self.__cross_device_rename,
+                              transaction)
+        finally:
+            core.copy_file = original_copy_file
+        transaction.rollback()
+
+        # the original file is untouched, and the copy as well as the temporary file are removed
+        self.assertEqual("original\n", self.__contents())
+        self.assertEqual(["sshd_config"], os.listdir(self.__dirname))
+
+    def __cross_device_rename(self, rename, renamed, source, destination):
+        """behaves like `os.rename`, as if the temporary file was located on another filesystem"""
+        renamed.append(source)
+        if len(renamed) == 1:
+            raise OSError(errno.EXDEV, os.strerror(errno.EXDEV), source)
+        rename(source, destination)
+
+    def __prepare(self):
+        transaction = TextFileTransaction(self.__filename)
+        transaction.begin()
+        transaction.append_line("changed")
+        transaction.prepare_commit()
+        return transaction
+
+    def __commit(self, rename=None, transaction=None):
+        """appends a line to the file and commits the change
+
+        @param rename: replacement of `os.rename` while the transaction is committed, which is
+        called with the original function, the list of renamed files and the arguments
+        @param transaction: the prepared transaction, or `None` to prepare a new one
+        @return list of the source files which have been passed to `os.rename` to replace the file
+        """
+        if transaction is None:
+            transaction = self.__prepare()
+
+        renamed = list()
+        original_rename = os.rename
+
+        def replacement(source, destination):
+            if destination != self.__filename:
+                return original_rename(source, destination)
+            if rename is None:
+                renamed.append(source)
+                return original_rename(source, destination)
+            return rename(original_rename, renamed, source, destination)
+
+        os.rename = replacement
+        try:
+            transaction.commit()
+        finally:
+            os.rename = original_rename
+        return renamed
+
+    def __contents(self):
+        with open(self.__filename) as stream:
+            return stream.read()
+
+    def setUp(self):
+        RuntimeOptions().enable_silent_mode()
+        self.__dirname = tempfile.mkdtemp()
+        self.__filename = os.path.join(self.__dirname, "sshd_config")
+        with open(self.__filename, "w") as stream:
+            stream.write("original\n")
+        os.chmod(self.__filename, 0o640)
+        if os.geteuid() == 0:
+            os.chown(self.__filename, 1, 1)
+        self.__original_status = os.stat(self.__filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.__dirname)
+
+
+class TestFileMetadataTestCase(unittest.TestCase):
+    """
+    Tests chmod and chown on files outside of pretend mode
+    """
+
+    def testUnchangedMode(self):
+        self.__transaction.chmod(0o640, apply_to_file=True)
+
+        # nothing has to be changed, so no temporary file is created
+        self.assertFalse(self.__transaction.has_working_copy())
+        self.assertFalse(self.__transaction.has_modifications_to_save())
+        self.assertEqual(["sshd_config"], os.listdir(self.__dirname))
+
+    def testChangedMode(self):
+        self.__transaction.chmod(0o600, apply_to_file=True)
+
+        self.assertTrue(self.__transaction.has_working_copy())
+        self.assertEqual(2, len(os.listdir(self.__dirname)))
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(self.__transaction.tmpname()).st_mode))
+        self.assertEqual(0o640, stat.S_IMODE(os.stat(self.__filename).st_mode))
+
+        # a second change is evaluated against the temporary file
+        self.__transaction.chmod(0o600, apply_to_file=True)
+        self.assertEqual(2, len(os.listdir(self.__dirname)))
+
+    def testUnchangedOwner(self):
+        status = os.stat(self.__filename)
+        self.__transaction.chown(status.st_uid, status.st_gid, apply_to_file=True)
+
+        self.assertFalse(self.__transaction.has_working_copy())
+        self.assertEqual(["sshd_config"], os.listdir(self.__dirname))
+
+    def setUp(self):
+        RuntimeOptions().enable_silent_mode()
+        self.__dirname = tempfile.mkdtemp()
+        self.__filename = os.path.join(self.__dirname, "sshd_config")
+        with open(self.__filename, "w") as stream:
+            stream.write("original\n")
+        os.chmod(self.__filename, 0o640)
+        self.__transaction = FileTransaction(self.__filename)
+        self.__transaction.begin()
+
+    def tearDown(self):
+        self.__transaction.rollback()
+        shutil.rmtree(self.__dirname)
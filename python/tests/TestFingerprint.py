@@ -0,0 +1,69 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from hardening import core, constants
+from hardening.utils.module.EnterModule import EnterModule
+
+
+class TestFingerprint(unittest.TestCase):
+    def testKeyOrder(self):
+        first = {'RunModules': ['sshd', 'php'], 'Backup': {'BaseDir': '/tmp', 'Mode': 448}}
+        second = {'Backup': {'Mode': 448, 'BaseDir': '/tmp'}, 'RunModules': ['sshd', 'php']}
+        self.assertEqual(core.fingerprint(first), core.fingerprint(second))
+
+    def testDifferentValues(self):
+        self.assertNotEqual(core.fingerprint(['sshd', 'php']), core.fingerprint(['php', 'sshd']))
+        self.assertNotEqual(core.fingerprint('1'), core.fingerprint(1))
+        self.assertNotEqual(core.fingerprint(None), core.fingerprint(False))
+
+    def testMultipleValues(self):
+        self.assertNotEqual(core.fingerprint('a', 'b'), core.fingerprint('ab'))
+        self.assertEqual(len(core.fingerprint(object())), 64)
+
+    def testPathFingerprint(self):
+        dirname = tempfile.mkdtemp()
+        try:
+            self.assertIsNone(core.path_fingerprint(os.path.join(dirname, 'missing')))
+
+            before = core.path_fingerprint(dirname)
+            self.assertEqual(before, core.path_fingerprint(dirname))
+
+            with open(os.path.join(dirname, 'sshd_config'), 'w') as stream:
+                stream.write("PermitRootLogin no\n")
+            self.assertNotEqual(before, core.path_fingerprint(dirname))
+        finally:
+            shutil.rmtree(dirname)
+
+    def testUtilFingerprint(self):
+        def create_util(meta):
+            return EnterModule(option_values={
+                constants.OPTION_MODULEMETA: meta,
+                constants.CONFIG_RUNTIME: {constants.OPTION_MODULE: 'sshd',
+                                           constants.OPTION_SECTION: None}})
+
+        first = create_util({'en_US': ['OpenSSH'], 'de_DE': ['OpenSSH']})
+        second = create_util({'de_DE': ['OpenSSH'], 'en_US': ['OpenSSH']})
+        self.assertEqual(first.fingerprint(), second.fingerprint())
+        self.assertEqual(len(set([first, second])), 1)
+        self.assertNotEqual(first, create_util({'en_US': ['Apache']}))
+
+
+if __name__ == '__main__':
+    unittest.main()
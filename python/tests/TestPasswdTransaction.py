@@ -42,6 +42,19 @@ class PasswdTransactionTestCase(unittest.TestCase):
         with self.assertRaises(KeyError):
             pwd.getpwnam(TEST_USERNAME)
 
+    def testPretendMode(self):
+        self.transaction().rollback()
+        core.RuntimeOptions().enable_pretend_mode()
+        try:
+            transaction = storage.PasswdTransaction(TEST_USERNAME)
+            transaction.begin()
+            with self.assertRaises(KeyError):
+                pwd.getpwnam(TEST_USERNAME)
+            self.assertEqual(["/usr/sbin/useradd", TEST_USERNAME],
+                             transaction.get_commit_command())
+        finally:
+            core.RuntimeOptions().enable_silent_mode()
+
     def setUp(self):
         subprocess.call(["/usr/sbin/userdel", TEST_USERNAME])
         core.RuntimeOptions().enable_silent_mode()
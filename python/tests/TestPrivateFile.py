@@ -0,0 +1,55 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from hardening import core
+
+
+class TestPrivateFile(unittest.TestCase):
+    def testPrivateFile(self):
+        with core.open_private_file(self.__filename) as stream:
+            self.assertEqual("plan", stream.read())
+
+    def testAccessibleFile(self):
+        os.chmod(self.__filename, 0o644)
+        self.assertRaises(core.HardeningFailure, core.open_private_file, self.__filename)
+
+    def testAccessibleDirectory(self):
+        os.chmod(self.__dirname, 0o770)
+        self.assertRaises(core.HardeningFailure, core.open_private_file, self.__filename)
+        self.assertRaises(core.HardeningFailure, core.check_private_directory, self.__dirname)
+
+    def testSymlink(self):
+        link = os.path.join(self.__dirname, "link")
+        os.symlink(self.__filename, link)
+        self.assertRaises(OSError, core.open_private_file, link)
+
+        linked_dir = os.path.join(self.__dirname, "linked_dir")
+        os.symlink(self.__dirname, linked_dir)
+        self.assertRaises(core.HardeningFailure, core.check_private_directory, linked_dir)
+
+    def setUp(self):
+        self.__dirname = tempfile.mkdtemp()
+        self.__filename = os.path.join(self.__dirname, "plan.json")
+        with open(self.__filename, "w") as stream:
+            stream.write("plan")
+        os.chmod(self.__filename, 0o600)
+
+    def tearDown(self):
+        shutil.rmtree(self.__dirname)
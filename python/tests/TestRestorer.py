@@ -0,0 +1,44 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from hardening.scheduler import Restorer
+
+
+class TestRestorer(unittest.TestCase):
+    def testPlan(self):
+        entries = [
+            {'type': 'file', 'path': '/etc/ssh/sshd_config', 'object': 'a', 'uid': 0, 'gid': 0,
+             'mode': 0o644},
+            {'type': 'command', 'commit': ['a2enmod', 'headers'],
+             'command': ['a2dismod', 'headers']},
+            {'type': 'metadata', 'path': '/var/log/apache2', 'uid': 0, 'gid': 4, 'mode': 0o750},
+            # only the first entry of a path describes its original state
+            {'type': 'file', 'path': '/etc/ssh/sshd_config', 'object': 'b', 'uid': 0, 'gid': 0,
+             'mode': 0o600},
+            {'type': 'directory', 'path': '/srv/www/cache', 'uid': 33, 'gid': 33, 'mode': 0o755},
+            {'type': 'file', 'path': '/srv/www/cache/index', 'object': 'c', 'uid': 33,
+             'gid': 33, 'mode': 0o644},
+            {'type': 'absent', 'path': '/etc/apache2/conf-available/security.conf'},
+            {'type': 'command', 'commit': ['systemctl', 'enable', 'apache2'], 'command': None}]
+
+        directories, paths, metadata, commands = Restorer.plan(entries)
+        self.assertEqual(['/srv/www/cache'], [e['path'] for e in directories])
+        self.assertEqual(['/etc/apache2/conf-available/security.conf', '/etc/ssh/sshd_config',
+                          '/srv/www/cache/index'], [e['path'] for e in paths])
+        self.assertEqual('a', paths[1]['object'])
+        self.assertEqual(['/var/log/apache2', '/srv/www/cache'], [e['path'] for e in metadata])
+        self.assertEqual([None, ['a2dismod', 'headers']], [e['command'] for e in commands])
@@ -0,0 +1,118 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from hardening import core
+from hardening.scheduler.BatchDriver import BatchDriver
+
+
+class TestRootFilesystem(unittest.TestCase):
+    """
+    Tests how paths and commands are mapped into root filesystems (see `--root`)
+    """
+
+    def testRebasePath(self):
+        root = self.__roots[0]
+        self.__parse_arguments("--root", root)
+        self.assertEqual(os.path.join(root, "etc", "ssh", "sshd_config"),
+                         core.RuntimeOptions().rebase_path("/etc/ssh/sshd_config"))
+        self.assertEqual(os.path.join(root, "etc"),
+                         core.RuntimeOptions().rebase_path("/../etc/./"))
+        self.assertEqual(root, core.RuntimeOptions().rebase_path("/"))
+
+    def testSymlinks(self):
+        root = self.__roots[0]
+        os.makedirs(os.path.join(root, "usr", "etc", "ssh"))
+        os.mkdir(os.path.join(root, "etc"))
+        # these links would point into the host system if they were not resolved below the root
+        os.symlink("/usr/etc/ssh", os.path.join(root, "etc", "ssh"))
+        os.symlink("/etc/ssh", os.path.join(root, "etc", "sshd"))
+        os.symlink("../../../../../../passwd", os.path.join(root, "etc", "passwd"))
+        self.__parse_arguments("--root", root)
+
+        self.assertEqual(os.path.join(root, "usr", "etc", "ssh", "sshd_config"),
+                         core.RuntimeOptions().rebase_path("/etc/ssh/sshd_config"))
+        self.assertEqual(os.path.join(root, "usr", "etc", "ssh", "sshd_config"),
+                         core.RuntimeOptions().rebase_path("/etc/sshd/sshd_config"))
+        self.assertEqual(os.path.join(root, "usr", "etc", "ssh"),
+                         core.RuntimeOptions().rebase_path("/etc/sshd"))
+
+        # `..` does not lead outside the root filesystem
+        self.assertEqual(os.path.join(root, "passwd"),
+                         core.RuntimeOptions().rebase_path("/etc/passwd"))
+
+    def testSymlinkLoop(self):
+        root = self.__roots[0]
+        os.symlink("/b", os.path.join(root, "a"))
+        os.symlink("a", os.path.join(root, "b"))
+        self.__parse_arguments("--root", root)
+        self.assertRaises(OSError, core.RuntimeOptions().rebase_path, "/a/file")
+
+    def testRebaseCommand(self):
+        self.__parse_arguments()
+        self.assertEqual("/etc/ssh", core.RuntimeOptions().rebase_path("/etc/ssh"))
+        self.assertEqual(["a2enmod", "headers"],
+                         core.RuntimeOptions().rebase_command(["a2enmod", "headers"]))
+
+        self.__parse_arguments("--root", self.__roots[0])
+        self.assertEqual(["/usr/sbin/chroot", self.__roots[0], "a2enmod", "headers"],
+                         core.RuntimeOptions().rebase_command(["a2enmod", "headers"]))
+
+    def testChildCommand(self):
+        logfile = os.path.join(self.__tmpdir, "hardening.log")
+        report = os.path.join(self.__tmpdir, "timing.json")
+        self.__parse_arguments("--root", self.__roots[0], "--root=" + self.__roots[1],
+                               "--jobs", "2", "--log", logfile, "--timing-report", report)
+
+        driver = BatchDriver()
+        for root in self.__roots:
+            identifier = core.RuntimeOptions().root_identifier(root)
+            cmd = driver.get_child_command(root)
+
+            self.assertEqual(["--mode", "silent", "--root", root, "--jobs", "1",
+                              "--log", os.path.join(self.__tmpdir,
+                                                    "hardening_%s.log" % identifier),
+                              "--timing-report", os.path.join(self.__tmpdir,
+                                                              "timing_%s.json" % identifier)],
+                             cmd[2:])
+
+        # the root filesystems have the same name, but different identifiers
+        self.assertNotEqual(*[core.RuntimeOptions().root_identifier(r) for r in self.__roots])
+
+    @staticmethod
+    def __parse_arguments(*arguments):
+        sys.argv = ["hardening.py", "--mode", "silent"] + list(arguments)
+        if "--log" not in arguments:
+            sys.argv += ["--log", os.devnull]
+        core.reset_singleton(core.RuntimeOptions)
+        core.RuntimeOptions()
+
+    def setUp(self):
+        self.__original_argv = sys.argv
+        self.__tmpdir = tempfile.mkdtemp()
+        self.__roots = [os.path.join(self.__tmpdir, name, "rootfs") for name in ("a", "b")]
+        for root in self.__roots:
+            os.makedirs(root)
+
+    def tearDown(self):
+        sys.argv = self.__original_argv
+        core.reset_singleton(core.RuntimeOptions)
+        core.RuntimeOptions().enable_silent_mode()
+        shutil.rmtree(self.__tmpdir)
@@ -0,0 +1,48 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+from hardening.info import RunCondition
+
+
+class TestRunCondition(unittest.TestCase):
+    """
+    Tests the compilation and evaluation of `run-if` expressions. Only constant expressions are
+    used, so that no facts of the local system are required.
+    """
+
+    def testConstants(self):
+        self.assertTrue(RunCondition(None).evaluate())
+        self.assertTrue(RunCondition(True).evaluate())
+        self.assertFalse(RunCondition(False).evaluate())
+
+    def testOperators(self):
+        self.assertTrue(RunCondition([True, True]).evaluate())
+        self.assertFalse(RunCondition([True, False]).evaluate())
+        self.assertTrue(RunCondition({'and': []}).evaluate())
+        self.assertFalse(RunCondition({'or': []}).evaluate())
+        self.assertTrue(RunCondition({'or': [False, {'not': False}]}).evaluate())
+        self.assertFalse(RunCondition({'not': [True, {'or': [False, True]}]}).evaluate())
+
+    def testInvalidExpression(self):
+        with self.assertRaises(SyntaxError):
+            RunCondition({'xor': [True, False]})
+        with self.assertRaises(SyntaxError):
+            RunCondition({'and': [True], 'or': [False]})
+        with self.assertRaises(SyntaxError):
+            RunCondition(42)
+
+
+if __name__ == '__main__':
+    unittest.main()
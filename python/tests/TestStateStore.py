@@ -0,0 +1,119 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+from hardening import constants, core, info, storage
+from hardening.scheduler.StateStore import StateStore
+from hardening.utils.filesystem.ChangePermissions import ChangePermissions
+
+
+class TestStateStore(unittest.TestCase):
+    """
+    Tests which utils are skipped by incremental runs
+    """
+
+    def testUnchangedTarget(self):
+        self.__write_target()
+        self.assertEqual(1, len(self.__run("0600")))
+        self.assertEqual(0, len(self.__run("0600")))
+
+    def testChangedModificationTime(self):
+        self.__write_target()
+        self.__run("0600")
+        timestamp = time.time() - 3600
+        os.utime(self.__target, (timestamp, timestamp))
+        self.assertEqual(1, len(self.__run("0600")))
+
+    def testChangedInode(self):
+        self.__write_target()
+        self.__run("0600")
+        status = os.stat(self.__target)
+
+        # replace the file by a new one with the same size and modification time
+        self.__write_target(self.__target + ".new")
+        os.utime(self.__target + ".new", (status.st_atime, status.st_mtime))
+        os.rename(self.__target + ".new", self.__target)
+        self.assertNotEqual(status.st_ino, os.stat(self.__target).st_ino)
+        self.assertEqual(1, len(self.__run("0600")))
+
+    def testChangedOption(self):
+        self.__write_target()
+        self.__run("0600")
+        self.assertEqual(1, len(self.__run("0640")))
+        self.assertEqual(0, len(self.__run("0640")))
+
+    def testMissingTarget(self):
+        self.assertEqual(1, len(self.__run("0600")))
+        self.assertEqual(1, len(self.__run("0600")))
+
+        # the util must not be skipped once the target has been created
+        self.__write_target()
+        self.assertEqual(1, len(self.__run("0600")))
+        self.assertEqual(0, len(self.__run("0600")))
+
+    def testFullRun(self):
+        original_argv = sys.argv
+        try:
+            for argv, is_enabled in [(["--mode", "silent"], True),
+                                     (["--mode", "silent", "--full"], False),
+                                     (["--mode", "check-only"], False)]:
+                sys.argv = ["hardening.py", "--log", os.devnull] + argv
+                core.reset_singleton(core.RuntimeOptions)
+                self.assertEqual(is_enabled, StateStore.is_enabled())
+        finally:
+            sys.argv = original_argv
+            core.reset_singleton(core.RuntimeOptions)
+            core.RuntimeOptions().enable_silent_mode()
+
+    def __run(self, mode):
+        """runs a ChangePermissions util the way the Scheduler does in silent mode
+
+        @return list of the utils which have not been skipped
+        """
+        storage.TransactionManager().clear()
+        util = ChangePermissions(option_values={
+            constants.OPTION_TRANSACTION: "file:" + self.__target,
+            constants.OPTION_MODE: mode})
+        state_store = StateStore([util])
+        utils = state_store.outdated_utils([util])
+        state_store.record(utils)
+        return utils
+
+    def __write_target(self, filename=None):
+        with open(filename or self.__target, "w") as stream:
+            stream.write("content")
+
+    def setUp(self):
+        core.RuntimeOptions().enable_silent_mode()
+        self.__cachedir = tempfile.mkdtemp()
+        self.__target = os.path.join(self.__cachedir, "target.conf")
+        self.__original_cachedir = info.Configuration().get_property(
+            constants.CONFIG_CACHE, constants.CONFIG_BASEDIR, interpolate=False)
+        info.Configuration().set_property(constants.CONFIG_CACHE, constants.CONFIG_BASEDIR,
+                                          value=self.__cachedir)
+        core.reset_singleton(storage.TransactionInfo)
+
+    def tearDown(self):
+        storage.TransactionManager().clear()
+        info.Configuration().set_property(constants.CONFIG_CACHE, constants.CONFIG_BASEDIR,
+                                          value=self.__original_cachedir)
+        core.reset_singleton(storage.TransactionInfo)
+        shutil.rmtree(self.__cachedir)
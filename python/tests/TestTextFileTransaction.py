@@ -32,7 +32,7 @@ class TextTextFileTransactionTestCase(unittest.TestCase):
         self.assertTrue(os.path.exists(self.filename()))
 
         # backups are only written if the file is modified
-        self.assertFalse(os.path.exists(self.transaction().backup_path()))
+        self.assertIsNone(self.transaction().backup_path())
 
     def testBackupWithModification(self):
         self.transaction().append_line(self.testline())
@@ -83,11 +83,11 @@ class TextTextFileTransactionTestCase(unittest.TestCase):
     def testRollback1(self):
         self.transaction().append_line(self.testline())
         self.assertTrue(os.path.exists(self.transaction().tmpname()))
-        self.assertFalse(os.path.exists(self.transaction().backup_path()))
+        self.assertIsNone(self.transaction().backup_path())
 
         self.transaction().rollback()
         self.assertFalse(os.path.exists(self.transaction().tmpname()))
-        self.assertFalse(os.path.exists(self.transaction().backup_path()))
+        self.assertIsNone(self.transaction().backup_path())
 
     def testDelete(self):
         self.transaction().delete()
@@ -121,7 +121,7 @@ class TextTextFileTransactionTestCase(unittest.TestCase):
         self.assertTrue(os.path.exists(self.__filename))
 
         # ensure the backup is missing
-        self.assertFalse(os.path.exists(self.transaction().backup_path()))
+        self.assertIsNone(self.transaction().backup_path())
 
     def testMissingOriginalPath(self):
         self.transaction().prepare_commit()
@@ -147,7 +147,7 @@ class TextTextFileTransactionTestCase(unittest.TestCase):
         self.assertTrue(os.path.exists(self.__filename))
 
         # ensure the backup is missing
-        self.assertFalse(os.path.exists(self.transaction().backup_path()))
+        self.assertIsNone(self.transaction().backup_path())
 
     def setUp(self):
         self.__teststring = """
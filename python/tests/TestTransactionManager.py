@@ -0,0 +1,143 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from hardening import core, storage
+from hardening.storage.Transaction import TransactionStatus
+from hardening.storage.PathIndex import PathIndex
+
+
+class TestTransactionManager(unittest.TestCase):
+    """
+    Tests how the TransactionManager detects dependencies between transactions
+    """
+
+    def testDependencyGroups(self):
+        apache_dir = storage.DirectoryTransaction("/etc/apache2")
+        apache_conf = storage.TextFileTransaction("/etc/apache2/apache2.conf")
+        sshd_config = storage.TextFileTransaction("/etc/ssh/sshd_config")
+        apache2_old = storage.TextFileTransaction("/etc/apache2.old")
+        enmod = storage.CommandTransaction("1")
+        dismod = storage.CommandTransaction("2")
+
+        groups = storage.TransactionManager().dependency_groups(
+            [apache_conf, sshd_config, apache_dir, apache2_old, enmod, dismod])
+
+        self.assertEqual(groups, [[apache_conf, apache_dir],
+                                  [sshd_config],
+                                  [apache2_old],
+                                  [enmod, dismod]])
+
+    def testCommandDependencies(self):
+        sshd_config = storage.TextFileTransaction("/etc/ssh/sshd_config")
+        passwd = storage.PasswdTransaction("plone_daemon")
+        buildout = storage.DirectoryTransaction("/usr/local/Plone/zeocluster/var")
+        apache_conf = storage.TextFileTransaction("/etc/apache2/apache2.conf")
+        buildout.add_dependency(passwd)
+
+        groups = storage.TransactionManager().dependency_groups(
+            [sshd_config, passwd, buildout, apache_conf])
+
+        # the directory may only be changed after the user has been created
+        self.assertEqual(groups, [[sshd_config], [passwd, buildout], [apache_conf]])
+
+    def testUnrelatedTransactionsAfterCommand(self):
+        enmod = storage.CommandTransaction("1")
+        enmod.set_commit_command(["a2enmod", "headers"], prefix=["a2enmod"])
+        chmod = storage.CommandTransaction("2")
+        chmod.set_commit_command(["/bin/chmod", "700", "/etc/ssh/"])
+        sshd_config = storage.TextFileTransaction("/etc/ssh/sshd_config")
+        apache_conf = storage.TextFileTransaction("/etc/apache2/apache2.conf")
+        php_ini = storage.TextFileTransaction("/etc/php5/apache2/php.ini")
+
+        groups = storage.TransactionManager().dependency_groups(
+            [enmod, apache_conf, chmod, sshd_config, php_ini])
+
+        # only the file which is passed to a command depends on the commands
+        self.assertEqual(groups, [[enmod, chmod, sshd_config], [apache_conf], [php_ini]])
+
+    def testNoDependencies(self):
+        transactions = [storage.TextFileTransaction("/etc/file%d" % i) for i in range(5)]
+        groups = storage.TransactionManager().dependency_groups(transactions)
+        self.assertEqual(groups, [[t] for t in transactions])
+
+    def testRegistry(self):
+        manager = storage.TransactionManager()
+        manager.clear()
+        try:
+            sshd_config = manager.create_transaction("file:/etc/ssh/sshd_config")
+            self.assertIs(manager.create_transaction("file:/etc//ssh/./sshd_config"), sshd_config)
+            self.assertIs(manager.find_transaction("file:/etc/ssh/sshd_config"), sshd_config)
+            self.assertIsNone(manager.find_transaction("file:/etc/ssh/ssh_config"))
+
+            ssh_dir = manager.create_transaction("dir:/etc/ssh")
+            manager.create_transaction("file:/etc/sshd_config")
+            self.assertEqual(manager.overlapping_transactions("/etc/ssh"), [ssh_dir, sshd_config])
+            self.assertEqual(manager.overlapping_transactions("/etc/ssh/sshd_config"),
+                             [sshd_config, ssh_dir])
+        finally:
+            manager.clear()
+
+    def testFailedCommit(self):
+        core.RuntimeOptions().enable_silent_mode()
+        manager = storage.TransactionManager()
+        manager.clear()
+        dirname = tempfile.mkdtemp()
+        try:
+            filenames = [os.path.join(dirname, name) for name in ("a.conf", "b.conf")]
+            transactions = list()
+            for filename in filenames:
+                with open(filename, "w") as stream:
+                    stream.write("original" + os.linesep)
+                transactions.append(manager.create_transaction("file:" + filename))
+                transactions[-1].begin()
+                transactions[-1].append_line("changed")
+            transactions.append(manager.create_transaction("cmd:1"))
+            transactions[-1].begin()
+            transactions[-1].set_commit_command(["false"])
+            transactions[-1].set_rollback_command(["true"])
+
+            # the command does not depend on the files, so the files are committed in their own
+            # groups before the command fails
+            self.assertEqual([[t] for t in transactions], manager.dependency_groups(transactions))
+            self.assertRaises(subprocess.CalledProcessError, manager.commit_all)
+
+            # the changes of the other groups have been undone
+            self.assertEqual([TransactionStatus.COMMITTED] * 2,
+                             [t.status() for t in transactions[:2]])
+            for filename in filenames:
+                with open(filename) as stream:
+                    self.assertEqual("original" + os.linesep, stream.read())
+            self.assertIsNone(storage.TransactionInfo().get_commit_log().read())
+        finally:
+            manager.clear()
+            shutil.rmtree(dirname)
+
+    def testPathIndex(self):
+        index = PathIndex()
+        for idx, path in enumerate(["/etc/apache2/apache2.conf", "/etc/apache2", "/etc/apache2.old",
+                                    "/", "/etc/apache2/sites-enabled/default.conf"]):
+            index.add(path, idx)
+
+        self.assertEqual(index.overlapping("/etc/apache2"), [1, 3, 0, 4])
+        self.assertEqual(index.overlapping("/etc/apache2/"), [1, 3, 0, 4])
+        self.assertEqual(index.overlapping("/etc/apache2.old"), [2, 3])
+        self.assertEqual(index.overlapping("/var/www"), [3])
+        self.assertEqual(sorted(index.overlapping("/")), [0, 1, 2, 3, 4])
+        self.assertEqual(index.get("/etc/apache2/"), [1])
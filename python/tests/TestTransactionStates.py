@@ -13,9 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import inspect
 import unittest
 from hardening import storage
-from hardening.storage.Transaction import TransactionStatus
+from hardening.storage.Transaction import Transaction, TransactionStatus
 
 
 class TestTransactionStates(unittest.TestCase):
@@ -50,3 +51,49 @@ class TestTransactionStates(unittest.TestCase):
 
         # with self.assertRaises(RuntimeError):
         #    self.transaction().rollback()
+
+    def testInvalidStateChange(self):
+        transaction = NullTransaction(self.__class__.__name__)
+        transaction.begin()
+        transaction.prepare_commit()
+        with self.assertRaises(RuntimeError):
+            transaction.begin()
+
+    def testStateChangeWithoutStackInspection(self):
+        """the state changes must not inspect the stack, which was formerly done for every single
+        state change and was much more expensive than the state change itself
+        """
+        def fail(*_, **__):
+            raise AssertionError("the stack is inspected during a state change")
+
+        names = ['currentframe', 'getouterframes', 'getframeinfo', 'stack']
+        originals = dict((name, getattr(inspect, name)) for name in names)
+        for name in names:
+            setattr(inspect, name, fail)
+        try:
+            transaction = NullTransaction(self.__class__.__name__)
+            transaction.begin()
+            transaction.prepare_commit()
+            transaction.commit()
+            transaction.rollback()
+        finally:
+            for name, original in originals.items():
+                setattr(inspect, name, original)
+        self.assertEqual(TransactionStatus.ROLLEDBACK, transaction.status())
+
+
+class NullTransaction(Transaction):
+    """transaction which does nothing at all, so that only the state changes themselves are run
+    (see `STATE_CHANGES` in storage::Transaction)"""
+
+    def __begin__(self):
+        pass
+
+    def __prepare_commit__(self):
+        pass
+
+    def __commit__(self):
+        pass
+
+    def __rollback__(self):
+        pass
@@ -0,0 +1,75 @@
+# This file is part of BSICMS2.
+#
+# BSICMS2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+import unittest
+from hardening.core import PromptQueue, WorkerPool
+
+
+class TestWorkerPool(unittest.TestCase):
+    """
+    Tests that the worker pool runs items concurrently, keeps the order of the results and passes
+    exceptions to the caller
+    """
+
+    def testResultOrder(self):
+        results = WorkerPool(4).map(lambda x: x * x, range(20))
+        self.assertEqual(results, [x * x for x in range(20)])
+
+    def testConcurrency(self):
+        barrier = threading.Event()
+        running = list()
+
+        def work(item):
+            running.append(item)
+            if len(running) == 3:
+                barrier.set()
+            # would time out if the items were processed one after another
+            self.assertTrue(barrier.wait(5))
+            return item
+
+        self.assertEqual(WorkerPool(3).map(work, [1, 2, 3]), [1, 2, 3])
+
+    def testException(self):
+        def work(item):
+            if item == 2:
+                raise SystemExit(-1)
+            time.sleep(0.01)
+            return item
+
+        with self.assertRaises(SystemExit):
+            WorkerPool(2).map(work, range(10))
+
+    def testSingleWorker(self):
+        threads = set()
+
+        def work(_):
+            threads.add(threading.current_thread().ident)
+
+        WorkerPool(1).map(work, range(5))
+        self.assertEqual(threads, set([threading.current_thread().ident]))
+
+    def testPromptsOnMainThread(self):
+        main_thread = threading.current_thread().ident
+
+        def prompt(item):
+            self.assertEqual(threading.current_thread().ident, main_thread)
+            return item + 1
+
+        def work(item):
+            return PromptQueue().call(prompt, item)
+
+        self.assertEqual(WorkerPool(3).map(work, range(6)), [1, 2, 3, 4, 5, 6])
@@ -19,3 +19,18 @@ from tests.TestTextFileTransaction import *
 from tests.TestTransactionStates import *
 from tests.TestPasswdTransaction import *
 from tests.TestDirectoryTransaction import *
+from tests.TestWorkerPool import *
+from tests.TestTransactionManager import *
+from tests.TestFingerprint import *
+from tests.TestCommandTransaction import *
+from tests.TestFileMonitor import *
+from tests.TestRunCondition import *
+from tests.TestBackupStore import *
+from tests.TestFileCopy import *
+from tests.TestRestorer import *
+from tests.TestCommitLog import *
+from tests.TestPrivateFile import *
+from tests.TestCheckpointJournal import *
+from tests.TestStateStore import *
+from tests.TestRootFilesystem import *
+from tests.TestDaemon import *